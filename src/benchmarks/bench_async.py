@@ -0,0 +1,104 @@
+"""
+Compare le débit des modèles synchrones (threads + pool psycopg2) et asynchrones
+(asyncio + pool asyncpg) sous de nombreux clients simultanés.
+
+Chaque client enchaîne des consultations de dossier patient et des recherches,
+sur des patients existants de la base. Les deux pools ont la même taille (POOL_CONFIG).
+
+Usage : python benchmarks/bench_async.py [nb_clients] [requetes_par_client]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection, POOL_CONFIG
+from database import async_config
+from models.patient import Patient
+from models.asynchrone import PatientAsync
+
+NB_CLIENTS = 200
+REQUETES_PAR_CLIENT = 20
+TERMES = ['diop', 'fall', 'ndiaye', '77']
+
+
+def identifiants_patients(nombre=1000):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM patients ORDER BY random() LIMIT %s", (nombre,))
+        return [ligne[0] for ligne in cursor.fetchall()]
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def client_sync(numero, patients, nb_requetes):
+    latences = []
+    for i in range(nb_requetes):
+        debut = time.perf_counter()
+        if i % 2:
+            Patient.rechercher_patient(TERMES[(numero + i) % len(TERMES)], limite=20)
+        else:
+            Patient.dossier_complet(patients[(numero * nb_requetes + i) % len(patients)])
+        latences.append(time.perf_counter() - debut)
+    return latences
+
+
+async def client_async(numero, patients, nb_requetes):
+    latences = []
+    for i in range(nb_requetes):
+        debut = time.perf_counter()
+        if i % 2:
+            await PatientAsync.rechercher_patient(TERMES[(numero + i) % len(TERMES)], limite=20)
+        else:
+            await PatientAsync.dossier_complet(patients[(numero * nb_requetes + i) % len(patients)])
+        latences.append(time.perf_counter() - debut)
+    return latences
+
+
+def mesurer_sync(nb_clients, patients, nb_requetes):
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=nb_clients) as executeur:
+        resultats = list(executeur.map(
+            lambda n: client_sync(n, patients, nb_requetes), range(nb_clients)
+        ))
+    return time.perf_counter() - debut, [l for latences in resultats for l in latences]
+
+
+async def mesurer_async(nb_clients, patients, nb_requetes):
+    await async_config.get_pool()
+    debut = time.perf_counter()
+    resultats = await asyncio.gather(*(
+        client_async(n, patients, nb_requetes) for n in range(nb_clients)
+    ))
+    duree = time.perf_counter() - debut
+    await async_config.fermer_pool()
+    return duree, [l for latences in resultats for l in latences]
+
+
+def afficher(nom, duree, latences):
+    latences = sorted(latences)
+    p95 = latences[int(len(latences) * 0.95) - 1]
+    print(f"{nom:>6} : {len(latences) / duree:8.0f} requêtes/s | "
+          f"médiane {statistics.median(latences) * 1000:7.2f} ms | p95 {p95 * 1000:7.2f} ms")
+
+
+def main(nb_clients, nb_requetes):
+    patients = identifiants_patients()
+    if not patients:
+        print("Aucun patient en base")
+        return
+
+    print(f"{nb_clients} clients x {nb_requetes} requêtes, pool de {POOL_CONFIG['maxconn']} connexions\n")
+    afficher("sync", *mesurer_sync(nb_clients, patients, nb_requetes))
+    afficher("async", *asyncio.run(mesurer_async(nb_clients, patients, nb_requetes)))
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    main(*(arguments + [NB_CLIENTS, REQUETES_PAR_CLIENT][len(arguments):]))
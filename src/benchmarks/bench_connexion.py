@@ -0,0 +1,72 @@
+"""
+Débit de connexion (Utilisateur.authentifier) lors d'un pic de connexions.
+
+Mesure, avec plusieurs threads simultanés :
+  - les connexions "à froid" : chaque connexion paie le calcul scrypt ;
+  - les connexions répétées servies par le cache des sessions vérifiées.
+Un utilisateur de test est créé puis supprimé.
+
+Usage : python benchmarks/bench_connexion.py [nb_threads] [connexions_par_thread]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from models.utilisateur import Utilisateur, cache_sessions
+from utils.securite import PARAMETRES_HACHAGE
+
+NB_THREADS = 16
+CONNEXIONS_PAR_THREAD = 20
+EMAIL = 'bench.connexion@clinique.sn'
+MOT_DE_PASSE = 'bench-connexion'
+
+
+def supprimer_utilisateur():
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM utilisateurs WHERE email = %s", (EMAIL,))
+        connection.commit()
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def mesurer(nb_threads, connexions_par_thread):
+    def connexions(_):
+        for _ in range(connexions_par_thread):
+            if Utilisateur.authentifier(EMAIL, MOT_DE_PASSE) is None:
+                raise RuntimeError("Échec d'authentification")
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=nb_threads) as executeur:
+        list(executeur.map(connexions, range(nb_threads)))
+    return nb_threads * connexions_par_thread / (time.perf_counter() - debut)
+
+
+def main(nb_threads, connexions_par_thread):
+    supprimer_utilisateur()
+    succes, message = Utilisateur.ajouter_utilisateur('Bench', 'Connexion', EMAIL, MOT_DE_PASSE, 'secretaire')
+    if not succes:
+        print(f"✗ {message}")
+        return
+
+    print(f"scrypt n={PARAMETRES_HACHAGE['n']} r={PARAMETRES_HACHAGE['r']} p={PARAMETRES_HACHAGE['p']}, "
+          f"{PARAMETRES_HACHAGE['threads']} threads de hachage, {nb_threads} clients\n")
+    try:
+        ttl = cache_sessions.ttl
+        cache_sessions.ttl = 0   # Chaque entrée expire aussitôt : aucune connexion n'est servie par le cache
+        print(f"  à froid (scrypt à chaque fois) : {mesurer(nb_threads, connexions_par_thread):8.0f} connexions/s")
+        cache_sessions.ttl = ttl
+        print(f"  avec cache des sessions        : {mesurer(nb_threads, connexions_par_thread):8.0f} connexions/s")
+    finally:
+        supprimer_utilisateur()
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    main(*(arguments + [NB_THREADS, CONNEXIONS_PAR_THREAD][len(arguments):]))
@@ -0,0 +1,104 @@
+"""
+Mesure le calcul des créneaux libres sur une fenêtre d'un mois.
+
+Crée des médecins de test d'une même spécialité et remplit leurs agendas
+(environ 60 % des créneaux occupés), puis chronomètre :
+  - RendezVous.creneaux_disponibles() pour chaque médecin sur 30 jours ;
+  - RendezVous.prochains_creneaux() sur toute la spécialité.
+Les données de test sont supprimées à la fin.
+
+Usage : python benchmarks/bench_creneaux.py [nb_medecins]
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from models.rendez_vous import RendezVous
+
+NB_MEDECINS = 50
+SPECIALITE = 'Bench créneaux'
+JOURS = 30
+
+
+def preparer(nb_medecins):
+    """
+    Crée les médecins, un patient et les rendez-vous de test ; retourne (medecins, patient_id).
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite)
+            SELECT 'Bench', 'Medecin ' || g, 'bench.creneaux.' || g || '@clinique.sn', '-', 'medecin', %s
+            FROM generate_series(1, %s) AS g
+            RETURNING id
+        ''', (SPECIALITE, nb_medecins))
+        medecins = [ligne[0] for ligne in cursor.fetchall()]
+
+        cursor.execute('''
+            INSERT INTO patients (nom, prenom, date_naissance, telephone)
+            VALUES ('Bench', 'Creneaux', DATE '1980-01-01', '770000000')
+            RETURNING id
+        ''')
+        patient_id = cursor.fetchone()[0]
+
+        # Créneaux de 30 minutes 08:00-12:00 et 14:00-18:00, occupés à ~60 %
+        cursor.execute('''
+            INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv)
+            SELECT %s, m, j::date, h
+            FROM unnest(%s::int[]) AS m,
+                 generate_series(CURRENT_DATE, CURRENT_DATE + %s, INTERVAL '1 day') AS j,
+                 (SELECT TIME '08:00' + n * INTERVAL '30 minutes' AS h
+                  FROM generate_series(0, 19) AS n) AS heures
+            WHERE (h < TIME '12:00' OR h >= TIME '14:00') AND random() < 0.6
+        ''', (patient_id, medecins, JOURS))
+        connection.commit()
+        return medecins, patient_id
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def nettoyer(medecins, patient_id):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM patients WHERE id = %s", (patient_id,))
+        cursor.execute("DELETE FROM utilisateurs WHERE id = ANY(%s)", (medecins,))
+        connection.commit()
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def main(nb_medecins):
+    medecins, patient_id = preparer(nb_medecins)
+    debut, fin = date.today(), date.today() + timedelta(days=JOURS)
+
+    try:
+        durees = []
+        for medecin_id in medecins:
+            t0 = time.perf_counter()
+            RendezVous.creneaux_disponibles(medecin_id, debut, fin)
+            durees.append((time.perf_counter() - t0) * 1000)
+        print(f"creneaux_disponibles (30 jours, 1 médecin) : "
+              f"médiane {statistics.median(durees):.2f} ms, max {max(durees):.2f} ms")
+
+        durees = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            RendezVous.prochains_creneaux(SPECIALITE, nombre=10, horizon_jours=JOURS)
+            durees.append((time.perf_counter() - t0) * 1000)
+        print(f"prochains_creneaux ({nb_medecins} médecins, 10 créneaux) : "
+              f"médiane {statistics.median(durees):.2f} ms, max {max(durees):.2f} ms")
+    finally:
+        nettoyer(medecins, patient_id)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_MEDECINS)
@@ -0,0 +1,237 @@
+"""
+Mesure la liste d'attente (models/liste_attente.py) avec des milliers d'inscriptions.
+
+Pour chaque moteur : inscriptions en liste d'attente (ListeAttente.inscrire), puis
+annulations de rendez-vous par RendezVous.modifier_statut, chacune suivie de la
+réattribution automatique du créneau. On mesure les débits et le taux d'occupation
+des créneaux avant et après, et on vérifie qu'aucun créneau n'a deux rendez-vous
+actifs et que chaque réattribution correspond à une seule inscription servie. En complément, l'extraction du meilleur candidat dans
+l'index en mémoire est comparée à un parcours complet de la liste.
+
+La base SQLite est un fichier temporaire ; sur PostgreSQL, les données de test sont
+supprimées à la fin. PostgreSQL est ignoré s'il est injoignable.
+
+Usage : python benchmarks/bench_liste_attente.py [nb_inscriptions] [nb_annulations]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as heure, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import config
+from database.config import get_connection, close_connection, fermer_pool
+from models.lignes import InscriptionAttente
+from models.liste_attente import FileAttente, ListeAttente, cache_liste_attente
+from models.rendez_vous import RendezVous
+from models.utilisateur import Utilisateur
+
+NB_INSCRIPTIONS = 5000
+NB_ANNULATIONS = 1000
+NB_MEDECINS = 10
+NB_PATIENTS = 2000
+JOURS = 20
+SPECIALITES = ('Bench cardiologie', 'Bench pédiatrie', 'Bench dermatologie')
+DATE_DEBUT = date(2099, 1, 5)
+
+
+def creneau(i):
+    return DATE_DEBUT + timedelta(days=i // 16 % JOURS), heure(8 + (i % 16) // 2, 30 * (i % 2))
+
+
+def executer_sql(requete, params=()):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(requete, params)
+        lignes = cursor.fetchall() if cursor.description else None
+        connection.commit()
+        return lignes
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def nettoyer():
+    executer_sql("DELETE FROM patients WHERE nom = 'BenchAttente'")
+    executer_sql("DELETE FROM utilisateurs WHERE email LIKE %s", ('bench.attente%',))
+    cache_liste_attente.vider()
+
+
+def occupation(medecins):
+    """
+    Part des créneaux de la période de test occupés par un rendez-vous actif.
+    """
+    actifs = executer_sql('''
+        SELECT COUNT(*) FROM rendez_vous
+        WHERE medecin_id = ANY(%s) AND date_rdv BETWEEN %s AND %s AND statut <> 'annule'
+    ''', (medecins, DATE_DEBUT, DATE_DEBUT + timedelta(days=JOURS - 1)))[0][0]
+    return actifs / (len(medecins) * JOURS * 16)
+
+
+def scenario(nb_inscriptions, nb_annulations, erreurs):
+    """
+    Exécute les mesures et les vérifications sur le moteur courant ; retourne {mesure: valeur}.
+    """
+    connection = get_connection()
+    if not connection:
+        return None
+    close_connection(connection)
+    nettoyer()
+    hasard = random.Random(42)
+    resultats = {}
+
+    for n in range(NB_MEDECINS):
+        Utilisateur.ajouter_utilisateur('Bench', f'Attente {n}', f'bench.attente{n}@clinique.sn', 'bench',
+                                        'medecin', SPECIALITES[n % len(SPECIALITES)])
+    medecins = [ligne[0] for ligne in executer_sql(
+        "SELECT id FROM utilisateurs WHERE email LIKE %s ORDER BY id", ('bench.attente%',))]
+    specialites = {medecin_id: SPECIALITES[n % len(SPECIALITES)] for n, medecin_id in enumerate(medecins)}
+
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        config.execute_values(cursor, '''
+            INSERT INTO patients (nom, prenom, date_naissance, telephone) VALUES %s
+        ''', [('BenchAttente', f'Patient {i}', date(1990, 1, 1), f'78{i:07d}') for i in range(NB_PATIENTS)],
+            page_size=1000)
+        connection.commit()
+    finally:
+        cursor.close()
+        close_connection(connection)
+    patients = [ligne[0] for ligne in executer_sql(
+        "SELECT id FROM patients WHERE nom = 'BenchAttente' ORDER BY id")]
+
+    # Agenda plein : chaque médecin a tous ses créneaux de la période réservés
+    RendezVous.creer_en_masse([(patients[(i * 7 + m) % len(patients)], medecin_id, *creneau(i))
+                               for m, medecin_id in enumerate(medecins) for i in range(JOURS * 16)])
+    rendez_vous = [ligne[0] for ligne in executer_sql(
+        "SELECT id FROM rendez_vous WHERE medecin_id = ANY(%s) ORDER BY id", (medecins,))]
+    resultats['occupation initiale (%)'] = occupation(medecins) * 100
+
+    debut = time.perf_counter()
+    for i in range(nb_inscriptions):
+        jour = DATE_DEBUT + timedelta(days=hasard.randrange(JOURS))
+        medecin_id = hasard.choice(medecins)
+        ListeAttente.inscrire(
+            hasard.choice(patients), jour, jour + timedelta(days=hasard.randrange(1, 8)),
+            medecin_id=medecin_id if i % 2 else None,
+            specialite=None if i % 2 else specialites[medecin_id],
+            priorite=hasard.randrange(4))
+    resultats['inscrire (ops/s)'] = nb_inscriptions / (time.perf_counter() - debut)
+
+    annulations = hasard.sample(rendez_vous, min(nb_annulations, len(rendez_vous)))
+    ListeAttente.lister()
+    pourvus = 0
+    debut = time.perf_counter()
+    for rdv_id in annulations:
+        succes, message = RendezVous.modifier_statut(rdv_id, 'annule')
+        pourvus += "liste d'attente" in message
+    duree = time.perf_counter() - debut
+    resultats['annulation + réattribution (ops/s)'] = len(annulations) / duree
+    resultats['créneaux réattribués (%)'] = pourvus / len(annulations) * 100
+    resultats['occupation finale (%)'] = occupation(medecins) * 100
+
+    capacite = len(medecins) * JOURS * 16
+    attendue = (capacite - len(annulations) + pourvus) / capacite * 100
+    if abs(resultats['occupation finale (%)'] - attendue) > 1e-9:
+        erreurs.append(f"{config.MOTEUR} : occupation finale {resultats['occupation finale (%)']:.2f} % "
+                       f"au lieu de {attendue:.2f} %")
+    doublons = executer_sql('''
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM rendez_vous
+            WHERE medecin_id = ANY(%s) AND statut <> 'annule'
+            GROUP BY medecin_id, date_rdv, heure_rdv HAVING COUNT(*) > 1
+        ) AS doublons
+    ''', (medecins,))[0][0]
+    if doublons:
+        erreurs.append(f"{config.MOTEUR} : {doublons} créneau(x) réservé(s) deux fois")
+    servies, rdv_servis = executer_sql(
+        "SELECT COUNT(*), COUNT(DISTINCT rdv_id) FROM liste_attente WHERE statut = 'servi' "
+        "AND patient_id = ANY(%s)", (patients,))[0]
+    if servies != pourvus or rdv_servis != pourvus:
+        erreurs.append(f"{config.MOTEUR} : {servies} inscription(s) servie(s) ({rdv_servis} rendez-vous) "
+                       f"pour {pourvus} créneau(x) réattribué(s)")
+
+    nettoyer()
+    return resultats
+
+
+def comparer_parcours(nb_inscriptions=100_000, nb_extractions=2000):
+    """
+    Extraction du meilleur candidat : tas en mémoire contre parcours de toute la liste.
+    """
+    hasard = random.Random(7)
+    maintenant = datetime.now()
+    inscriptions = []
+    for i in range(nb_inscriptions):
+        jour = DATE_DEBUT + timedelta(days=hasard.randrange(JOURS))
+        medecin_id = hasard.randrange(NB_MEDECINS) if i % 2 else None
+        inscriptions.append(InscriptionAttente(
+            i, i, f'Patient {i}', medecin_id, None if i % 2 else SPECIALITES[i % 3],
+            jour, jour + timedelta(days=hasard.randrange(1, 8)), hasard.randrange(4), None,
+            maintenant + timedelta(microseconds=i)))
+    demandes = [(hasard.randrange(NB_MEDECINS), SPECIALITES[hasard.randrange(3)],
+                 DATE_DEBUT + timedelta(days=hasard.randrange(JOURS))) for _ in range(nb_extractions)]
+
+    file = FileAttente(inscriptions)
+    debut = time.perf_counter()
+    for medecin_id, specialite, jour in demandes:
+        file.extraire(medecin_id, specialite, jour)
+    tas = nb_extractions / (time.perf_counter() - debut)
+
+    # Le parcours complet est trop lent pour toutes les demandes : un échantillon suffit
+    restantes = {inscription.id: inscription for inscription in inscriptions}
+    echantillon = demandes[:nb_extractions // 10]
+    debut = time.perf_counter()
+    for medecin_id, specialite, jour in echantillon:
+        eligibles = [inscription for inscription in restantes.values()
+                     if (inscription.medecin_id == medecin_id or inscription.specialite == specialite)
+                     and inscription.date_debut <= jour <= inscription.date_fin]
+        if eligibles:
+            meilleure = min(eligibles, key=lambda x: (-x.priorite, x.date_inscription, x.id))
+            del restantes[meilleure.id]
+    parcours = len(echantillon) / (time.perf_counter() - debut)
+
+    print(f"\nMeilleur candidat parmi {nb_inscriptions} inscriptions : "
+          f"tas {tas:.0f} extractions/s, parcours {parcours:.0f} extractions/s (x{tas / parcours:.0f})")
+
+
+def main(nb_inscriptions, nb_annulations):
+    tableau = {}
+    erreurs = []
+    with tempfile.TemporaryDirectory() as dossier:
+        for moteur in ('sqlite', 'postgresql'):
+            config.MOTEUR = moteur
+            config.SQLITE_CONFIG['chemin'] = os.path.join(dossier, 'bench.sqlite3')
+            fermer_pool()
+            print(f"--- {moteur} ---")
+            resultats = scenario(nb_inscriptions, nb_annulations, erreurs)
+            fermer_pool()
+            if resultats is None:
+                print(f"{moteur} injoignable : ignoré")
+                continue
+            tableau[moteur] = resultats
+
+    moteurs = list(tableau)
+    print(f"\n{'mesure':<42}" + ''.join(f" | {moteur:>12}" for moteur in moteurs))
+    for mesure in next(iter(tableau.values()), {}):
+        print(f"{mesure:<42}" + ''.join(f" | {tableau[moteur][mesure]:>12.2f}" for moteur in moteurs))
+
+    comparer_parcours()
+
+    print()
+    for erreur in erreurs:
+        print(f"✗ {erreur}")
+    if not erreurs:
+        print("✓ Aucun créneau réservé deux fois, chaque réattribution servie une seule fois")
+    return not erreurs
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    succes = main(*(arguments + [NB_INSCRIPTIONS, NB_ANNULATIONS][len(arguments):]))
+    sys.exit(0 if succes else 1)
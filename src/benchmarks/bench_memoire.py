@@ -0,0 +1,50 @@
+"""
+Mémoire occupée par 1M de lignes patients selon leur représentation :
+tuples bruts (ancien format), LignePatient (NamedTuple) et dictionnaires
+(comme l'ancien Utilisateur.authentifier). Ne nécessite pas de base de données.
+
+Usage : python benchmarks/bench_memoire.py [nb_lignes]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.lignes import LignePatient
+
+NB_LIGNES = 1_000_000
+CHAMPS = LignePatient._fields
+
+
+def lignes_brutes(nombre):
+    # Les valeurs sont partagées : seul le coût des conteneurs est mesuré
+    naissance = date(1980, 1, 1)
+    return ((i, 'Diop', 'Awa', naissance, 'F', '771234567', None) for i in range(nombre))
+
+
+def mesurer(nom, construire, nombre):
+    gc.collect()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    lignes = construire(lignes_brutes(nombre))
+    duree = time.perf_counter() - debut
+    taille, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nom:>14} : {taille / 1024 / 1024:8.1f} Mo | {taille / nombre:6.1f} octets/ligne | "
+          f"construction {duree:.2f} s")
+    del lignes
+
+
+def main(nombre):
+    print(f"{nombre} lignes\n")
+    mesurer("tuples", list, nombre)
+    mesurer("LignePatient", lambda lignes: list(map(LignePatient._make, lignes)), nombre)
+    mesurer("dictionnaires", lambda lignes: [dict(zip(CHAMPS, ligne)) for ligne in lignes], nombre)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_LIGNES)
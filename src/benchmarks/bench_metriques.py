@@ -0,0 +1,45 @@
+"""
+Surcoût de l'instrumentation par appel de méthode, désactivée puis activée.
+Mesuré sur une méthode vide : ne nécessite pas de base de données.
+
+Usage : python benchmarks/bench_metriques.py [nb_appels]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import metriques
+
+NB_APPELS = 1_000_000
+
+
+def methode(x):
+    return x
+
+
+def mesurer(fonction, nombre):
+    debut = time.perf_counter()
+    for i in range(nombre):
+        fonction(i)
+    return (time.perf_counter() - debut) / nombre * 1e9
+
+
+def main(nombre):
+    instrumentee = metriques.instrumenter(methode, 'bench.methode')
+
+    reference = mesurer(methode, nombre)
+    desactivee = mesurer(instrumentee, nombre)
+    metriques.activer(seuil_lent_ms=10_000)
+    activee = mesurer(instrumentee, nombre)
+    metriques.desactiver()
+
+    print(f"{nombre} appels\n")
+    print(f"{'sans décorateur':>20} : {reference:7.0f} ns/appel")
+    print(f"{'désactivée':>20} : {desactivee:7.0f} ns/appel (+{desactivee - reference:.0f} ns)")
+    print(f"{'activée':>20} : {activee:7.0f} ns/appel (+{activee - reference:.0f} ns)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_APPELS)
@@ -0,0 +1,152 @@
+"""
+Compare les deux moteurs de stockage (PostgreSQL et SQLite) sur les mêmes appels aux modèles.
+
+Pour chaque moteur : temps d'ouverture de la base (première connexion, schéma compris
+pour SQLite), puis écritures unitaires, écritures par lot et lectures courantes.
+Les caches sont vidés avant chaque lecture : on mesure l'accès à la base.
+La base SQLite est un fichier temporaire ; sur PostgreSQL, les données de test sont
+supprimées à la fin. PostgreSQL est ignoré s'il est injoignable.
+
+Usage : python benchmarks/bench_moteurs.py [nb_patients] [nb_rendez_vous]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as heure, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import config
+from database.config import get_connection, close_connection, fermer_pool
+from models.patient import Patient
+from models.rendez_vous import RendezVous
+from models.utilisateur import Utilisateur
+from utils.cache import CACHES
+
+NB_PATIENTS = 500
+NB_RENDEZ_VOUS = 2000
+EMAIL_MEDECIN = 'bench.moteurs@clinique.sn'
+DATE_DEBUT = date(2099, 1, 5)
+
+
+def creneau(i):
+    return DATE_DEBUT + timedelta(days=i // 16), heure(8 + (i % 16) // 2, 30 * (i % 2))
+
+
+def chronometrer(fonction, repetitions):
+    """
+    Médiane (ms) de `repetitions` appels fonction(i), caches vidés avant chacun.
+    """
+    durees = []
+    for i in range(repetitions):
+        for cache in CACHES.values():
+            cache.vider()
+        debut = time.perf_counter()
+        fonction(i)
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+def executer_sql(requete, params=()):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(requete, params)
+        lignes = cursor.fetchall() if cursor.description else None
+        connection.commit()
+        return lignes
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def nettoyer():
+    executer_sql("DELETE FROM patients WHERE nom = 'BenchMoteur'")
+    executer_sql("DELETE FROM utilisateurs WHERE email = %s", (EMAIL_MEDECIN,))
+
+
+def scenario(nb_patients, nb_rdv):
+    """
+    Exécute les mesures sur le moteur courant ; retourne {mesure: valeur}.
+    """
+    resultats = {}
+
+    debut = time.perf_counter()
+    connection = get_connection()
+    resultats['ouverture de la base (ms)'] = (time.perf_counter() - debut) * 1000
+    if not connection:
+        return None
+    close_connection(connection)
+    nettoyer()
+
+    Utilisateur.ajouter_utilisateur('Bench', 'Moteur', EMAIL_MEDECIN, 'bench', 'medecin', 'Bench')
+    medecin_id = executer_sql("SELECT id FROM utilisateurs WHERE email = %s", (EMAIL_MEDECIN,))[0][0]
+
+    debut = time.perf_counter()
+    for i in range(nb_patients):
+        Patient.ajouter_patient('BenchMoteur', f'Patient {i}', '1990-01-01', 'F', f'77{i:07d}')
+    resultats['ajouter_patient (ops/s)'] = nb_patients / (time.perf_counter() - debut)
+    patients = [ligne[0] for ligne in
+                executer_sql("SELECT id FROM patients WHERE nom = 'BenchMoteur' ORDER BY id")]
+
+    debut = time.perf_counter()
+    for i in range(nb_rdv // 2):
+        RendezVous.reserver(patients[i % len(patients)], medecin_id, *creneau(i))
+    resultats['reserver (ops/s)'] = nb_rdv // 2 / (time.perf_counter() - debut)
+
+    lot = [(patients[i % len(patients)], medecin_id, *creneau(i))
+           for i in range(nb_rdv // 2, nb_rdv)]
+    debut = time.perf_counter()
+    RendezVous.creer_en_masse(lot)
+    resultats['creer_en_masse (rendez-vous/s)'] = len(lot) / (time.perf_counter() - debut)
+
+    def patient(i):
+        return patients[i % len(patients)]
+
+    lectures = [
+        ('obtenir_patient', lambda i: Patient.obtenir_patient(patient(i))),
+        ('dossier_complet', lambda i: Patient.dossier_complet(patient(i))),
+        ('rechercher_patient (nom)', lambda i: Patient.rechercher_patient(f'patient {i}')),
+        ('rechercher_patient (téléphone)', lambda i: Patient.rechercher_patient(f'77{i:05d}')),
+        ('lister_patients_page', lambda i: Patient.lister_patients_page(50)),
+        ('lister_rendez_vous (patient)',
+         lambda i: RendezVous.lister_rendez_vous('patient', patient(i))),
+        ('rechercher_rendez_vous (médecin)',
+         lambda i: RendezVous.rechercher_rendez_vous(medecin_id=medecin_id, date_debut=DATE_DEBUT)),
+        ('creneaux_disponibles (14 jours)',
+         lambda i: RendezVous.creneaux_disponibles(medecin_id, DATE_DEBUT, DATE_DEBUT + timedelta(days=13))),
+        ('lister_medecins', lambda i: Utilisateur.lister_medecins()),
+    ]
+    for nom, lecture in lectures:
+        resultats[f'{nom} (ms)'] = chronometrer(lecture, 50)
+
+    nettoyer()
+    return resultats
+
+
+def main(nb_patients, nb_rdv):
+    tableau = {}
+    with tempfile.TemporaryDirectory() as dossier:
+        for moteur in ('sqlite', 'postgresql'):
+            config.MOTEUR = moteur
+            config.SQLITE_CONFIG['chemin'] = os.path.join(dossier, 'bench.sqlite3')
+            fermer_pool()
+            print(f"--- {moteur} ---")
+            resultats = scenario(nb_patients, nb_rdv)
+            fermer_pool()
+            if resultats is None:
+                print(f"{moteur} injoignable : ignoré")
+                continue
+            tableau[moteur] = resultats
+
+    moteurs = list(tableau)
+    print(f"\n{'mesure':<42}" + ''.join(f" | {moteur:>12}" for moteur in moteurs))
+    for mesure in next(iter(tableau.values()), {}):
+        print(f"{mesure:<42}" + ''.join(f" | {tableau[moteur][mesure]:>12.2f}" for moteur in moteurs))
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    main(*(arguments + [NB_PATIENTS, NB_RENDEZ_VOUS][len(arguments):]))
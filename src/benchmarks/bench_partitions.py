@@ -0,0 +1,135 @@
+"""
+Latence de lister_rendez_vous('medecin', id) selon la profondeur de l'historique.
+
+L'historique est ajouté année par année (NB_MEDECINS médecins, 16 créneaux par jour
+ouvré) dans une transaction annulée à la fin. Pour chaque taille, trois mesures :
+  - complet    : tout l'historique du médecin (comportement par défaut) ;
+  - depuis     : depuis=aujourd'hui - 90 jours, seules les partitions récentes sont lues ;
+  - archivé    : historique complet après archivage des rendez-vous de plus
+                 de ANCIENNETE_ARCHIVAGE jours (rendez_vous ne garde que les lignes chaudes).
+Prérequis : base initialisée avec init_db (rendez_vous partitionnée).
+
+Usage : python benchmarks/bench_partitions.py [nb_annees]
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from database.partitions import ANCIENNETE_ARCHIVAGE, archiver_periode, creer_partitions
+from models.rendez_vous import SELECT_RENDEZ_VOUS
+
+NB_ANNEES = 10
+NB_MEDECINS = 20
+REPETITIONS = 20
+
+REQUETE_MEDECIN = SELECT_RENDEZ_VOUS + '''
+    WHERE r.medecin_id = %s
+    ORDER BY date_rdv DESC, heure_rdv DESC
+'''
+
+REQUETE_MEDECIN_DEPUIS = SELECT_RENDEZ_VOUS + '''
+    WHERE r.medecin_id = %s AND r.date_rdv >= %s
+    ORDER BY date_rdv DESC, heure_rdv DESC
+'''
+
+
+def preparer(cursor):
+    """
+    Crée les médecins et le patient de test ; retourne (medecins, patient_id).
+    """
+    cursor.execute('''
+        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite)
+        SELECT 'Bench', 'Medecin ' || g, 'bench.partitions.' || g || '@clinique.sn', '-',
+               'medecin', 'Généraliste'
+        FROM generate_series(1, %s) AS g
+        RETURNING id
+    ''', (NB_MEDECINS,))
+    medecins = [ligne[0] for ligne in cursor.fetchall()]
+    cursor.execute('''
+        INSERT INTO patients (nom, prenom, date_naissance, telephone)
+        VALUES ('Bench', 'Patient', '1980-01-01', '770000000')
+        RETURNING id
+    ''')
+    return medecins, cursor.fetchone()[0]
+
+
+def ajouter_annee(cursor, medecins, patient_id, debut, fin):
+    """
+    Ajoute les rendez-vous des jours ouvrés de [debut, fin) pour chaque médecin.
+    """
+    creer_partitions(cursor, debut, fin)
+    cursor.execute('''
+        INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, statut)
+        SELECT %s, m, j::date, TIME '08:00' + c * INTERVAL '30 minutes',
+               CASE WHEN j >= CURRENT_DATE THEN 'planifie'
+                    WHEN c %% 10 = 0 THEN 'annule'
+                    ELSE 'termine' END
+        FROM unnest(%s::int[]) AS m,
+             generate_series(%s::date, %s::date - 1, INTERVAL '1 day') AS j,
+             generate_series(0, 15) AS c
+        WHERE extract(isodow FROM j) < 6
+    ''', (patient_id, medecins, debut, fin))
+    cursor.execute("ANALYZE rendez_vous")
+
+
+def mesurer(cursor, requete, params):
+    """
+    Retourne (latence médiane en ms, nombre de lignes).
+    """
+    durees = []
+    for _ in range(REPETITIONS):
+        debut = time.perf_counter()
+        cursor.execute(requete, params)
+        lignes = cursor.fetchall()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees), len(lignes)
+
+
+def main(nb_annees):
+    connection = get_connection()
+    if not connection:
+        return
+
+    try:
+        cursor = connection.cursor()
+        medecins, patient_id = preparer(cursor)
+        medecin = medecins[0]
+        aujourd_hui = date.today()
+        depuis = aujourd_hui - timedelta(days=90)
+        limite_archivage = aujourd_hui - timedelta(days=ANCIENNETE_ARCHIVAGE)
+
+        # Un mois de rendez-vous à venir, présent quelle que soit la profondeur de l'historique
+        ajouter_annee(cursor, medecins, patient_id, aujourd_hui, aujourd_hui + timedelta(days=30))
+
+        print(f"{'historique':>10} | {'lignes':>9} | {'complet (ms)':>12} | "
+              f"{'depuis (ms)':>11} | {'archivé (ms)':>12}")
+        print("-" * 66)
+
+        for annee in range(1, nb_annees + 1):
+            fin = aujourd_hui - timedelta(days=365 * (annee - 1))
+            ajouter_annee(cursor, medecins, patient_id, fin - timedelta(days=365), fin)
+
+            complet, lignes = mesurer(cursor, REQUETE_MEDECIN, (medecin,))
+            recent, _ = mesurer(cursor, REQUETE_MEDECIN_DEPUIS, (medecin, depuis))
+
+            cursor.execute("SAVEPOINT archivage")
+            archiver_periode(cursor, date(1900, 1, 1), limite_archivage)
+            cursor.execute("ANALYZE rendez_vous")
+            archive, _ = mesurer(cursor, REQUETE_MEDECIN, (medecin,))
+            cursor.execute("ROLLBACK TO SAVEPOINT archivage")
+
+            print(f"{annee:>8} an | {lignes:>9} | {complet:>12.2f} | {recent:>11.2f} | {archive:>12.2f}")
+
+    finally:
+        connection.rollback()
+        cursor.close()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_ANNEES)
@@ -0,0 +1,95 @@
+"""
+Latence par appel des requêtes fréquentes, texte SQL envoyé à chaque fois
+(cursor.execute) ou instruction préparée (database.preparees.executer).
+
+Les requêtes sont exécutées sur une même connexion du pool, sur des lignes
+existantes. La réservation vise un créneau déjà pris (chemin de la vérification
+de conflit) ; la transaction est annulée à la fin.
+
+Usage : python benchmarks/bench_preparees.py [nb_appels]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from database.preparees import INSTRUCTIONS, executer
+import models.patient  # noqa: F401  (enregistre les instructions des modèles)
+import models.rendez_vous  # noqa: F401
+import models.utilisateur  # noqa: F401
+
+NB_APPELS = 2000
+
+
+def parametres(cursor):
+    """
+    Paramètres de chaque instruction, pris dans la base ; None si les données manquent.
+    """
+    cursor.execute("SELECT id FROM patients LIMIT 1")
+    patient = cursor.fetchone()
+    cursor.execute("SELECT id, email FROM utilisateurs WHERE role = 'medecin' LIMIT 1")
+    medecin = cursor.fetchone()
+    if not patient or not medecin:
+        return None
+
+    reservation = {'patient_id': patient[0], 'medecin_id': medecin[0],
+                   'date_rdv': '2099-01-05', 'heure_rdv': '09:00', 'motif': None}
+    # Premier appel : le créneau est pris, les suivants tombent sur le conflit
+    cursor.execute(INSTRUCTIONS['reserver'][0], reservation)
+    return {
+        'obtenir_patient': (patient[0],),
+        'authentifier': (medecin[1],),
+        'lister_medecins': (),
+        'reserver': reservation,
+    }
+
+
+def mesurer(cursor, executer_requete, nb_appels):
+    """
+    Retourne (médiane, p95) de la latence d'un appel en microsecondes.
+    """
+    durees = []
+    for _ in range(nb_appels):
+        debut = time.perf_counter()
+        executer_requete()
+        cursor.fetchall()
+        durees.append((time.perf_counter() - debut) * 1_000_000)
+    durees.sort()
+    return statistics.median(durees), durees[int(len(durees) * 0.95) - 1]
+
+
+def main(nb_appels):
+    connection = get_connection()
+    if not connection:
+        return
+
+    try:
+        cursor = connection.cursor()
+        jeux = parametres(cursor)
+        if jeux is None:
+            print("Il faut au moins un patient et un médecin en base")
+            return
+
+        print(f"{nb_appels} appels par requête\n")
+        print(f"{'requête':>16} | {'texte médiane':>13} | {'texte p95':>9} | "
+              f"{'préparée médiane':>16} | {'préparée p95':>12}   (µs)")
+        print("-" * 82)
+
+        for nom, params in jeux.items():
+            requete = INSTRUCTIONS[nom][0]
+            texte = mesurer(cursor, lambda: cursor.execute(requete, params), nb_appels)
+            preparee = mesurer(cursor, lambda: executer(cursor, nom, params), nb_appels)
+            print(f"{nom:>16} | {texte[0]:>13.0f} | {texte[1]:>9.0f} | "
+                  f"{preparee[0]:>16.0f} | {preparee[1]:>12.0f}")
+
+    finally:
+        connection.rollback()
+        cursor.close()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_APPELS)
@@ -0,0 +1,119 @@
+"""
+Compare la recherche de patients historique (ILIKE '%x%' sans index)
+à la recherche indexée (pg_trgm + préfixe téléphone) sur 10k / 100k / 1M lignes.
+
+Les données sont générées dans une table temporaire : la table patients n'est pas modifiée.
+Prérequis : base initialisée avec init_db (extensions pg_trgm / unaccent et f_unaccent).
+
+Usage : python benchmarks/bench_recherche.py [taille ...]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+
+TAILLES = [10_000, 100_000, 1_000_000]
+REPETITIONS = 20
+TERMES = ['diop', 'ndiaye', 'fall', 'seck']
+PREFIXES_TEL = ['77123', '7654']
+
+REQUETE_ACTUELLE = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM bench_patients
+    WHERE nom ILIKE %s OR prenom ILIKE %s OR telephone LIKE %s
+    ORDER BY nom, prenom
+'''
+
+REQUETE_TRGM = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM bench_patients
+    WHERE f_unaccent(nom || ' ' || prenom) ILIKE '%%' || f_unaccent(%s) || '%%'
+    ORDER BY similarity(f_unaccent(nom || ' ' || prenom), f_unaccent(%s)) DESC, nom, prenom
+    LIMIT 50
+'''
+
+REQUETE_PREFIXE = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM bench_patients
+    WHERE telephone LIKE %s
+    ORDER BY telephone, nom, prenom
+    LIMIT 50
+'''
+
+
+def generer_table(cursor, taille):
+    """
+    (Re)crée la table temporaire bench_patients avec `taille` lignes synthétiques.
+    """
+    cursor.execute("DROP TABLE IF EXISTS bench_patients")
+    cursor.execute('''
+        CREATE TEMP TABLE bench_patients AS
+        SELECT g AS id,
+               (ARRAY['Diop','Ndiaye','Fall','Sène','Faye','Sarr','Gueye','Ba','Mbaye','Cissé'])[1 + g %% 10]
+                   || (g / 10)::text AS nom,
+               (ARRAY['Awa','Moussa','Fatou','Ibrahima','Aïssatou','Cheikh','Mariama','Ousmane'])[1 + g %% 8]
+                   AS prenom,
+               DATE '1950-01-01' + (g %% 25000) AS date_naissance,
+               (ARRAY['M','F'])[1 + g %% 2] AS sexe,
+               (ARRAY['77','76','78','70'])[1 + g %% 4] || lpad((g * 7919 %% 10000000)::text, 7, '0')
+                   AS telephone,
+               NULL::varchar AS email
+        FROM generate_series(1, %s) AS g
+    ''', (taille,))
+    cursor.execute("ANALYZE bench_patients")
+
+
+def mesurer(cursor, requete, jeux_parametres):
+    """
+    Retourne la latence médiane (ms) d'une requête sur plusieurs jeux de paramètres.
+    """
+    durees = []
+    for _ in range(REPETITIONS):
+        for params in jeux_parametres:
+            debut = time.perf_counter()
+            cursor.execute(requete, params)
+            cursor.fetchall()
+            durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+def main(tailles):
+    connection = get_connection()
+    if not connection:
+        return
+
+    try:
+        cursor = connection.cursor()
+        print(f"{'lignes':>10} | {'actuelle (ms)':>14} | {'trgm (ms)':>10} | {'préfixe tél (ms)':>16}")
+        print("-" * 60)
+
+        for taille in tailles:
+            generer_table(cursor, taille)
+
+            motifs = [(f"%{t}%", f"%{t}%", f"%{t}%") for t in TERMES + PREFIXES_TEL]
+            actuelle = mesurer(cursor, REQUETE_ACTUELLE, motifs)
+
+            cursor.execute('''
+                CREATE INDEX ON bench_patients
+                USING GIN (f_unaccent(nom || ' ' || prenom) gin_trgm_ops)
+            ''')
+            cursor.execute("CREATE INDEX ON bench_patients (telephone text_pattern_ops)")
+            cursor.execute("ANALYZE bench_patients")
+
+            trgm = mesurer(cursor, REQUETE_TRGM, [(t, t) for t in TERMES])
+            prefixe = mesurer(cursor, REQUETE_PREFIXE, [(f"{p}%",) for p in PREFIXES_TEL])
+
+            print(f"{taille:>10} | {actuelle:>14.2f} | {trgm:>10.2f} | {prefixe:>16.2f}")
+
+        connection.rollback()
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    main([int(t) for t in sys.argv[1:]] or TAILLES)
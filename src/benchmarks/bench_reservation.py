@@ -0,0 +1,197 @@
+"""
+Test de charge des réservations concurrentes.
+
+Plusieurs threads (des "secrétaires") tentent de réserver les mêmes créneaux en même temps.
+Le script vérifie qu'aucun créneau n'est réservé deux fois, puis compare le débit de
+l'ancienne réservation en 4 requêtes à la réservation atomique RendezVous.reserver().
+
+Un médecin et des patients de test sont créés puis supprimés à la fin.
+
+Usage : python benchmarks/bench_reservation.py [nb_threads] [nb_creneaux]
+"""
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, time as heure, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from models.rendez_vous import RendezVous, RESERVATION_OK
+
+NB_THREADS = 8
+NB_CRENEAUX = 500
+DATE_DEBUT = date(2099, 1, 1)
+
+
+def reserver_ancienne_methode(patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+    """
+    Réplique de l'ancienne réservation : 3 vérifications puis l'INSERT.
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM patients WHERE id = %s", (patient_id,))
+        if not cursor.fetchone():
+            return False
+        cursor.execute("SELECT id FROM utilisateurs WHERE id = %s AND role = 'medecin'", (medecin_id,))
+        if not cursor.fetchone():
+            return False
+        cursor.execute('''
+            SELECT id FROM rendez_vous
+            WHERE medecin_id = %s AND date_rdv = %s AND heure_rdv = %s
+            AND statut != 'annule'
+        ''', (medecin_id, date_rdv, heure_rdv))
+        if cursor.fetchone():
+            return False
+        cursor.execute('''
+            INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, motif)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', (patient_id, medecin_id, date_rdv, heure_rdv, motif))
+        connection.commit()
+        return True
+    except Exception:
+        # Conflit détecté par l'index unique entre la vérification et l'INSERT
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def reserver_atomique(patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+    code, _ = RendezVous.reserver(patient_id, medecin_id, date_rdv, heure_rdv, motif)
+    return code == RESERVATION_OK
+
+
+def creer_donnees_test(nb_patients):
+    """
+    Crée un médecin et des patients de test ; retourne (medecin_id, [patient_id, ...]).
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role)
+            VALUES ('Bench', 'Medecin', 'bench.reservation@clinique.sn', '-', 'medecin')
+            RETURNING id
+        ''')
+        medecin_id = cursor.fetchone()[0]
+        cursor.execute('''
+            INSERT INTO patients (nom, prenom, date_naissance, telephone)
+            SELECT 'Bench', 'Patient ' || g, DATE '1980-01-01', '770000000'
+            FROM generate_series(1, %s) AS g
+            RETURNING id
+        ''', (nb_patients,))
+        patients = [ligne[0] for ligne in cursor.fetchall()]
+        connection.commit()
+        return medecin_id, patients
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def supprimer_donnees_test(medecin_id, patients):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM patients WHERE id = ANY(%s)", (patients,))
+        cursor.execute("DELETE FROM utilisateurs WHERE id = %s", (medecin_id,))
+        connection.commit()
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def compter_doublons(medecin_id):
+    """
+    Nombre de créneaux ayant plus d'un rendez-vous actif.
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM rendez_vous
+                WHERE medecin_id = %s AND statut <> 'annule'
+                GROUP BY date_rdv, heure_rdv
+                HAVING COUNT(*) > 1
+            ) AS doublons
+        ''', (medecin_id,))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def vider_rendez_vous(medecin_id):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM rendez_vous WHERE medecin_id = %s", (medecin_id,))
+        connection.commit()
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def executer(fonction, medecin_id, patients, creneaux, nb_threads):
+    """
+    Lance nb_threads threads qui tentent tous les créneaux dans un ordre aléatoire.
+    Retourne (reservations_reussies, tentatives, duree_secondes).
+    """
+    reussites = []
+    depart = threading.Barrier(nb_threads)
+
+    def travail(numero):
+        ordre = creneaux[:]
+        random.Random(numero).shuffle(ordre)
+        patient_id = patients[numero]
+        depart.wait()
+        succes = sum(1 for d, h in ordre if fonction(patient_id, medecin_id, d, h))
+        reussites.append(succes)
+
+    threads = [threading.Thread(target=travail, args=(i,)) for i in range(nb_threads)]
+    debut = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duree = time.perf_counter() - debut
+    return sum(reussites), nb_threads * len(creneaux), duree
+
+
+def main(nb_threads, nb_creneaux):
+    creneaux = [
+        (DATE_DEBUT + timedelta(days=i // 16), heure(8 + (i % 16) // 2, 30 * (i % 2)))
+        for i in range(nb_creneaux)
+    ]
+    medecin_id, patients = creer_donnees_test(nb_threads)
+    succes = True
+
+    try:
+        # L'ancienne méthode sert de témoin : ses doubles réservations sont attendues
+        for nom, fonction, verifiee in [("4 requêtes", reserver_ancienne_methode, False),
+                                        ("atomique", reserver_atomique, True)]:
+            vider_rendez_vous(medecin_id)
+            reussies, tentatives, duree = executer(fonction, medecin_id, patients, creneaux, nb_threads)
+            doublons = compter_doublons(medecin_id)
+            print(f"{nom:>10} : {reussies}/{len(creneaux)} créneaux réservés, "
+                  f"{doublons} doublon(s), {tentatives / duree:.0f} tentatives/s")
+            if doublons or reussies != len(creneaux):
+                if verifiee:
+                    print("  ✗ ÉCHEC : chaque créneau doit être réservé exactement une fois")
+                    succes = False
+                else:
+                    print("  (attendu : la vérification et l'insertion ne sont pas atomiques)")
+    finally:
+        supprimer_donnees_test(medecin_id, patients)
+    return succes
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    succes = main(*(arguments + [NB_THREADS, NB_CRENEAUX][len(arguments):]))
+    sys.exit(0 if succes else 1)
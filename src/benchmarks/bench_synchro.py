@@ -0,0 +1,188 @@
+"""
+Vérifie et mesure la synchronisation des répliques (database/synchro.py) sans serveur.
+
+Une base SQLite tient le rôle de la base centrale, deux autres celui des répliques
+de deux sites. Chaque site travaille hors ligne à travers les modèles (patients,
+réservations dont certaines sur les mêmes créneaux que l'autre site), puis les sites
+se synchronisent dans un ordre puis dans l'autre. On vérifie que les trois bases
+convergent, qu'aucun créneau n'a deux rendez-vous actifs, et que seules les lignes
+modifiées circulent ; on mesure le débit d'envoi et de réception.
+
+Usage : python benchmarks/bench_synchro.py [nb_patients] [nb_rendez_vous]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as heure, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import config
+from database.config import get_connection, close_connection, fermer_pool
+from database.sqlite import ouvrir, creer_schema
+from database.synchro import (
+    SELECT_SYNCHRO, TABLES_SYNCHRO, preparer_sqlite, initialiser, pousser, tirer
+)
+from models.patient import Patient
+from models.rendez_vous import RendezVous
+
+NB_PATIENTS = 1000
+NB_RENDEZ_VOUS = 2000
+NB_MODIFICATIONS = 10
+EMAIL_MEDECIN = 'bench.synchro@clinique.sn'
+DATE_DEBUT = date(2099, 1, 5)
+
+
+def creneau(i):
+    return DATE_DEBUT + timedelta(days=i // 16), heure(8 + (i % 16) // 2, 30 * (i % 2))
+
+
+def ouvrir_site(dossier, site):
+    """
+    Fait d'un fichier SQLite du dossier la base de l'application (pool des modèles).
+    """
+    fermer_pool()
+    config.SQLITE_CONFIG['chemin'] = os.path.join(dossier, f'{site}.sqlite3')
+    connection = get_connection()
+    preparer_sqlite(connection)
+    return connection
+
+
+def ids(requete, params=()):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(requete, params)
+        return [ligne[0] for ligne in cursor.fetchall()]
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def travailler_hors_ligne(site, nb_patients, nb_rdv, decalage):
+    """
+    Écritures d'un site à travers les modèles ; les créneaux à partir de `decalage`
+    recouvrent en partie ceux de l'autre site.
+    """
+    for i in range(nb_patients):
+        Patient.ajouter_patient('BenchSynchro', f'{site} {i}', '1990-01-01', 'F', f'77{i:07d}')
+    patients = ids("SELECT id FROM patients WHERE prenom LIKE %s ORDER BY id", (f'{site} %',))
+    medecin_id = ids("SELECT id FROM utilisateurs WHERE email = %s", (EMAIL_MEDECIN,))[0]
+    for i in range(nb_rdv):
+        RendezVous.reserver(patients[i % len(patients)], medecin_id, *creneau(i + decalage))
+    return patients
+
+
+def etat(connection):
+    """
+    Contenu synchronisé d'une base, indépendant des identifiants locaux.
+    """
+    cursor = connection.cursor()
+    contenu = {}
+    for table, _ in TABLES_SYNCHRO:
+        cursor.execute(SELECT_SYNCHRO[table])
+        contenu[table] = sorted(map(tuple, cursor.fetchall()))
+    cursor.close()
+    return contenu
+
+
+def creneaux_en_double(connection):
+    cursor = connection.cursor()
+    cursor.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT medecin_id, date_rdv, heure_rdv FROM rendez_vous
+            WHERE statut <> 'annule'
+            GROUP BY medecin_id, date_rdv, heure_rdv HAVING COUNT(*) > 1
+        ) AS doublons
+    ''')
+    nombre = cursor.fetchone()[0]
+    cursor.close()
+    return nombre
+
+
+def synchroniser(replique, centrale, site):
+    debut = time.perf_counter()
+    envoyees, conflits_envoi = pousser(replique, centrale, site)
+    duree_envoi = time.perf_counter() - debut
+    debut = time.perf_counter()
+    recues, conflits_reception = tirer(replique, centrale, site)
+    duree_reception = time.perf_counter() - debut
+    print(f"{site:<8} | envoyées {envoyees:6d} ({envoyees / duree_envoi:9.0f} lignes/s)"
+          f" | reçues {recues:6d} ({recues / duree_reception if recues else 0:9.0f} lignes/s)"
+          f" | conflits {conflits_envoi + conflits_reception}")
+    return envoyees, recues
+
+
+def main(nb_patients, nb_rdv):
+    config.MOTEUR = 'sqlite'
+    erreurs = []
+    with tempfile.TemporaryDirectory() as dossier:
+        centrale = ouvrir(os.path.join(dossier, 'centrale.sqlite3'))
+        creer_schema(centrale)
+        preparer_sqlite(centrale)
+        centrale.execute('''
+            INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite)
+            VALUES ('Bench', 'Synchro', ?, 'bench', 'medecin', 'Bench')
+        ''', (EMAIL_MEDECIN,))
+        centrale.commit()
+
+        repliques = {}
+        for site, decalage in (('site-a', 0), ('site-b', nb_rdv // 2)):
+            connection = ouvrir_site(dossier, site)
+            initialiser(connection, centrale)
+            close_connection(connection)
+            debut = time.perf_counter()
+            patients = travailler_hors_ligne(site, nb_patients, nb_rdv, decalage)
+            print(f"{site:<8} | hors ligne : {nb_patients} patients, {nb_rdv} réservations "
+                  f"en {time.perf_counter() - debut:.2f} s")
+            fermer_pool()
+            repliques[site] = (ouvrir(config.SQLITE_CONFIG['chemin']), patients)
+
+        print("\n--- Synchronisation (site-b puis site-a, puis site-b) ---")
+        a, b = repliques['site-a'][0], repliques['site-b'][0]
+        synchroniser(b, centrale, 'site-b')
+        synchroniser(a, centrale, 'site-a')
+        synchroniser(b, centrale, 'site-b')
+
+        reference = etat(centrale)
+        for site, (connection, _) in repliques.items():
+            if etat(connection) != reference:
+                erreurs.append(f"{site} diffère de la base centrale")
+        for nom, connection in (('centrale', centrale), ('site-a', a), ('site-b', b)):
+            if creneaux_en_double(connection):
+                erreurs.append(f"{nom} : créneau occupé deux fois")
+        actifs = sum(1 for ligne in reference['rendez_vous'] if ligne[6] != 'annule')
+        print(f"rendez-vous : {len(reference['rendez_vous'])} dont {actifs} actifs "
+              f"(créneaux distincts attendus : {nb_rdv + nb_rdv // 2})")
+        if actifs != nb_rdv + nb_rdv // 2:
+            erreurs.append("nombre de rendez-vous actifs inattendu")
+
+        print(f"\n--- Incrément : {NB_MODIFICATIONS} patients modifiés sur site-a ---")
+        fermer_pool()
+        config.SQLITE_CONFIG['chemin'] = os.path.join(dossier, 'site-a.sqlite3')
+        for patient_id in repliques['site-a'][1][:NB_MODIFICATIONS]:
+            Patient.modifier_patient(patient_id, adresse='Nouvelle adresse')
+        fermer_pool()
+        envoyees, _ = synchroniser(a, centrale, 'site-a')
+        _, recues = synchroniser(b, centrale, 'site-b')
+        if (envoyees, recues) != (NB_MODIFICATIONS, NB_MODIFICATIONS):
+            erreurs.append(f"incrément : {envoyees} envoyées, {recues} reçues")
+        if etat(b) != etat(centrale):
+            erreurs.append("site-b diffère de la base centrale après l'incrément")
+
+        for connection in (a, b, centrale):
+            connection.close()
+
+    print()
+    for erreur in erreurs:
+        print(f"✗ {erreur}")
+    if not erreurs:
+        print("✓ Les trois bases ont convergé")
+    return not erreurs
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    succes = main(*(arguments + [NB_PATIENTS, NB_RENDEZ_VOUS][len(arguments):]))
+    sys.exit(0 if succes else 1)
@@ -0,0 +1,227 @@
+"""
+Vérifie et mesure les tâches de fond (database/taches.py).
+
+Pour chaque moteur : des milliers de tâches sont mises en file puis exécutées par
+plusieurs threads travailleurs ; on vérifie que chaque tâche a été exécutée une seule
+fois et on mesure le débit. On vérifie aussi la reprise d'une tâche qui échoue
+(délai croissant puis abandon), le bail (prolongé pendant une tâche longue, tâche
+abandonnée quand son travailleur disparaît à la dernière tentative), la
+planification sans doublon des tâches périodiques et le fichier de rappels des
+rendez-vous de demain.
+
+La base SQLite est un fichier temporaire ; sur PostgreSQL, les données de test sont
+supprimées à la fin. PostgreSQL est ignoré s'il est injoignable.
+
+Usage : python benchmarks/bench_taches.py [nb_taches] [nb_travailleurs]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, time as heure, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import config, taches
+from database.config import get_connection, close_connection, fermer_pool
+from database.taches import TACHES_FOND, tache, planifier, executer_une, planifier_periodiques
+from models.patient import Patient
+from models.rendez_vous import RendezVous
+from models.utilisateur import Utilisateur
+
+NB_TACHES = 2000
+NB_TRAVAILLEURS = 4
+NB_RAPPELS = 50
+EMAIL_MEDECIN = 'bench.taches@clinique.sn'
+
+executions = Counter()
+_verrou = threading.Lock()
+
+
+@tache('bench.compter')
+def compter(numero):
+    with _verrou:
+        executions[numero] += 1
+    return True, "ok"
+
+
+@tache('bench.longue')
+def longue(duree):
+    with _verrou:
+        executions['longue'] += 1
+    time.sleep(duree)
+    return True, "ok"
+
+
+@tache('bench.echouer')
+def echouer():
+    raise RuntimeError("échec volontaire")
+
+
+def executer_sql(requete, params=()):
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(requete, params)
+        lignes = cursor.fetchall() if cursor.description else None
+        connection.commit()
+        return lignes
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def nettoyer():
+    executer_sql("DELETE FROM taches WHERE nom LIKE %s OR cle_unicite IS NOT NULL", ('bench.%',))
+    executer_sql("DELETE FROM patients WHERE nom = 'BenchTaches'")
+    executer_sql("DELETE FROM utilisateurs WHERE email = %s", (EMAIL_MEDECIN,))
+    executions.clear()
+
+
+def vider_file(nb_travailleurs):
+    """
+    Exécute toutes les tâches dues avec `nb_travailleurs` threads ; retourne la durée.
+    """
+    def travailler():
+        while executer_une():
+            pass
+
+    threads = [threading.Thread(target=travailler) for _ in range(nb_travailleurs)]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - debut
+
+
+def scenario(nb_taches, nb_travailleurs, erreurs):
+    """
+    Exécute les vérifications sur le moteur courant ; retourne {mesure: valeur}.
+    """
+    connection = get_connection()
+    if not connection:
+        return None
+    close_connection(connection)
+    nettoyer()
+    resultats = {}
+
+    debut = time.perf_counter()
+    for numero in range(nb_taches):
+        planifier('bench.compter', {'numero': numero})
+    resultats['planifier (tâches/s)'] = nb_taches / (time.perf_counter() - debut)
+
+    duree = vider_file(nb_travailleurs)
+    resultats[f'exécuter, {nb_travailleurs} threads (tâches/s)'] = nb_taches / duree
+    if len(executions) != nb_taches or set(executions.values()) != {1}:
+        erreurs.append(f"{config.MOTEUR} : {len(executions)} tâches exécutées, "
+                       f"{sum(executions.values()) - len(executions)} en double")
+
+    # Reprise : 3 tentatives, chaque échec repousse la tâche ; on avance l'horloge à la main
+    planifier('bench.echouer', max_tentatives=3)
+    delais = []
+    for _ in range(3):
+        executer_sql("UPDATE taches SET executer_apres = %s WHERE nom = 'bench.echouer' AND statut = 'en_attente'",
+                     (datetime.now() - timedelta(seconds=1),))
+        executer_une()
+        statut, executer_apres, erreur = executer_sql(
+            "SELECT statut, executer_apres, derniere_erreur FROM taches WHERE nom = 'bench.echouer'")[0]
+        delais.append((executer_apres - datetime.now()).total_seconds())
+    if statut != 'echouee' or 'échec volontaire' not in erreur or not delais[1] > delais[0] > 0:
+        erreurs.append(f"{config.MOTEUR} : reprise incorrecte ({statut}, délais {delais})")
+
+    # Tâche plus longue que son bail : prolongée, donc jamais reprise par un autre travailleur
+    duree_bail, taches.DUREE_BAIL = taches.DUREE_BAIL, 0.6
+    executions.clear()
+    planifier('bench.longue', {'duree': 2})
+    travailleur = threading.Thread(target=executer_une)
+    travailleur.start()
+    time.sleep(0.1)
+    while travailleur.is_alive():
+        executer_une()
+        time.sleep(0.1)
+    statut = executer_sql("SELECT statut FROM taches WHERE nom = 'bench.longue'")[0][0]
+    if executions['longue'] != 1 or statut != 'terminee':
+        erreurs.append(f"{config.MOTEUR} : tâche longue exécutée {executions['longue']} fois ({statut})")
+
+    # Travailleur disparu pendant la dernière tentative : la tâche est abandonnée
+    planifier('bench.compter', {'numero': -1}, max_tentatives=1)
+    executer_sql("UPDATE taches SET statut = 'en_cours', tentatives = 1, bail = %s "
+                 "WHERE nom = 'bench.compter' AND statut = 'en_attente'",
+                 (datetime.now() - timedelta(seconds=1),))
+    executer_une()
+    statut = executer_sql("SELECT statut FROM taches WHERE nom = 'bench.compter' AND max_tentatives = 1")[0][0]
+    if statut != 'echouee' or -1 in executions:
+        erreurs.append(f"{config.MOTEUR} : bail expiré à la dernière tentative : {statut}")
+    taches.DUREE_BAIL = duree_bail
+
+    # Tâches périodiques : une seule fois par période, même planifiées deux fois
+    planifier_periodiques()
+    planifier_periodiques()
+    nombre = executer_sql("SELECT COUNT(*) FROM taches WHERE cle_unicite IS NOT NULL")[0][0]
+    if nombre != len(taches.TACHES_PERIODIQUES):
+        erreurs.append(f"{config.MOTEUR} : {nombre} tâches périodiques au lieu de "
+                       f"{len(taches.TACHES_PERIODIQUES)}")
+    executer_sql("DELETE FROM taches WHERE cle_unicite IS NOT NULL")
+
+    # Rappels : rendez-vous planifiés de demain dans la boîte d'envoi
+    demain = date.today() + timedelta(days=1)
+    Utilisateur.ajouter_utilisateur('Bench', 'Taches', EMAIL_MEDECIN, 'bench', 'medecin', 'Bench')
+    medecin_id = executer_sql("SELECT id FROM utilisateurs WHERE email = %s", (EMAIL_MEDECIN,))[0][0]
+    for i in range(NB_RAPPELS):
+        Patient.ajouter_patient('BenchTaches', f'Patient {i}', '1990-01-01', 'F', f'76{i:07d}')
+    patients = [ligne[0] for ligne in executer_sql(
+        "SELECT id FROM patients WHERE nom = 'BenchTaches' ORDER BY id")]
+    RendezVous.creer_en_masse([(patient_id, medecin_id, demain, heure(8 + i // 12, i % 12 * 5))
+                               for i, patient_id in enumerate(patients)])
+    planifier('rappels', {'jour': demain.isoformat()})
+    executer_une()
+    chemin = os.path.join(TACHES_FOND['dossier_rappels'], f"rappels_{demain}.jsonl")
+    with open(chemin, encoding='utf-8') as fichier:
+        rappels = [json.loads(ligne) for ligne in fichier]
+    nos_rappels = [rappel for rappel in rappels if rappel['patient'].startswith('BenchTaches')]
+    if len(nos_rappels) != NB_RAPPELS:
+        erreurs.append(f"{config.MOTEUR} : {len(nos_rappels)} rappels au lieu de {NB_RAPPELS}")
+    executer_sql("DELETE FROM taches WHERE nom = 'rappels'")
+
+    nettoyer()
+    return resultats
+
+
+def main(nb_taches, nb_travailleurs):
+    tableau = {}
+    erreurs = []
+    with tempfile.TemporaryDirectory() as dossier:
+        TACHES_FOND['dossier_rappels'] = os.path.join(dossier, 'rappels')
+        for moteur in ('sqlite', 'postgresql'):
+            config.MOTEUR = moteur
+            config.SQLITE_CONFIG['chemin'] = os.path.join(dossier, 'bench.sqlite3')
+            fermer_pool()
+            print(f"--- {moteur} ---")
+            resultats = scenario(nb_taches, nb_travailleurs, erreurs)
+            fermer_pool()
+            if resultats is None:
+                print(f"{moteur} injoignable : ignoré")
+                continue
+            tableau[moteur] = resultats
+
+    moteurs = list(tableau)
+    print(f"\n{'mesure':<36}" + ''.join(f" | {moteur:>12}" for moteur in moteurs))
+    for mesure in next(iter(tableau.values()), {}):
+        print(f"{mesure:<36}" + ''.join(f" | {tableau[moteur][mesure]:>12.2f}" for moteur in moteurs))
+
+    print()
+    for erreur in erreurs:
+        print(f"✗ {erreur}")
+    if not erreurs:
+        print("✓ Chaque tâche exécutée une fois, reprises et rappels conformes")
+    return not erreurs
+
+
+if __name__ == "__main__":
+    arguments = [int(a) for a in sys.argv[1:]]
+    succes = main(*(arguments + [NB_TACHES, NB_TRAVAILLEURS][len(arguments):]))
+    sys.exit(0 if succes else 1)
@@ -0,0 +1,267 @@
+"""
+Banc de mesure des méthodes publiques des modèles, à plusieurs échelles.
+
+Pour chaque échelle, la base est vidée puis remplie par database/generateur.py
+(graine fixe), puis chaque méthode est appelée REPETITIONS fois sur des lignes
+tirées au hasard. Les caches sont vidés avant chaque appel : on mesure l'accès à
+la base. Les résultats (médiane, p95, min en ms) sont écrits en JSON avec le
+commit git et la version de PostgreSQL, pour comparer deux commits.
+
+ATTENTION : vide les tables patients et rendez-vous. Base de benchmark uniquement.
+
+Usage : python benchmarks/harnais.py mesurer [petite moyenne grande] [--sortie fichier.json]
+        python benchmarks/harnais.py comparer avant.json apres.json [--seuil 20]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, time as heure, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from database.generateur import generer, DOMAINE, MOT_DE_PASSE, NOMS, SPECIALITES
+from models.agenda import Agenda
+from models.patient import Patient
+from models.rendez_vous import RendezVous
+from models.statistiques import Statistiques
+from models.utilisateur import Utilisateur
+from utils.cache import CACHES
+
+# nom : (médecins, patients, rendez-vous) ; generer allonge l'historique si les créneaux manquent
+ECHELLES = {
+    'petite': (20, 10_000, 50_000),
+    'moyenne': (50, 100_000, 500_000),
+    'grande': (100, 1_000_000, 5_000_000),
+}
+REPETITIONS = 30
+DOSSIER_RESULTATS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultats')
+
+# Réservations de test dans un futur lointain, hors des créneaux générés
+DATE_RESERVATIONS = date(2099, 1, 5)
+
+
+def echantillon(nombre=200):
+    """
+    Identifiants tirés de la base générée pour paramétrer les appels.
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM patients ORDER BY random() LIMIT %s", (nombre,))
+        patients = [ligne[0] for ligne in cursor.fetchall()]
+        cursor.execute("SELECT id, email FROM utilisateurs WHERE role = 'medecin' AND email LIKE %s",
+                       (f"medecin%@{DOMAINE}",))
+        medecins = cursor.fetchall()
+        cursor.execute('''
+            SELECT id FROM rendez_vous
+            WHERE statut = 'planifie' AND date_rdv >= CURRENT_DATE
+            ORDER BY random() LIMIT %s
+        ''', (nombre,))
+        rendez_vous = [ligne[0] for ligne in cursor.fetchall()]
+        cursor.execute("SELECT telephone FROM patients ORDER BY random() LIMIT %s", (nombre,))
+        telephones = [ligne[0] for ligne in cursor.fetchall()]
+        return {'patients': patients, 'medecins': medecins, 'rendez_vous': rendez_vous,
+                'telephones': telephones}
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def scenarios(donnees, hasard):
+    """
+    Liste des (nom, appel) ; chaque appel est une fonction du numéro de répétition.
+    Les lectures passent avant les écritures, les suppressions en dernier.
+    """
+    patients, medecins = donnees['patients'], donnees['medecins']
+    aujourd_hui = date.today()
+
+    def patient(i):
+        return patients[i % len(patients)]
+
+    def medecin(i):
+        return medecins[i % len(medecins)][0]
+
+    def creneau(i, decalage=0):
+        numero = i + decalage
+        return (DATE_RESERVATIONS + timedelta(days=numero // 16),
+                heure(8 + numero % 16 // 2, 30 * (numero % 2)))
+
+    return [
+        ('Patient.lister_patients_page', lambda i: Patient.lister_patients_page(50)),
+        ('Patient.rechercher_patient (nom)',
+         lambda i: Patient.rechercher_patient(hasard.choice(NOMS))),
+        ('Patient.rechercher_patient (téléphone)',
+         lambda i: Patient.rechercher_patient(donnees['telephones'][i % len(donnees['telephones'])][:5])),
+        ('Patient.obtenir_patient', lambda i: Patient.obtenir_patient(patient(i))),
+        ('Patient.dossier_complet', lambda i: Patient.dossier_complet(patient(i))),
+        ('Utilisateur.authentifier',
+         lambda i: Utilisateur.authentifier(medecins[i % len(medecins)][1], MOT_DE_PASSE)),
+        ('Utilisateur.lister_medecins', lambda i: Utilisateur.lister_medecins()),
+        ('RendezVous.lister_rendez_vous (médecin)',
+         lambda i: RendezVous.lister_rendez_vous('medecin', medecin(i))),
+        ('RendezVous.lister_rendez_vous (patient)',
+         lambda i: RendezVous.lister_rendez_vous('patient', patient(i))),
+        ('RendezVous.lister_rendez_vous (date)',
+         lambda i: RendezVous.lister_rendez_vous('date', aujourd_hui - timedelta(days=i % 30))),
+        ('RendezVous.rechercher_rendez_vous (médecin, à venir)',
+         lambda i: RendezVous.rechercher_rendez_vous(medecin_id=medecin(i), date_debut=aujourd_hui)),
+        ('Agenda.du_jour', lambda i: Agenda.du_jour(medecin(i), aujourd_hui - timedelta(days=i % 7))),
+        ('Agenda.de_la_semaine', lambda i: Agenda.de_la_semaine(medecin(i))),
+        ('RendezVous.creneaux_disponibles',
+         lambda i: RendezVous.creneaux_disponibles(medecin(i), aujourd_hui,
+                                                   aujourd_hui + timedelta(days=14))),
+        ('RendezVous.prochains_creneaux',
+         lambda i: RendezVous.prochains_creneaux(SPECIALITES[i % len(SPECIALITES)])),
+        ('Statistiques.rdv_par_jour',
+         lambda i: Statistiques.rdv_par_jour(aujourd_hui - timedelta(days=6), aujourd_hui)),
+        ('Statistiques.taux', lambda i: Statistiques.taux(aujourd_hui - timedelta(days=29))),
+        ('Statistiques.nouveaux_patients', lambda i: Statistiques.nouveaux_patients()),
+
+        ('Patient.ajouter_patient',
+         lambda i: Patient.ajouter_patient('Bench', f'Patient {i}', '1990-01-01', 'F',
+                                           f"77{900_0000 + i:07d}")),
+        ('Patient.modifier_patient',
+         lambda i: Patient.modifier_patient(patient(i), adresse=f'Adresse {i}')),
+        ('RendezVous.reserver',
+         lambda i: RendezVous.reserver(patient(i), medecin(i), *creneau(i))),
+        ('RendezVous.creer_en_masse (10)',
+         lambda i: RendezVous.creer_en_masse(
+             [(patient(i), medecin(i), *creneau(i * 10 + n, 100_000)) for n in range(10)])),
+        ('RendezVous.modifier_statut',
+         lambda i: RendezVous.modifier_statut(
+             donnees['rendez_vous'][i % len(donnees['rendez_vous'])], 'annule')),
+        ('RendezVous.supprimer_rendez_vous',
+         lambda i: RendezVous.supprimer_rendez_vous(donnees['rendez_vous'][-1 - i])),
+        ('Patient.supprimer_patient', lambda i: Patient.supprimer_patient(patients[-1 - i])),
+    ]
+
+
+def mesurer_appel(appel, repetitions):
+    durees = []
+    for i in range(repetitions):
+        for cache in CACHES.values():
+            cache.vider()
+        debut = time.perf_counter()
+        appel(i)
+        durees.append((time.perf_counter() - debut) * 1000)
+    durees.sort()
+    return {
+        'mediane_ms': round(statistics.median(durees), 3),
+        'p95_ms': round(durees[max(0, int(len(durees) * 0.95) - 1)], 3),
+        'min_ms': round(durees[0], 3),
+        'repetitions': repetitions,
+    }
+
+
+def environnement():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SHOW server_version")
+        version = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+    return {'commit': commit, 'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'postgresql': version,
+            'machine': platform.machine()}
+
+
+def mesurer(echelles, chemin=None, repetitions=REPETITIONS):
+    resultats = {**environnement(), 'echelles': {}}
+
+    for nom in echelles:
+        nb_medecins, nb_patients, nb_rdv = ECHELLES[nom]
+        print(f"\n=== Échelle {nom} : {nb_medecins} médecins, {nb_patients} patients, {nb_rdv} rendez-vous ===")
+
+        debut = time.perf_counter()
+        succes, message = generer(nb_medecins, nb_patients, nb_rdv, vider_avant=True)
+        print(f"{'✓' if succes else '✗'} {message}")
+        if not succes:
+            return False
+        generation = time.perf_counter() - debut
+
+        hasard = random.Random(42)
+        donnees = echantillon(max(repetitions, 200))
+        methodes = {}
+        for methode, appel in scenarios(donnees, hasard):
+            methodes[methode] = mesurer_appel(appel, repetitions)
+            mesure = methodes[methode]
+            print(f"{methode:<55} | médiane {mesure['mediane_ms']:9.2f} ms | p95 {mesure['p95_ms']:9.2f} ms")
+
+        resultats['echelles'][nom] = {
+            'medecins': nb_medecins, 'patients': nb_patients, 'rendez_vous': nb_rdv,
+            'generation_s': round(generation, 1), 'methodes': methodes,
+        }
+
+    if chemin is None:
+        os.makedirs(DOSSIER_RESULTATS, exist_ok=True)
+        chemin = os.path.join(DOSSIER_RESULTATS,
+                              f"{datetime.now():%Y%m%d_%H%M%S}_{resultats['commit'] or 'sans_commit'}.json")
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        json.dump(resultats, fichier, ensure_ascii=False, indent=2)
+    print(f"\nRésultats écrits dans {chemin}")
+    return True
+
+
+def comparer(chemin_avant, chemin_apres, seuil=20):
+    """
+    Compare deux fichiers de résultats (médianes) ; retourne le nombre de régressions
+    (méthodes plus lentes de plus de `seuil` %).
+    """
+    with open(chemin_avant, encoding='utf-8') as fichier:
+        avant = json.load(fichier)
+    with open(chemin_apres, encoding='utf-8') as fichier:
+        apres = json.load(fichier)
+
+    print(f"Avant : {avant['commit']} ({avant['date']}) | Après : {apres['commit']} ({apres['date']})")
+    regressions = 0
+    for echelle, mesures in apres['echelles'].items():
+        if echelle not in avant['echelles']:
+            continue
+        print(f"\n=== {echelle} ===")
+        anciennes = avant['echelles'][echelle]['methodes']
+        for methode, mesure in mesures['methodes'].items():
+            if methode not in anciennes:
+                continue
+            ancienne, nouvelle = anciennes[methode]['mediane_ms'], mesure['mediane_ms']
+            ecart = (nouvelle - ancienne) / ancienne * 100 if ancienne else 0.0
+            marque = ''
+            if ecart > seuil:
+                marque = '  ✗ régression'
+                regressions += 1
+            print(f"{methode:<55} | {ancienne:9.2f} -> {nouvelle:9.2f} ms ({ecart:+6.1f} %){marque}")
+    print(f"\n{regressions} régression(s) au-delà de {seuil} %")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc de mesure des méthodes des modèles")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    commande_mesurer = sous_commandes.add_parser('mesurer')
+    commande_mesurer.add_argument('echelles', nargs='*', choices=list(ECHELLES), default=['petite'])
+    commande_mesurer.add_argument('--sortie', help="Fichier JSON des résultats")
+    commande_mesurer.add_argument('--repetitions', type=int, default=REPETITIONS)
+    commande_comparer = sous_commandes.add_parser('comparer')
+    commande_comparer.add_argument('avant')
+    commande_comparer.add_argument('apres')
+    commande_comparer.add_argument('--seuil', type=float, default=20, help="Écart toléré en %%")
+    args = parser.parse_args()
+
+    if args.commande == 'mesurer':
+        sys.exit(0 if mesurer(args.echelles, args.sortie, args.repetitions) else 1)
+    sys.exit(1 if comparer(args.avant, args.apres, args.seuil) else 0)
@@ -0,0 +1,76 @@
+"""
+Accès asynchrone (asyncio) à PostgreSQL via asyncpg.
+
+Même configuration que database/config.py (DB_CONFIG, POOL_CONFIG) ; le pool
+est propre à la boucle d'événements qui l'a créé.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from database.config import DB_CONFIG, POOL_CONFIG
+from database.preparees import numeroter_parametres
+
+_pool = None
+_pool_lock = None
+
+
+async def get_pool():
+    """
+    Retourne le pool asynchrone de l'application (créé au premier appel).
+    """
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    host=DB_CONFIG['host'],
+                    port=int(DB_CONFIG['port']),
+                    database=DB_CONFIG['database'],
+                    user=DB_CONFIG['user'],
+                    password=DB_CONFIG['password'],
+                    min_size=POOL_CONFIG['minconn'],
+                    max_size=POOL_CONFIG['maxconn'],
+                )
+    return _pool
+
+
+async def fermer_pool():
+    """
+    Ferme le pool asynchrone.
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def connexion_db():
+    """
+    Emprunte une connexion au pool asynchrone ; fournit None si la base est injoignable.
+    """
+    try:
+        pool = await get_pool()
+        connection = await pool.acquire(timeout=POOL_CONFIG['timeout'])
+    except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+        print(f"Erreur lors de la connexion à PostgreSQL : {e}")
+        yield None
+        return
+
+    try:
+        yield connection
+    finally:
+        await pool.release(connection)
+
+
+def convertir_requete(requete, params=()):
+    """
+    Convertit une requête au format psycopg2 (%s, %(nom)s, %%) au format asyncpg ($1, $2...).
+    Retourne (requete, liste de paramètres), ce qui permet de réutiliser les requêtes des modèles.
+    """
+    texte, ordre = numeroter_parametres(requete)
+    return texte, [params[cle] for cle in ordre]
@@ -1,5 +1,43 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
 from psycopg2 import Error
+from psycopg2 import pool
+from psycopg2 import extras
+
+from database.preparees import ConnexionPreparee
+from database.sqlite import PoolSQLite
+from utils.metriques import etat as etat_metriques, enregistrer_emprunt
+
+# Moteur de stockage : 'postgresql' (serveur) ou 'sqlite' (poste isolé, sans serveur)
+MOTEUR = 'postgresql'
+
+# Base SQLite (database/sqlite.py), créée au premier lancement
+SQLITE_CONFIG = {
+    'chemin': 'clinique.sqlite3',
+    'maxconn': 4,       # Une seule écriture à la fois ; les lectures se font en parallèle (WAL)
+    'timeout': 30       # Attente maximale (secondes) d'une connexion ou d'un verrou d'écriture
+}
+
+# Réplique locale d'un site (MOTEUR = 'sqlite') synchronisée avec la base centrale
+# DB_CONFIG (database/synchro.py)
+SYNCHRONISATION = {
+    'active': False,
+    'site': 'site-1',       # Nom du site, unique pour chaque réplique
+    'intervalle': 60,       # Secondes entre deux synchronisations
+    'lot': 500              # Modifications envoyées ou reçues par transaction
+}
+
+# Tâches de fond : rappels, archivage, statistiques, index (database/taches.py)
+TACHES_FOND = {
+    'active': False,
+    'travailleurs': 2,              # Threads qui exécutent les tâches
+    'attente': 5,                   # Secondes entre deux recherches quand la file est vide
+    'dossier_rappels': 'rappels'    # Boîte d'envoi locale des rappels (un fichier par jour)
+}
 
 # Configuration de la connexion à PostgreSQL
 DB_CONFIG = {
@@ -10,21 +48,186 @@ DB_CONFIG = {
     'port': '5432'
 }
 
+# Configuration du pool de connexions
+POOL_CONFIG = {
+    'minconn': 2,       # Connexions gardées ouvertes entre deux emprunts
+    'maxconn': 10,      # Nombre maximum de connexions simultanées
+    'timeout': 30,      # Attente maximale (secondes) quand le pool est épuisé
+    'verifier': True    # Vérifie la connexion (SELECT 1) à chaque emprunt
+}
+
+# Invalidation des caches entre plusieurs processus de l'application (LISTEN/NOTIFY)
+CACHE_INVALIDATION_DISTANTE = False
+
+# Mesures des méthodes des modèles et journal des requêtes lentes (utils/metriques.py)
+INSTRUMENTATION = {
+    'active': False,
+    'seuil_lent_ms': 200,                   # Requêtes journalisées au-delà de ce seuil
+    'journal': 'requetes_lentes.log',
+    'port': None                            # Port du point d'accès /metrics (Prometheus)
+}
+
+
+class PoolConnexions:
+    """
+    Pool de connexions PostgreSQL partageable entre threads.
+    """
+
+    def __init__(self, minconn=1, maxconn=10, timeout=30, verifier=True, **db_config):
+        self.timeout = timeout
+        self.verifier = verifier
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **db_config)
+        # Le ThreadedConnectionPool lève une erreur quand il est épuisé :
+        # le sémaphore permet d'attendre qu'une connexion se libère.
+        self._places = threading.BoundedSemaphore(maxconn)
+
+    def emprunter(self, timeout=None):
+        """
+        Emprunte une connexion au pool, en attendant au plus `timeout` secondes.
+        """
+        delai = self.timeout if timeout is None else timeout
+        if not self._places.acquire(timeout=delai):
+            raise pool.PoolError(f"Aucune connexion disponible après {delai} s")
+
+        try:
+            connection = self._pool.getconn()
+            if self.verifier and not self._est_valide(connection):
+                # Connexion morte (redémarrage du serveur, coupure réseau...) : on la remplace
+                self._pool.putconn(connection, close=True)
+                connection = self._pool.getconn()
+            return connection
+        except Exception:
+            self._places.release()
+            raise
+
+    def rendre(self, connection, fermer=False):
+        """
+        Rend une connexion au pool (annule toute transaction restée ouverte).
+        """
+        try:
+            self._pool.putconn(connection, close=fermer or connection.closed != 0)
+        except pool.PoolError:
+            # Pool fermé pendant l'emprunt (fermer_pool) : la connexion est simplement fermée
+            connection.close()
+        finally:
+            self._places.release()
+
+    @contextmanager
+    def connexion(self, timeout=None):
+        """
+        Gestionnaire de contexte : emprunte une connexion et la rend à la sortie.
+        """
+        connection = self.emprunter(timeout)
+        try:
+            yield connection
+        finally:
+            self.rendre(connection)
+
+    def fermer(self):
+        """
+        Ferme toutes les connexions du pool.
+        """
+        self._pool.closeall()
+
+    @staticmethod
+    def _est_valide(connection):
+        if connection.closed:
+            return False
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            connection.rollback()
+            return True
+        except Error:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# id(connexion empruntée) -> pool qui l'a prêtée, pour la lui rendre même après fermer_pool()
+_origines = {}
+
+
+def get_pool():
+    """
+    Retourne le pool de connexions de l'application (créé au premier appel).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None and MOTEUR == 'sqlite':
+                _pool = PoolSQLite(**SQLITE_CONFIG)
+            elif _pool is None:
+                _pool = PoolConnexions(**POOL_CONFIG, **DB_CONFIG,
+                                       connection_factory=ConnexionPreparee)
+    return _pool
+
+
+def fermer_pool():
+    """
+    Ferme le pool de connexions (à appeler à l'arrêt de l'application).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fermer()
+            _pool = None
+
+
 def get_connection():
     """
-    Crée et retourne une connexion à la base de données PostgreSQL.
+    Emprunte une connexion au pool du moteur configuré (MOTEUR).
+    La connexion doit être rendue avec close_connection().
     """
+    debut = time.perf_counter()
     try:
-        connection = psycopg2.connect(**DB_CONFIG)
-        return connection
-    except Error as e:
-        print(f"Erreur lors de la connexion à PostgreSQL : {e}")
+        origine = get_pool()
+        connection = origine.emprunter()
+    except (Error, pool.PoolError, sqlite3.Error) as e:
+        if etat_metriques.actif:
+            enregistrer_emprunt(time.perf_counter() - debut, erreur=True)
+        print(f"Erreur lors de la connexion à la base de données : {e}")
         return None
+    
+    _origines[id(connection)] = origine
+    if etat_metriques.actif:
+        enregistrer_emprunt(time.perf_counter() - debut)
+    return connection
+
 
 def close_connection(connection):
     """
-    Ferme la connexion à la base de données.
+    Rend la connexion au pool qui l'a prêtée, ou la ferme si ce pool a été fermé
+    entre-temps (fermer_pool() ne crée pas de nouveau pool pour la reprendre).
     """
-    if connection:
+    if not connection:
+        return
+    origine = _origines.pop(id(connection), None)
+    if origine is None:
         connection.close()
-        print("Connexion PostgreSQL fermée")
\ No newline at end of file
+    else:
+        origine.rendre(connection)
+
+
+@contextmanager
+def connexion_db():
+    """
+    Gestionnaire de contexte autour de get_connection() / close_connection().
+    Fournit None si la base est injoignable.
+    """
+    connection = get_connection()
+    try:
+        yield connection
+    finally:
+        close_connection(connection)
+
+
+def execute_values(cursor, requete, lignes, template=None, page_size=100, fetch=False):
+    """
+    psycopg2.extras.execute_values, quel que soit le moteur du curseur.
+    """
+    if hasattr(cursor, 'execute_values'):
+        return cursor.execute_values(requete, lignes, template, page_size, fetch)
+    return extras.execute_values(cursor, requete, lignes, template, page_size, fetch)
@@ -0,0 +1,255 @@
+"""
+Export en flux des patients et des rendez-vous (CSV, JSONL ou Parquet).
+
+CSV : COPY ... TO STDOUT écrit directement dans le fichier (compressé ou non).
+JSONL et Parquet : curseur serveur (nommé) lu par lots de `taille_lot` lignes.
+Dans tous les cas la mémoire utilisée ne dépend pas de la taille de la table.
+
+Les tables sont lues dans une même transaction REPEATABLE READ : un export
+« tous » est cohérent entre patients et rendez-vous.
+
+Les rendez-vous déplacés dans rendez_vous_archive (database/partitions.py) sont
+exportés avec les autres, sauf avec --sans-archives.
+
+Export incrémental : --depuis ne garde que les lignes créées depuis cette date
+(date_inscription pour les patients, date_creation pour les rendez-vous).
+Les modifications ultérieures de lignes plus anciennes ne sont pas reprises.
+
+Compression : gzip, ou zstd si le paquet zstandard est installé.
+Parquet nécessite pyarrow (la compression est alors celle du format Parquet).
+
+Usage : python database/export.py patients|rendez_vous|tous [--format csv|jsonl|parquet]
+                                  [--compression aucune|gzip|zstd] [--depuis 2025-01-01]
+                                  [--sortie dossier] [--lot 10000] [--sans-archives]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, time as heure
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TAILLE_LOT = 10000
+
+# Colonnes exportées (nom, type), colonne d'horodatage pour l'export incrémental
+# et table d'archive lue avec la table principale
+TABLES = {
+    'patients': {
+        'colonnes': [('id', 'int'), ('nom', 'str'), ('prenom', 'str'), ('date_naissance', 'date'),
+                     ('sexe', 'str'), ('adresse', 'str'), ('telephone', 'str'), ('email', 'str'),
+                     ('numero_securite_sociale', 'str'), ('date_inscription', 'timestamp')],
+        'horodatage': 'date_inscription',
+    },
+    'rendez_vous': {
+        'colonnes': [('id', 'int'), ('patient_id', 'int'), ('medecin_id', 'int'),
+                     ('date_rdv', 'date'), ('heure_rdv', 'time'), ('motif', 'str'),
+                     ('statut', 'str'), ('notes', 'str'), ('date_creation', 'timestamp')],
+        'horodatage': 'date_creation',
+        'archive': 'rendez_vous_archive',
+    },
+}
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+COMPRESSIONS = ('aucune', 'gzip', 'zstd')
+EXTENSIONS = {'aucune': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def requete_export(table, depuis=None, archives=True):
+    """
+    Retourne (requête, paramètres) de l'export d'une table, dans l'ordre des identifiants.
+    archives=True ajoute les lignes de la table d'archive correspondante.
+    """
+    definition = TABLES[table]
+    colonnes = ', '.join(nom for nom, _ in definition['colonnes'])
+    sources = [table]
+    if archives and definition.get('archive'):
+        sources.append(definition['archive'])
+
+    requetes, params = [], []
+    for source in sources:
+        query = f"SELECT {colonnes} FROM {source}"
+        if depuis:
+            query += f" WHERE {definition['horodatage']} >= %s"
+            params.append(depuis)
+        requetes.append(query)
+    return " UNION ALL ".join(requetes) + " ORDER BY id", params
+
+
+def ouvrir_sortie(chemin, compression):
+    """
+    Ouvre le fichier de sortie en mode texte, compressé à la volée si demandé.
+    """
+    if compression == 'gzip':
+        return gzip.open(chemin, 'wt', encoding='utf-8', newline='')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Compression zstd indisponible (pip install zstandard)")
+        return zstandard.open(chemin, 'wt', encoding='utf-8', newline='')
+    return open(chemin, 'w', encoding='utf-8', newline='')
+
+
+def _json(valeur):
+    if isinstance(valeur, (date, datetime, heure)):
+        return valeur.isoformat()
+    return str(valeur)
+
+
+def exporter_csv(cursor, query, params, fichier):
+    """
+    Exporte par COPY TO STDOUT (avec en-tête) ; retourne le nombre de lignes.
+    """
+    copie = cursor.mogrify(query, params).decode('utf-8')
+    cursor.copy_expert(f"COPY ({copie}) TO STDOUT WITH (FORMAT csv, HEADER)", fichier)
+    return cursor.rowcount
+
+
+def exporter_jsonl(connection, table, query, params, fichier, taille_lot):
+    """
+    Exporte une ligne JSON par enregistrement via un curseur serveur ; retourne le nombre de lignes.
+    """
+    noms = [nom for nom, _ in TABLES[table]['colonnes']]
+    cursor = connection.cursor(name=f"export_{table}")
+    cursor.itersize = taille_lot
+    try:
+        cursor.execute(query, params)
+        nombre = 0
+        for ligne in cursor:
+            fichier.write(json.dumps(dict(zip(noms, ligne)), ensure_ascii=False, default=_json))
+            fichier.write('\n')
+            nombre += 1
+        return nombre
+    finally:
+        cursor.close()
+
+
+def schema_parquet(table):
+    types = {
+        'int': pyarrow.int32(),
+        'str': pyarrow.string(),
+        'date': pyarrow.date32(),
+        'time': pyarrow.time64('us'),
+        'timestamp': pyarrow.timestamp('us'),
+    }
+    return pyarrow.schema([(nom, types[type_colonne]) for nom, type_colonne in TABLES[table]['colonnes']])
+
+
+def exporter_parquet(connection, table, query, params, chemin, compression, taille_lot):
+    """
+    Exporte en Parquet, un groupe de lignes par lot ; retourne le nombre de lignes.
+    """
+    if pyarrow is None:
+        raise RuntimeError("Format Parquet indisponible (pip install pyarrow)")
+
+    schema = schema_parquet(table)
+    cursor = connection.cursor(name=f"export_{table}")
+    try:
+        cursor.execute(query, params)
+        nombre = 0
+        codec = 'none' if compression == 'aucune' else compression
+        with pyarrow.parquet.ParquetWriter(chemin, schema, compression=codec) as sortie:
+            while True:
+                lot = cursor.fetchmany(taille_lot)
+                if not lot:
+                    break
+                colonnes = list(zip(*lot))
+                sortie.write_batch(pyarrow.record_batch(
+                    [pyarrow.array(valeurs, type=champ.type) for valeurs, champ in zip(colonnes, schema)],
+                    schema=schema
+                ))
+                nombre += len(lot)
+        return nombre
+    finally:
+        cursor.close()
+
+
+def exporter(tables, dossier='.', format_sortie='csv', compression='aucune',
+             depuis=None, taille_lot=TAILLE_LOT, archives=True):
+    """
+    Exporte les tables demandées dans `dossier` et retourne (succes, message).
+    archives=False n'exporte pas les rendez-vous archivés.
+    """
+    if format_sortie not in FORMATS:
+        return False, f"Format inconnu : {format_sortie}"
+    if compression not in COMPRESSIONS:
+        return False, f"Compression inconnue : {compression}"
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion à la base de données"
+
+    resultats = []
+    debut = time.perf_counter()
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        os.makedirs(dossier, exist_ok=True)
+
+        for table in tables:
+            query, params = requete_export(table, depuis, archives)
+
+            if format_sortie == 'parquet':
+                chemin = os.path.join(dossier, f"{table}.parquet")
+                nombre = exporter_parquet(connection, table, query, params, chemin,
+                                          compression, taille_lot)
+            else:
+                chemin = os.path.join(dossier, f"{table}.{format_sortie}{EXTENSIONS[compression]}")
+                with ouvrir_sortie(chemin, compression) as fichier:
+                    if format_sortie == 'csv':
+                        nombre = exporter_csv(cursor, query, params, fichier)
+                    else:
+                        nombre = exporter_jsonl(connection, table, query, params, fichier, taille_lot)
+
+            resultats.append(f"{table} : {nombre} ligne(s) -> {chemin}")
+
+        duree = time.perf_counter() - debut
+        return True, "\n".join(resultats + [f"Export terminé en {duree:.1f} s"])
+
+    except Exception as e:
+        return False, f"Erreur lors de l'export : {str(e)}"
+    finally:
+        cursor.close()
+        connection.rollback()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export en flux des patients et des rendez-vous")
+    parser.add_argument('table', choices=list(TABLES) + ['tous'])
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='aucune')
+    parser.add_argument('--depuis', help="N'exporter que les lignes créées depuis (YYYY-MM-DD[ HH:MM:SS])")
+    parser.add_argument('--sortie', default='.', help="Dossier de destination")
+    parser.add_argument('--lot', type=int, default=TAILLE_LOT, help="Lignes lues par aller-retour")
+    parser.add_argument('--sans-archives', action='store_true',
+                        help="Ne pas exporter les rendez-vous archivés")
+    args = parser.parse_args()
+
+    depuis = None
+    if args.depuis:
+        try:
+            depuis = datetime.fromisoformat(args.depuis)
+        except ValueError:
+            parser.error("--depuis : format attendu YYYY-MM-DD[ HH:MM:SS]")
+
+    tables = list(TABLES) if args.table == 'tous' else [args.table]
+    succes, message = exporter(tables, args.sortie, args.format, args.compression, depuis, args.lot,
+                               not args.sans_archives)
+    print(f"{'✓' if succes else '✗'} {message}")
+    sys.exit(0 if succes else 1)
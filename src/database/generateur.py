@@ -0,0 +1,285 @@
+"""
+Générateur de données synthétiques pour les benchmarks et les bases de développement.
+
+Construit une clinique réaliste et reproductible (même graine et même jour, mêmes données ;
+les dates sont relatives à aujourd'hui) :
+  - des médecins de plusieurs spécialités (mot de passe commun MOT_DE_PASSE) ;
+  - des patients aux noms sénégalais, numéros au format accepté par valider_telephone ;
+  - des rendez-vous répartis sur plusieurs années sur les créneaux de HORAIRES_TRAVAIL,
+    sans double réservation, avec une proportion réaliste de statuts.
+Le chargement se fait par COPY, par lots de TAILLE_LOT lignes (mémoire bornée) ;
+les statistiques sont recalculées une fois à la fin.
+
+Usage : python database/generateur.py [--medecins 20] [--patients 10000]
+                                      [--rendez-vous 50000] [--annees 3] [--graine 42] [--vider]
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from database.partitions import DRAPEAU_DEPLACEMENT, creer_partitions
+from models.rendez_vous import HORAIRES_TRAVAIL, DUREE_RDV
+from models.statistiques import Statistiques
+from utils.securite import hacher_mot_de_passe
+
+TAILLE_LOT = 50_000
+
+# Adresse des comptes générés (permet de les retrouver et de les supprimer)
+DOMAINE = 'generateur.clinique.sn'
+MOT_DE_PASSE = 'generateur123'
+
+NOMS = ['Diop', 'Ndiaye', 'Fall', 'Sow', 'Ba', 'Sy', 'Gueye', 'Faye', 'Sarr', 'Mbaye',
+        'Cissé', 'Diallo', 'Sène', 'Thiam', 'Kane', 'Niang', 'Seck', 'Diouf', 'Camara', 'Touré',
+        'Wade', 'Ndour', 'Lô', 'Dieng', 'Mbengue', 'Badji', 'Sagna', 'Diatta', 'Ka', 'Tall']
+PRENOMS_F = ['Awa', 'Fatou', 'Aïssatou', 'Mariama', 'Khady', 'Ndèye', 'Aminata', 'Coumba',
+             'Rokhaya', 'Adama', 'Sokhna', 'Binta', 'Dieynaba', 'Astou', 'Maimouna']
+PRENOMS_M = ['Moussa', 'Ibrahima', 'Cheikh', 'Mamadou', 'Ousmane', 'Abdoulaye', 'Modou',
+             'Babacar', 'Pape', 'Serigne', 'Alioune', 'Lamine', 'Souleymane', 'Malick', 'Omar']
+QUARTIERS = ['Médina, Dakar', 'Plateau, Dakar', 'Parcelles Assainies, Dakar', 'Grand Yoff, Dakar',
+             'Pikine', 'Guédiawaye', 'Rufisque', 'Thiès', 'Mbour', 'Saint-Louis', 'Ziguinchor',
+             'Kaolack', 'Touba', 'Liberté 6, Dakar', 'Ouakam, Dakar']
+OPERATEURS = ['77', '78', '76', '70', '75']
+SPECIALITES = ['Médecine générale', 'Cardiologie', 'Pédiatrie', 'Gynécologie',
+               'Dermatologie', 'Ophtalmologie', 'ORL', 'Pneumologie']
+MOTIFS = ['Consultation', 'Contrôle', 'Suivi traitement', 'Fièvre', 'Douleurs', 'Vaccination',
+          'Bilan annuel', 'Renouvellement ordonnance', None]
+
+# Répartition des statuts : (statut, poids)
+STATUTS_PASSES = [('termine', 82), ('annule', 11), ('planifie', 7)]   # planifie passé = absence
+STATUTS_A_VENIR = [('planifie', 92), ('annule', 8)]
+
+# Horizon des rendez-vous à venir (jours)
+JOURS_A_VENIR = 60
+
+
+def _telephone(hasard):
+    return hasard.choice(OPERATEURS) + f"{hasard.randrange(10_000_000):07d}"
+
+
+def _creneaux_du_jour():
+    """
+    Heures de début de tous les créneaux d'une journée de travail.
+    """
+    creneaux = []
+    for debut, fin in HORAIRES_TRAVAIL['plages']:
+        t = datetime.strptime(debut, '%H:%M')
+        limite = datetime.strptime(fin, '%H:%M')
+        while t + timedelta(minutes=DUREE_RDV) <= limite:
+            creneaux.append(t.time())
+            t += timedelta(minutes=DUREE_RDV)
+    return creneaux
+
+
+def _jours_ouvres(debut, fin):
+    """
+    Jours de [debut, fin] couverts par HORAIRES_TRAVAIL.
+    """
+    jours = [debut + timedelta(days=n) for n in range((fin - debut).days + 1)]
+    return [jour for jour in jours if jour.weekday() in HORAIRES_TRAVAIL['jours']]
+
+
+def annees_necessaires(nb_rendez_vous, nb_medecins, aujourd_hui):
+    """
+    Profondeur d'historique minimale (en années) pour que les créneaux de
+    `nb_medecins` médecins puissent accueillir `nb_rendez_vous` rendez-vous.
+    """
+    par_jour = len(_creneaux_du_jour()) * max(nb_medecins, 1)
+    fin = aujourd_hui + timedelta(days=JOURS_A_VENIR)
+    annees = 1
+    while len(_jours_ouvres(aujourd_hui - timedelta(days=365 * annees), fin)) * par_jour < nb_rendez_vous:
+        annees += 1
+    return annees
+
+
+def _copier(cursor, table, colonnes, lignes):
+    """
+    Charge les lignes par COPY, par lots de TAILLE_LOT. Retourne le nombre de lignes.
+    """
+    total = 0
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= TAILLE_LOT:
+            total += _copier_lot(cursor, table, colonnes, lot)
+            lot = []
+    if lot:
+        total += _copier_lot(cursor, table, colonnes, lot)
+    return total
+
+
+def _copier_lot(cursor, table, colonnes, lot):
+    tampon = io.StringIO()
+    csv.writer(tampon).writerows(lot)
+    tampon.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(colonnes)}) FROM STDIN WITH (FORMAT csv)", tampon)
+    return len(lot)
+
+
+def lignes_medecins(hasard, nombre, hachage):
+    for i in range(1, nombre + 1):
+        nom = hasard.choice(NOMS)
+        prenom = hasard.choice(PRENOMS_F + PRENOMS_M)
+        yield (nom, prenom, f"medecin{i}@{DOMAINE}", hachage, 'medecin',
+               SPECIALITES[i % len(SPECIALITES)], _telephone(hasard))
+
+
+def lignes_patients(hasard, nombre, debut_inscriptions, aujourd_hui):
+    jours_inscription = (aujourd_hui - debut_inscriptions).days
+    for i in range(nombre):
+        sexe = 'F' if hasard.random() < 0.52 else 'M'
+        prenom = hasard.choice(PRENOMS_F if sexe == 'F' else PRENOMS_M)
+        nom = hasard.choice(NOMS)
+        naissance = aujourd_hui - timedelta(days=hasard.randrange(365, 90 * 365))
+        email = (f"{prenom}.{nom}{i}@exemple.sn".lower().replace(' ', '')
+                 if hasard.random() < 0.3 else None)
+        inscription = datetime.combine(
+            debut_inscriptions + timedelta(days=hasard.randrange(jours_inscription + 1)),
+            datetime.min.time()
+        ) + timedelta(minutes=hasard.randrange(8 * 60, 18 * 60))
+        yield (nom, prenom, naissance, sexe, hasard.choice(QUARTIERS), _telephone(hasard),
+               email, f"{hasard.randrange(10 ** 12):012d}" if hasard.random() < 0.6 else None,
+               inscription)
+
+
+def lignes_rendez_vous(hasard, nombre, medecins, patients, debut, fin, aujourd_hui):
+    """
+    Tire exactement `nombre` créneaux distincts parmi tous les créneaux
+    (médecin, jour ouvré, heure) de [debut, fin], dans l'ordre chronologique.
+    """
+    creneaux = _creneaux_du_jour()
+    jours = _jours_ouvres(debut, fin)
+    capacite = len(jours) * len(creneaux) * len(medecins)
+    if nombre > capacite:
+        raise ValueError(f"{nombre} rendez-vous demandés pour {capacite} créneaux disponibles")
+
+    statuts_passes = [s for s, _ in STATUTS_PASSES], [p for _, p in STATUTS_PASSES]
+    statuts_a_venir = [s for s, _ in STATUTS_A_VENIR], [p for _, p in STATUTS_A_VENIR]
+
+    maintenant = datetime.now()
+
+    # Tirage séquentiel (Knuth, algorithme S) : exactement `nombre` créneaux, en flux
+    restants, vus = nombre, 0
+    for jour in jours:
+        statuts, poids = statuts_passes if jour < aujourd_hui else statuts_a_venir
+        for heure in creneaux:
+            for medecin_id in medecins:
+                if hasard.random() * (capacite - vus) < restants:
+                    restants -= 1
+                    # Prise de rendez-vous 1 à 45 jours avant, pendant les heures d'ouverture
+                    creation = min(maintenant, datetime.combine(
+                        jour - timedelta(days=hasard.randrange(1, 46)), datetime.min.time()
+                    ) + timedelta(minutes=hasard.randrange(8 * 60, 18 * 60)))
+                    yield (hasard.choice(patients), medecin_id, jour, heure, hasard.choice(MOTIFS),
+                           hasard.choices(statuts, poids)[0], None, creation)
+                vus += 1
+                if not restants:
+                    return
+
+
+def vider(cursor):
+    """
+    Supprime patients, rendez-vous, statistiques et médecins générés.
+    Réservé aux bases de développement ou de benchmark.
+    """
+    cursor.execute('''
+        TRUNCATE patients, rendez_vous, rendez_vous_archive,
+                 stats_rdv_jour, stats_patients_semaine CASCADE
+    ''')
+    cursor.execute("DELETE FROM utilisateurs WHERE email LIKE %s", (f"%@{DOMAINE}",))
+
+
+def generer(nb_medecins=20, nb_patients=10_000, nb_rendez_vous=50_000, annees=3, graine=42,
+            vider_avant=False):
+    """
+    Génère et charge une clinique synthétique ; retourne (succes, message).
+    L'historique est allongé au-delà de `annees` si les créneaux ne suffisent pas
+    pour `nb_rendez_vous`.
+    """
+    hasard = random.Random(graine)
+    aujourd_hui = date.today()
+    annees = max(annees, annees_necessaires(nb_rendez_vous, nb_medecins, aujourd_hui))
+    debut = aujourd_hui - timedelta(days=365 * annees)
+    fin = aujourd_hui + timedelta(days=JOURS_A_VENIR)
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion à la base de données"
+
+    debut_chrono = time.perf_counter()
+    try:
+        cursor = connection.cursor()
+        if vider_avant:
+            vider(cursor)
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM utilisateurs")
+        dernier_utilisateur = cursor.fetchone()[0]
+        _copier(cursor, 'utilisateurs',
+                ['nom', 'prenom', 'email', 'mot_de_passe', 'role', 'specialite', 'telephone'],
+                lignes_medecins(hasard, nb_medecins, hacher_mot_de_passe(MOT_DE_PASSE)))
+        cursor.execute("SELECT id FROM utilisateurs WHERE id > %s AND email LIKE %s ORDER BY id",
+                       (dernier_utilisateur, f"%@{DOMAINE}"))
+        medecins = [ligne[0] for ligne in cursor.fetchall()]
+
+        # Les triggers de statistiques sont neutralisés : recalcul unique à la fin
+        cursor.execute("SELECT set_config(%s, 'on', true)", (DRAPEAU_DEPLACEMENT,))
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM patients")
+        dernier_patient = cursor.fetchone()[0]
+        _copier(cursor, 'patients',
+                ['nom', 'prenom', 'date_naissance', 'sexe', 'adresse', 'telephone', 'email',
+                 'numero_securite_sociale', 'date_inscription'],
+                lignes_patients(hasard, nb_patients, debut, aujourd_hui))
+        cursor.execute("SELECT id FROM patients WHERE id > %s ORDER BY id", (dernier_patient,))
+        patients = [ligne[0] for ligne in cursor.fetchall()]
+
+        creer_partitions(cursor, debut, fin)
+        nb_rdv = _copier(cursor, 'rendez_vous',
+                         ['patient_id', 'medecin_id', 'date_rdv', 'heure_rdv', 'motif',
+                          'statut', 'notes', 'date_creation'],
+                         lignes_rendez_vous(hasard, nb_rendez_vous, medecins, patients,
+                                            debut, fin, aujourd_hui))
+        connection.commit()
+
+        for table in ('utilisateurs', 'patients', 'rendez_vous'):
+            cursor.execute(f"ANALYZE {table}")
+        connection.commit()
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur lors de la génération : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+    succes, message = Statistiques.reconstruire()
+    if not succes:
+        return False, message
+
+    duree = time.perf_counter() - debut_chrono
+    return True, (f"{len(medecins)} médecin(s), {len(patients)} patient(s), {nb_rdv} rendez-vous "
+                  f"sur {annees} an(s) générés en {duree:.1f} s (mot de passe des médecins : {MOT_DE_PASSE})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère une clinique synthétique")
+    parser.add_argument('--medecins', type=int, default=20)
+    parser.add_argument('--patients', type=int, default=10_000)
+    parser.add_argument('--rendez-vous', type=int, default=50_000, dest='rendez_vous')
+    parser.add_argument('--annees', type=int, default=3, help="Profondeur de l'historique")
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--vider', action='store_true',
+                        help="Vide d'abord patients et rendez-vous (base de développement uniquement)")
+    args = parser.parse_args()
+
+    succes, message = generer(args.medecins, args.patients, args.rendez_vous,
+                              args.annees, args.graine, args.vider)
+    print(f"{'✓' if succes else '✗'} {message}")
+    sys.exit(0 if succes else 1)
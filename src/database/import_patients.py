@@ -0,0 +1,279 @@
+"""
+Import en masse de patients depuis un fichier CSV ou JSONL.
+
+Les lignes sont lues en flux et validées par lots (mêmes règles que utils/validation.py).
+Les lignes valides sont chargées par COPY dans une table temporaire puis fusionnées
+dans patients (les patients déjà présents sont ignorés) ; les lignes rejetées sont
+écrites dans un fichier d'erreurs. La mémoire utilisée ne dépend que de la taille d'un lot.
+
+Colonnes attendues : nom, prenom, date_naissance, telephone
+                     (optionnelles : sexe, adresse, email, numero_securite_sociale)
+
+Usage : python database/import_patients.py fichier.csv|fichier.jsonl [--erreurs rejets.csv] [--lot 5000]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from utils.validation import valider_email, valider_telephone, valider_date, normaliser_telephone
+
+TAILLE_LOT = 5000
+
+COLONNES = ['nom', 'prenom', 'date_naissance', 'sexe', 'telephone',
+            'adresse', 'email', 'numero_securite_sociale']
+
+SEXES_VALIDES = {'m': 'M', 'f': 'F', 'autre': 'Autre'}
+
+# Longueurs maximales des colonnes de patients (init_db.create_tables) : une valeur
+# trop longue ferait échouer le COPY de tout le lot
+LONGUEURS_MAX = {'nom': 100, 'prenom': 100, 'sexe': 10, 'telephone': 20,
+                 'email': 150, 'numero_securite_sociale': 50}
+
+# Données d'une ligne rejetée recopiées dans le fichier d'erreurs (caractères au plus)
+LONGUEUR_REJET = 1000
+
+
+def _lignes_texte(fichier, etat):
+    """
+    Lignes d'un fichier ouvert en binaire, décodées une à une ; etat['lignes'] reçoit
+    le texte lu et etat['encodage'] signale une ligne qui n'est pas en UTF-8.
+    """
+    for brut in fichier:
+        try:
+            texte = brut.decode('utf-8')
+        except UnicodeDecodeError:
+            texte = brut.decode('utf-8', 'replace')
+            etat['encodage'] = True
+        etat['lignes'].append(texte)
+        yield texte
+
+
+def _lire_csv(chemin):
+    """
+    Enregistrements CSV en couples (donnees, erreur), comme lire_lignes() ; un
+    enregistrement illisible (encodage, champ trop grand...) est rejeté seul.
+    """
+    with open(chemin, 'rb') as fichier:
+        etat = {'lignes': [], 'encodage': False}
+        lecteur = csv.reader(_lignes_texte(fichier, etat))
+        try:
+            entetes = next(lecteur, None)
+        except csv.Error as e:
+            raise ValueError(f"En-tête CSV illisible : {e}")
+        if entetes is None or etat['encodage']:
+            raise ValueError("En-tête CSV manquant ou illisible")
+
+        while True:
+            etat['lignes'], etat['encodage'] = [], False
+            try:
+                champs = next(lecteur)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield ''.join(etat['lignes']).rstrip('\r\n'), f"CSV invalide : {e}"
+                continue
+            if etat['encodage']:
+                yield ''.join(etat['lignes']).rstrip('\r\n'), "Encodage invalide (UTF-8 attendu)"
+                continue
+            if champs:
+                yield dict(zip(entetes, champs)), None
+
+
+def lire_lignes(chemin):
+    """
+    Lit le fichier ligne par ligne (CSV ou JSONL selon l'extension) et produit des
+    couples (donnees, erreur) : un dictionnaire et None, ou le texte d'une ligne
+    illisible et le message d'erreur.
+    """
+    if chemin.endswith('.jsonl') or chemin.endswith('.json'):
+        with open(chemin, 'rb') as fichier:
+            for brut in fichier:
+                try:
+                    texte = brut.decode('utf-8')
+                except UnicodeDecodeError:
+                    yield brut.decode('utf-8', 'replace').rstrip('\n'), "Encodage invalide (UTF-8 attendu)"
+                    continue
+                if not texte.strip():
+                    continue
+                try:
+                    donnees = json.loads(texte)
+                except ValueError as e:
+                    yield texte.rstrip('\n'), f"JSON invalide : {e}"
+                    continue
+                if not isinstance(donnees, dict):
+                    yield donnees, "Objet JSON attendu"
+                    continue
+                yield donnees, None
+    else:
+        yield from _lire_csv(chemin)
+
+
+def valider_ligne(ligne):
+    """
+    Valide et normalise une ligne.
+    Retourne (valeurs, None) si la ligne est valide, (None, message) sinon.
+    """
+    valeurs = {}
+    for colonne in COLONNES:
+        valeur = ligne.get(colonne)
+        valeur = str(valeur).strip() if valeur is not None else ''
+        valeurs[colonne] = valeur or None
+
+    for colonne, valeur in valeurs.items():
+        # PostgreSQL refuse le caractère nul dans un texte : le COPY du lot échouerait
+        if valeur and '\x00' in valeur:
+            return None, f"Caractère nul interdit : {colonne}"
+
+    for colonne in ('nom', 'prenom', 'date_naissance', 'telephone'):
+        if not valeurs[colonne]:
+            return None, f"Champ obligatoire manquant : {colonne}"
+
+    if not valider_telephone(valeurs['telephone']):
+        return None, "Numéro de téléphone invalide"
+    valeurs['telephone'] = normaliser_telephone(valeurs['telephone'])
+
+    if not valider_date(valeurs['date_naissance']):
+        return None, "Format de date invalide (utilisez YYYY-MM-DD)"
+    if datetime.strptime(valeurs['date_naissance'], '%Y-%m-%d') > datetime.now():
+        return None, "La date de naissance ne peut pas être dans le futur"
+
+    if valeurs['email'] and not valider_email(valeurs['email']):
+        return None, "Email invalide"
+
+    if valeurs['sexe']:
+        sexe = SEXES_VALIDES.get(valeurs['sexe'].lower())
+        if not sexe:
+            return None, "Sexe invalide (M/F/Autre)"
+        valeurs['sexe'] = sexe
+
+    for colonne, longueur in LONGUEURS_MAX.items():
+        if valeurs[colonne] and len(valeurs[colonne]) > longueur:
+            return None, f"Champ trop long : {colonne} ({longueur} caractères au plus)"
+
+    return [valeurs[colonne] for colonne in COLONNES], None
+
+
+def charger_lot(cursor, lot):
+    """
+    Charge un lot par COPY dans la table temporaire puis le fusionne dans patients.
+    Retourne le nombre de patients réellement insérés.
+    """
+    tampon = io.StringIO()
+    csv.writer(tampon).writerows(lot)
+    tampon.seek(0)
+
+    cursor.copy_expert(
+        f"COPY import_patients ({', '.join(COLONNES)}) FROM STDIN WITH (FORMAT csv)",
+        tampon
+    )
+
+    # Un patient est considéré comme déjà connu s'il a les mêmes nom, prénom,
+    # date de naissance et téléphone (dans la base ou plus haut dans le lot)
+    cursor.execute(f'''
+        INSERT INTO patients ({', '.join(COLONNES)})
+        SELECT DISTINCT ON (s.nom, s.prenom, s.date_naissance, s.telephone)
+               {', '.join('s.' + c for c in COLONNES)}
+        FROM import_patients s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM patients p
+            WHERE p.nom = s.nom AND p.prenom = s.prenom
+              AND p.date_naissance = s.date_naissance AND p.telephone = s.telephone
+        )
+    ''')
+    inseres = cursor.rowcount
+    cursor.execute("TRUNCATE import_patients")
+    return inseres
+
+
+def importer_patients(chemin, chemin_erreurs=None, taille_lot=TAILLE_LOT):
+    """
+    Importe les patients du fichier et retourne (succes, message).
+    Chaque lot est validé dans sa propre transaction.
+    """
+    chemin_erreurs = chemin_erreurs or f"{chemin}.rejets.csv"
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion à la base de données"
+
+    lues = inseres = rejetees = 0
+    debut = time.perf_counter()
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS import_patients (
+                nom VARCHAR(100),
+                prenom VARCHAR(100),
+                date_naissance DATE,
+                sexe VARCHAR(10),
+                telephone VARCHAR(20),
+                adresse TEXT,
+                email VARCHAR(150),
+                numero_securite_sociale VARCHAR(50)
+            )
+        ''')
+
+        with open(chemin_erreurs, 'w', newline='', encoding='utf-8') as fichier_erreurs:
+            rejets = csv.writer(fichier_erreurs)
+            rejets.writerow(['ligne', 'erreur', 'donnees'])
+
+            lot = []
+            for numero, (ligne, erreur) in enumerate(lire_lignes(chemin), start=1):
+                lues += 1
+                if erreur is None:
+                    valeurs, erreur = valider_ligne(ligne)
+                if erreur:
+                    rejetees += 1
+                    donnees = json.dumps(ligne, ensure_ascii=False)
+                    if len(donnees) > LONGUEUR_REJET:
+                        donnees = donnees[:LONGUEUR_REJET] + '…'
+                    rejets.writerow([numero, erreur, donnees])
+                    continue
+
+                lot.append(valeurs)
+                if len(lot) >= taille_lot:
+                    inseres += charger_lot(cursor, lot)
+                    connection.commit()
+                    lot = []
+                    print(f"  {lues} lignes lues ({lues / (time.perf_counter() - debut):.0f} lignes/s)")
+
+            if lot:
+                inseres += charger_lot(cursor, lot)
+                connection.commit()
+
+        cursor.execute("DROP TABLE IF EXISTS import_patients")
+        connection.commit()
+
+        duree = time.perf_counter() - debut
+        doublons = lues - rejetees - inseres
+        return True, (f"{inseres} patient(s) importé(s), {doublons} déjà présent(s), "
+                      f"{rejetees} rejeté(s) (voir {chemin_erreurs}) "
+                      f"en {duree:.1f} s ({lues / duree if duree else 0:.0f} lignes/s)")
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur lors de l'import (après {inseres} patient(s) importé(s)) : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import en masse de patients (CSV ou JSONL)")
+    parser.add_argument('fichier')
+    parser.add_argument('--erreurs', help="Fichier CSV des lignes rejetées")
+    parser.add_argument('--lot', type=int, default=TAILLE_LOT, help="Nombre de lignes par lot")
+    args = parser.parse_args()
+
+    succes, message = importer_patients(args.fichier, args.erreurs, args.lot)
+    print(f"{'✓' if succes else '✗'} {message}")
+    sys.exit(0 if succes else 1)
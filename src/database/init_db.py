@@ -1,4 +1,18 @@
-from .config import get_connection, close_connection
+from .config import get_connection, close_connection, MOTEUR
+from .partitions import (
+    CREATE_RENDEZ_VOUS, COLONNES_RDV, DRAPEAU_DEPLACEMENT,
+    est_partitionnee, create_partitionnement, creer_partitions
+)
+from .synchro import create_synchronisation
+from models.statistiques import RECALCUL_PATIENTS
+from utils.securite import hacher_mot_de_passe
+
+# Numéros enregistrés avant la normalisation (utils.validation.normaliser_telephone) :
+# la recherche par préfixe compare des numéros sans espaces ni indicatif
+NORMALISER_TELEPHONES = '''
+    UPDATE patients SET telephone = replace(replace(telephone, ' ', ''), '+221', '')
+    WHERE telephone LIKE '%% %%' OR telephone LIKE '+221%%'
+'''
 
 def create_tables():
     """
@@ -8,6 +22,12 @@ def create_tables():
     if not connection:
         return False
     
+    if MOTEUR == 'sqlite':
+        # Le schéma SQLite est créé à l'ouverture de la base (database/sqlite.py)
+        close_connection(connection)
+        print("✓ Tables créées avec succès!")
+        return True
+    
     try:
         cursor = connection.cursor()
         
@@ -42,22 +62,75 @@ def create_tables():
             )
         ''')
         
-        # Table des rendez-vous
+        # Table des rendez-vous, partitionnée par mois de date_rdv
+        cursor.execute(CREATE_RENDEZ_VOUS)
+        if est_partitionnee(cursor):
+            create_partitionnement(cursor)
+            creer_partitions(cursor)
+        else:
+            print("! rendez_vous n'est pas partitionnée : lancer migrer_partitionnement()")
+        
+        # Liste d'attente : un médecin précis ou une spécialité, sur une période
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rendez_vous (
+            CREATE TABLE IF NOT EXISTS liste_attente (
                 id SERIAL PRIMARY KEY,
-                patient_id INTEGER REFERENCES patients(id) ON DELETE CASCADE,
+                patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
                 medecin_id INTEGER REFERENCES utilisateurs(id) ON DELETE CASCADE,
-                date_rdv DATE NOT NULL,
-                heure_rdv TIME NOT NULL,
+                specialite VARCHAR(100),
+                date_debut DATE NOT NULL,
+                date_fin DATE NOT NULL,
+                priorite INTEGER NOT NULL DEFAULT 0,
                 motif TEXT,
-                statut VARCHAR(20) DEFAULT 'planifie' 
-                    CHECK (statut IN ('planifie', 'termine', 'annule')),
-                notes TEXT,
+                statut VARCHAR(20) NOT NULL DEFAULT 'en_attente'
+                    CHECK (statut IN ('en_attente', 'servi', 'retire')),
+                rdv_id INTEGER,
+                date_inscription TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                CHECK (medecin_id IS NOT NULL OR specialite IS NOT NULL),
+                CHECK (date_debut <= date_fin)
+            )
+        ''')
+        # Chargement de la liste d'attente : inscriptions en cours uniquement
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attente_en_cours
+            ON liste_attente (date_fin)
+            WHERE statut = 'en_attente'
+        ''')
+        
+        # File des tâches de fond (database/taches.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS taches (
+                id SERIAL PRIMARY KEY,
+                nom VARCHAR(50) NOT NULL,
+                parametres TEXT NOT NULL DEFAULT '{}',
+                statut VARCHAR(20) NOT NULL DEFAULT 'en_attente'
+                    CHECK (statut IN ('en_attente', 'en_cours', 'terminee', 'echouee')),
+                tentatives INTEGER NOT NULL DEFAULT 0,
+                max_tentatives INTEGER NOT NULL DEFAULT 5,
+                executer_apres TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                bail TIMESTAMP,
+                cle_unicite VARCHAR(100),
+                resultat TEXT,
+                derniere_erreur TEXT,
                 date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(medecin_id, date_rdv, heure_rdv)
+                date_fin TIMESTAMP
             )
         ''')
+        # Prise d'une tâche : seules les tâches en attente sont parcourues
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_taches_a_faire
+            ON taches (executer_apres)
+            WHERE statut = 'en_attente'
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_taches_unicite
+            ON taches (cle_unicite)
+            WHERE cle_unicite IS NOT NULL
+        ''')
+        
+        cursor.execute(NORMALISER_TELEPHONES)
+        create_indexes(cursor)
+        create_statistiques(cursor)
+        create_synchronisation(cursor)
         
         connection.commit()
         print("✓ Tables créées avec succès!")
@@ -71,6 +144,259 @@ def create_tables():
         cursor.close()
         close_connection(connection)
 
+def create_indexes(cursor):
+    """
+    Crée les index secondaires (idempotent, peut être relancé sur une base existante).
+    """
+    # Tri et pagination par clé de la liste des patients
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_patients_nom_prenom_id
+        ON patients (nom, prenom, id)
+    ''')
+    
+    # Recherche de patients : trigrammes sur le nom complet sans accents
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() n'est pas IMMUTABLE : cette enveloppe permet de l'utiliser dans un index
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_patients_nom_complet_trgm
+        ON patients USING GIN (f_unaccent(nom || ' ' || prenom) gin_trgm_ops)
+    ''')
+    
+    # Recherche par début de numéro de téléphone (LIKE 'xxx%')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_patients_telephone_prefixe
+        ON patients (telephone text_pattern_ops)
+    ''')
+    # Détection des patients déjà connus à l'import (database/import_patients.py)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_patients_telephone_naissance
+        ON patients (telephone, date_naissance)
+    ''')
+
+    
+    # Un seul rendez-vous actif par créneau : un créneau annulé peut être réservé à nouveau.
+    # Remplace l'ancienne contrainte UNIQUE(medecin_id, date_rdv, heure_rdv) des bases existantes.
+    cursor.execute('''
+        ALTER TABLE rendez_vous
+        DROP CONSTRAINT IF EXISTS rendez_vous_medecin_id_date_rdv_heure_rdv_key
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_rdv_creneau_actif
+        ON rendez_vous (medecin_id, date_rdv, heure_rdv)
+        WHERE statut <> 'annule'
+    ''')
+
+    
+    # Listes de rendez-vous filtrées puis triées par date_rdv DESC, heure_rdv DESC :
+    # chaque filtre dispose d'un index qui fournit directement l'ordre voulu
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_patient_date
+        ON rendez_vous (patient_id, date_rdv, heure_rdv)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_medecin_date
+        ON rendez_vous (medecin_id, date_rdv, heure_rdv)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_date
+        ON rendez_vous (date_rdv, heure_rdv)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_statut_date
+        ON rendez_vous (statut, date_rdv, heure_rdv)
+    ''')
+    # Les rendez-vous à venir (statut 'planifie') sont les plus consultés
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_planifie_date
+        ON rendez_vous (date_rdv, heure_rdv)
+        WHERE statut = 'planifie'
+    ''')
+
+def create_statistiques(cursor):
+    """
+    Crée les tables de statistiques et les triggers qui les tiennent à jour
+    à chaque écriture (idempotent). Les tableaux de bord lisent ces tables
+    résumées au lieu de parcourir l'historique complet.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_rdv_jour (
+            jour DATE NOT NULL,
+            medecin_id INTEGER NOT NULL,
+            statut VARCHAR(20) NOT NULL,
+            nombre INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (jour, medecin_id, statut)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_patients_semaine (
+            semaine DATE PRIMARY KEY,
+            nombre INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Les déplacements de lignes (partitions, archivage) et les chargements suivis
+    # d'un recalcul (generateur.py) ne changent pas les compteurs
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION maj_stats_rdv() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF current_setting('{DRAPEAU_DEPLACEMENT}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE stats_rdv_jour SET nombre = nombre - 1
+                WHERE jour = OLD.date_rdv AND medecin_id = OLD.medecin_id AND statut = OLD.statut;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO stats_rdv_jour (jour, medecin_id, statut, nombre)
+                VALUES (NEW.date_rdv, NEW.medecin_id, NEW.statut, 1)
+                ON CONFLICT (jour, medecin_id, statut)
+                DO UPDATE SET nombre = stats_rdv_jour.nombre + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    cursor.execute("DROP TRIGGER IF EXISTS trg_stats_rdv ON rendez_vous")
+    # Seuls les changements de jour, de médecin ou de statut modifient les compteurs
+    cursor.execute('''
+        CREATE TRIGGER trg_stats_rdv
+        AFTER INSERT OR DELETE OR UPDATE OF date_rdv, medecin_id, statut ON rendez_vous
+        FOR EACH ROW EXECUTE FUNCTION maj_stats_rdv()
+    ''')
+    
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION maj_stats_patients() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF current_setting('{DRAPEAU_DEPLACEMENT}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                UPDATE stats_patients_semaine SET nombre = nombre - 1
+                WHERE semaine = date_trunc('week', OLD.date_inscription)::date;
+            ELSE
+                INSERT INTO stats_patients_semaine (semaine, nombre)
+                VALUES (date_trunc('week', NEW.date_inscription)::date, 1)
+                ON CONFLICT (semaine) DO UPDATE SET nombre = stats_patients_semaine.nombre + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    cursor.execute("DROP TRIGGER IF EXISTS trg_stats_patients ON patients")
+    cursor.execute('''
+        CREATE TRIGGER trg_stats_patients
+        AFTER INSERT OR DELETE ON patients
+        FOR EACH ROW EXECUTE FUNCTION maj_stats_patients()
+    ''')
+
+    # Base existante : tables de statistiques vides, remplies une fois à partir des données.
+    # Les triggers ci-dessus bloquent les écritures sur rendez_vous et patients jusqu'au commit.
+    cursor.execute('''
+        SELECT EXISTS (SELECT 1 FROM stats_rdv_jour),
+               EXISTS (SELECT 1 FROM stats_patients_semaine),
+               to_regclass('rendez_vous_archive') IS NOT NULL
+    ''')
+    stats_rdv, stats_patients, archive = cursor.fetchone()
+    if not stats_rdv:
+        source = "SELECT date_rdv, medecin_id, statut FROM rendez_vous"
+        if archive:
+            source += " UNION ALL SELECT date_rdv, medecin_id, statut FROM rendez_vous_archive"
+        cursor.execute(f'''
+            INSERT INTO stats_rdv_jour (jour, medecin_id, statut, nombre)
+            SELECT date_rdv, medecin_id, statut, COUNT(*)
+            FROM ({source}) r
+            GROUP BY date_rdv, medecin_id, statut
+        ''')
+    if not stats_patients:
+        cursor.execute(RECALCUL_PATIENTS)
+
+def migrer_index():
+    """
+    Ajoute les index manquants à une base existante.
+    """
+    connection = get_connection()
+    if not connection:
+        return False
+    
+    try:
+        cursor = connection.cursor()
+        create_indexes(cursor)
+        cursor.execute("ANALYZE patients")
+        cursor.execute("ANALYZE rendez_vous")
+        connection.commit()
+        print("✓ Index créés avec succès!")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Erreur lors de la création des index : {e}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+def migrer_partitionnement():
+    """
+    Convertit une table rendez_vous existante en table partitionnée par mois.
+    Les lignes sont recopiées dans une seule transaction (table verrouillée pendant
+    la copie), puis index et triggers sont recréés sur la nouvelle table.
+    """
+    connection = get_connection()
+    if not connection:
+        return False
+    
+    try:
+        cursor = connection.cursor()
+        if est_partitionnee(cursor):
+            print("rendez_vous est déjà partitionnée.")
+            return True
+        
+        cursor.execute("LOCK TABLE rendez_vous IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("ALTER TABLE rendez_vous RENAME TO rendez_vous_avant_partition")
+        cursor.execute(CREATE_RENDEZ_VOUS)
+        # La séquence des identifiants est reprise telle quelle
+        cursor.execute("ALTER TABLE rendez_vous ALTER COLUMN id SET DEFAULT nextval('rendez_vous_id_seq')")
+        cursor.execute("ALTER SEQUENCE rendez_vous_id_seq OWNED BY rendez_vous.id")
+        cursor.execute("DROP SEQUENCE IF EXISTS rendez_vous_id_seq1")
+        create_partitionnement(cursor)
+        
+        cursor.execute("SELECT MIN(date_rdv), MAX(date_rdv) FROM rendez_vous_avant_partition")
+        debut, fin = cursor.fetchone()
+        creer_partitions(cursor)
+        if debut:
+            creer_partitions(cursor, debut, fin)
+        
+        # Copie avant la création des index et des triggers (les statistiques sont déjà à jour)
+        cursor.execute(f'''
+            INSERT INTO rendez_vous ({COLONNES_RDV})
+            SELECT {COLONNES_RDV} FROM rendez_vous_avant_partition
+        ''')
+        copies = cursor.rowcount
+        cursor.execute("DROP TABLE rendez_vous_avant_partition")
+        
+        create_indexes(cursor)
+        create_statistiques(cursor)
+        cursor.execute("ANALYZE rendez_vous")
+        connection.commit()
+        print(f"✓ rendez_vous partitionnée ({copies} rendez-vous copiés)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Erreur lors du partitionnement : {e}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+        close_connection(connection)
+
 def insert_default_users():
     """
     Insère des utilisateurs par défaut pour tester l'application.
@@ -91,13 +417,15 @@ def insert_default_users():
             cursor.execute('''
                 INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite, telephone)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ''', ('Diop', 'Amadou', 'dr.diop@clinique.sn', 'medecin123', 'medecin', 'Cardiologie', '771234567'))
+            ''', ('Diop', 'Amadou', 'dr.diop@clinique.sn', hacher_mot_de_passe('medecin123'),
+                  'medecin', 'Cardiologie', '771234567'))
             
             # Secrétaire par défaut
             cursor.execute('''
                 INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, telephone)
                 VALUES (%s, %s, %s, %s, %s, %s)
-            ''', ('Ndiaye', 'Fatou', 'secretaire@clinique.sn', 'secretaire123', 'secretaire', '776543210'))
+            ''', ('Ndiaye', 'Fatou', 'secretaire@clinique.sn', hacher_mot_de_passe('secretaire123'),
+                  'secretaire', '776543210'))
             
             connection.commit()
             print("✓ Utilisateurs par défaut créés!")
@@ -0,0 +1,40 @@
+"""
+Curseur psycopg2 instrumenté : durée, lignes et erreurs de chaque requête
+(voir utils/metriques.py). Sans effet tant que l'instrumentation est désactivée.
+"""
+import time
+
+from psycopg2.extensions import cursor as _cursor
+
+from utils.metriques import etat, enregistrer_requete
+
+
+class CurseurInstrumente(_cursor):
+    """
+    Curseur par défaut des connexions du pool.
+    """
+
+    def _mesurer(self, methode, requete, *args):
+        debut = time.perf_counter()
+        try:
+            resultat = methode(*args)
+        except Exception as e:
+            enregistrer_requete(requete, time.perf_counter() - debut, 0, e)
+            raise
+        enregistrer_requete(requete, time.perf_counter() - debut, self.rowcount)
+        return resultat
+
+    def execute(self, query, vars=None):
+        if not etat.actif:
+            return super().execute(query, vars)
+        return self._mesurer(super().execute, query, query, vars)
+
+    def executemany(self, query, vars_list):
+        if not etat.actif:
+            return super().executemany(query, vars_list)
+        return self._mesurer(super().executemany, query, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        if not etat.actif:
+            return super().copy_expert(sql, file, size)
+        return self._mesurer(super().copy_expert, sql, sql, file, size)
@@ -0,0 +1,101 @@
+"""
+Invalidation des caches entre plusieurs processus de l'application via LISTEN/NOTIFY.
+
+Chaque écriture publie sur le canal CANAL le nom du cache et la clé modifiée ;
+le thread démarré par demarrer_ecoute() invalide l'entrée correspondante localement.
+"""
+import json
+import select
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+from database.config import DB_CONFIG
+from database.sqlite import equivalent
+from utils.cache import CACHES
+
+CANAL = 'clinique_cache'
+
+REQUETE_NOTIFICATION = "SELECT pg_notify(%s, %s)"
+
+# Une base SQLite n'est utilisée que par un seul poste : rien à publier
+equivalent(REQUETE_NOTIFICATION)
+
+_arret = threading.Event()
+_thread = None
+
+
+def message_invalidation(nom_cache, cle=None):
+    return json.dumps({'cache': nom_cache, 'cle': cle})
+
+
+def notifier_invalidation(cursor, nom_cache, cle=None):
+    """
+    Publie l'invalidation d'une clé (ou de tout le cache si cle vaut None).
+    La notification n'est envoyée qu'au COMMIT de la transaction en cours.
+    """
+    cursor.execute(REQUETE_NOTIFICATION, (CANAL, message_invalidation(nom_cache, cle)))
+
+
+def appliquer_notification(payload):
+    """
+    Invalide localement l'entrée décrite par une notification.
+    """
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return
+    cache = CACHES.get(message.get('cache'))
+    if cache is None:
+        return
+    if message.get('cle') is None:
+        cache.vider()
+    else:
+        cache.invalider(message['cle'])
+
+
+def _ecouter(intervalle):
+    connection = None
+    while not _arret.is_set():
+        try:
+            if connection is None or connection.closed:
+                connection = psycopg2.connect(**DB_CONFIG)
+                connection.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                connection.cursor().execute(f"LISTEN {CANAL}")
+                # Des notifications ont pu être perdues pendant la coupure
+                for cache in CACHES.values():
+                    cache.vider()
+
+            if select.select([connection], [], [], intervalle) == ([], [], []):
+                continue
+            connection.poll()
+            while connection.notifies:
+                appliquer_notification(connection.notifies.pop(0).payload)
+
+        except psycopg2.Error as e:
+            print(f"Erreur d'écoute des invalidations de cache : {e}")
+            if connection is not None:
+                connection.close()
+            connection = None
+            _arret.wait(intervalle)
+
+    if connection is not None:
+        connection.close()
+
+
+def demarrer_ecoute(intervalle=5):
+    """
+    Démarre (une seule fois) le thread d'écoute des invalidations.
+    """
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    _arret.clear()
+    _thread = threading.Thread(target=_ecouter, args=(intervalle,), daemon=True,
+                               name='invalidation-cache')
+    _thread.start()
+
+
+def arreter_ecoute():
+    _arret.set()
@@ -0,0 +1,266 @@
+"""
+Partitionnement mensuel et archivage des rendez-vous.
+
+rendez_vous est partitionnée par mois de date_rdv (rendez_vous_AAAA_MM), avec une
+partition par défaut qui reçoit les dates hors des partitions existantes. Les
+partitions des mois à venir sont créées d'avance (creer_partitions, relancé par la
+maintenance) ; une ligne tombée dans la partition par défaut est déplacée dans sa
+partition mensuelle lors de la création de celle-ci.
+
+L'archivage déplace les rendez-vous terminés ou annulés plus anciens que
+ANCIENNETE_ARCHIVAGE jours dans rendez_vous_archive, un mois à la fois, et
+supprime les partitions devenues vides. Les statistiques ne sont pas modifiées
+par ces déplacements.
+
+Usage : python database/partitions.py creer [--mois 12]
+        python database/partitions.py archiver [--avant YYYY-MM-DD]
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+
+# Nombre de mois à venir pour lesquels une partition existe toujours
+MOIS_AVANCE = 12
+
+# Âge (en jours) à partir duquel les rendez-vous terminés ou annulés sont archivés
+ANCIENNETE_ARCHIVAGE = 365
+
+# Mis à 'on' pendant un déplacement de lignes : les triggers de statistiques l'ignorent
+DRAPEAU_DEPLACEMENT = 'clinique.deplacement'
+
+CREATE_RENDEZ_VOUS = '''
+    CREATE TABLE IF NOT EXISTS rendez_vous (
+        id SERIAL,
+        patient_id INTEGER REFERENCES patients(id) ON DELETE CASCADE,
+        medecin_id INTEGER REFERENCES utilisateurs(id) ON DELETE CASCADE,
+        date_rdv DATE NOT NULL,
+        heure_rdv TIME NOT NULL,
+        motif TEXT,
+        statut VARCHAR(20) DEFAULT 'planifie'
+            CHECK (statut IN ('planifie', 'termine', 'annule')),
+        notes TEXT,
+        date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, date_rdv)
+    ) PARTITION BY RANGE (date_rdv)
+'''
+
+COLONNES_RDV = ('id, patient_id, medecin_id, date_rdv, heure_rdv, motif, '
+                'statut, notes, date_creation')
+
+
+def est_partitionnee(cursor):
+    """
+    Vrai si rendez_vous est déjà une table partitionnée (sinon : migrer_partitionnement).
+    """
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('rendez_vous')")
+    ligne = cursor.fetchone()
+    return bool(ligne and ligne[0])
+
+
+def create_partitionnement(cursor):
+    """
+    Crée la partition par défaut, la table d'archive et la fonction de création
+    des partitions mensuelles (idempotent).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rendez_vous_defaut
+        PARTITION OF rendez_vous DEFAULT
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rendez_vous_archive (
+            id INTEGER PRIMARY KEY,
+            patient_id INTEGER REFERENCES patients(id) ON DELETE CASCADE,
+            medecin_id INTEGER REFERENCES utilisateurs(id) ON DELETE CASCADE,
+            date_rdv DATE NOT NULL,
+            heure_rdv TIME NOT NULL,
+            motif TEXT,
+            statut VARCHAR(20) NOT NULL,
+            notes TEXT,
+            date_creation TIMESTAMP,
+            date_archivage TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_archive_patient_date
+        ON rendez_vous_archive (patient_id, date_rdv, heure_rdv)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rdv_archive_medecin_date
+        ON rendez_vous_archive (medecin_id, date_rdv, heure_rdv)
+    ''')
+
+    # Crée la partition du mois contenant `mois` ; retourne false si elle existe déjà
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION creer_partition_rdv(mois DATE) RETURNS BOOLEAN
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            debut DATE := date_trunc('month', mois)::date;
+            fin DATE := (date_trunc('month', mois) + INTERVAL '1 month')::date;
+            nom TEXT := 'rendez_vous_' || to_char(mois, 'YYYY_MM');
+        BEGIN
+            IF to_regclass(nom) IS NOT NULL THEN
+                RETURN false;
+            END IF;
+            EXECUTE format('CREATE TABLE %I (LIKE rendez_vous INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', nom);
+            -- Rapatrie les lignes du mois arrivées entre-temps dans la partition par défaut
+            PERFORM set_config('{DRAPEAU_DEPLACEMENT}', 'on', true);
+            EXECUTE format(
+                'WITH deplaces AS (DELETE FROM rendez_vous_defaut
+                                   WHERE date_rdv >= %L AND date_rdv < %L RETURNING *)
+                 INSERT INTO %I SELECT * FROM deplaces', debut, fin, nom);
+            PERFORM set_config('{DRAPEAU_DEPLACEMENT}', 'off', true);
+            EXECUTE format('ALTER TABLE rendez_vous ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           nom, debut, fin);
+            RETURN true;
+        END
+        $$
+    ''')
+
+
+def _mois(jour):
+    return jour.replace(day=1)
+
+
+def _mois_suivant(mois):
+    return (mois.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def creer_partitions(cursor, debut=None, fin=None, mois_avance=MOIS_AVANCE):
+    """
+    Crée les partitions mensuelles manquantes de `debut` à `fin` inclus
+    (par défaut du mois courant à `mois_avance` mois plus tard).
+    Retourne le nombre de partitions créées.
+    """
+    mois = _mois(debut or date.today())
+    if fin is None:
+        fin = mois
+        for _ in range(mois_avance):
+            fin = _mois_suivant(fin)
+
+    creees = 0
+    while mois <= fin:
+        cursor.execute("SELECT creer_partition_rdv(%s)", (mois,))
+        creees += cursor.fetchone()[0]
+        mois = _mois_suivant(mois)
+    return creees
+
+
+def maintenir_partitions(mois_avance=MOIS_AVANCE):
+    """
+    Crée les partitions des prochains mois (à lancer régulièrement).
+    Retourne (succes, message).
+    """
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+
+    try:
+        cursor = connection.cursor()
+        creees = creer_partitions(cursor, mois_avance=mois_avance)
+        connection.commit()
+        return True, f"{creees} partition(s) créée(s)"
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def archiver_periode(cursor, debut, fin):
+    """
+    Déplace dans rendez_vous_archive les rendez-vous terminés ou annulés
+    de `debut` (inclus) à `fin` (exclue), dans la transaction en cours.
+    Retourne le nombre de rendez-vous archivés.
+    """
+    cursor.execute("SELECT set_config(%s, 'on', true)", (DRAPEAU_DEPLACEMENT,))
+    cursor.execute(f'''
+        WITH deplaces AS (
+            DELETE FROM rendez_vous
+            WHERE date_rdv >= %s AND date_rdv < %s AND statut IN ('termine', 'annule')
+            RETURNING {COLONNES_RDV}
+        )
+        INSERT INTO rendez_vous_archive ({COLONNES_RDV})
+        SELECT {COLONNES_RDV} FROM deplaces
+    ''', (debut, fin))
+    archives = cursor.rowcount
+    cursor.execute("SELECT set_config(%s, 'off', true)", (DRAPEAU_DEPLACEMENT,))
+    return archives
+
+
+def archiver_rendez_vous(avant=None):
+    """
+    Déplace dans rendez_vous_archive les rendez-vous terminés ou annulés
+    antérieurs à `avant` (par défaut il y a ANCIENNETE_ARCHIVAGE jours).
+    Un mois par transaction ; les partitions vidées sont supprimées.
+    Retourne (succes, message).
+    """
+    avant = avant or date.today() - timedelta(days=ANCIENNETE_ARCHIVAGE)
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+
+    archives = supprimees = 0
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            SELECT MIN(date_rdv) FROM rendez_vous
+            WHERE statut IN ('termine', 'annule') AND date_rdv < %s
+        ''', (avant,))
+        plus_ancien = cursor.fetchone()[0]
+        if plus_ancien is None:
+            return True, "Aucun rendez-vous à archiver"
+
+        mois = _mois(plus_ancien)
+        while mois < avant:
+            fin = min(_mois_suivant(mois), avant)
+
+            archives += archiver_periode(cursor, mois, fin)
+
+            # Mois entièrement passé et vide : la partition n'a plus d'utilité
+            partition = f"rendez_vous_{mois:%Y_%m}"
+            if fin == _mois_suivant(mois):
+                cursor.execute("SELECT to_regclass(%s)", (partition,))
+                if cursor.fetchone()[0]:
+                    cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {partition})")
+                    if cursor.fetchone()[0]:
+                        cursor.execute(f"DROP TABLE {partition}")
+                        supprimees += 1
+
+            connection.commit()
+            mois = _mois_suivant(mois)
+
+        return True, f"{archives} rendez-vous archivé(s), {supprimees} partition(s) supprimée(s)"
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur lors de l'archivage (après {archives} rendez-vous) : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partitions et archivage des rendez-vous")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    creer = sous_commandes.add_parser('creer', help="Créer les partitions des prochains mois")
+    creer.add_argument('--mois', type=int, default=MOIS_AVANCE)
+    archiver = sous_commandes.add_parser('archiver', help="Archiver les anciens rendez-vous")
+    archiver.add_argument('--avant', type=date.fromisoformat,
+                          help="Date limite (défaut : il y a %d jours)" % ANCIENNETE_ARCHIVAGE)
+    args = parser.parse_args()
+
+    if args.commande == 'creer':
+        succes, message = maintenir_partitions(args.mois)
+    else:
+        succes, message = archiver_rendez_vous(args.avant)
+    print(f"{'✓' if succes else '✗'} {message}")
+    sys.exit(0 if succes else 1)
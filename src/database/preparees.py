@@ -0,0 +1,104 @@
+"""
+Instructions préparées (PREPARE / EXECUTE) pour les requêtes les plus fréquentes.
+
+Les modèles enregistrent leurs requêtes sous un nom (enregistrer) puis les exécutent
+avec executer(). Chaque connexion du pool mémorise les noms déjà préparés dans sa
+session : le texte SQL n'est envoyé, analysé et planifié qu'une fois par connexion.
+
+Une connexion remplacée par le pool repart d'un ensemble vide. Si le serveur a
+perdu une instruction (session réinitialisée, DEALLOCATE), elle est préparée à
+nouveau ; hors connexion du pool, la requête est simplement exécutée telle quelle.
+"""
+import itertools
+import re
+
+from psycopg2 import errors
+from psycopg2.extensions import connection as _connection, TRANSACTION_STATUS_IDLE
+
+from database.instrumentation import CurseurInstrumente
+
+# nom -> (requête d'origine, PREPARE ..., ordre des paramètres)
+INSTRUCTIONS = {}
+
+_PARAMETRE = re.compile(r'%%|%\((\w+)\)s|%s')
+
+
+class ConnexionPreparee(_connection):
+    """
+    Connexion psycopg2 qui retient les instructions préparées dans sa session.
+    Ses curseurs sont instrumentés (voir database/instrumentation.py).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparees = set()
+        self.cursor_factory = CurseurInstrumente
+
+
+def numeroter_parametres(requete):
+    """
+    Remplace les paramètres psycopg2 (%s, %(nom)s, %%) par $1, $2...
+    Retourne (requete, ordre) : ordre donne pour chaque $n l'indice (int)
+    ou le nom du paramètre à lui associer.
+    """
+    ordre = []
+    positions = {}
+    compteur = itertools.count()
+
+    def remplacer(correspondance):
+        if correspondance.group(0) == '%%':
+            return '%'
+        nom = correspondance.group(1)
+        if nom is None:
+            ordre.append(next(compteur))
+            return f"${len(ordre)}"
+        if nom not in positions:
+            ordre.append(nom)
+            positions[nom] = len(ordre)
+        return f"${positions[nom]}"
+
+    return _PARAMETRE.sub(remplacer, requete), ordre
+
+
+def enregistrer(nom, requete, types=None):
+    """
+    Enregistre une requête au format psycopg2 sous le nom `nom`.
+    `types` (types SQL dans l'ordre des paramètres) est nécessaire quand le serveur
+    ne peut pas les déduire de la requête.
+    """
+    texte, ordre = numeroter_parametres(requete)
+    signature = f" ({', '.join(types)})" if types else ""
+    INSTRUCTIONS[nom] = (requete, f"PREPARE {nom}{signature} AS {texte}", ordre)
+
+
+def executer(cursor, nom, params=()):
+    """
+    Exécute l'instruction enregistrée `nom` sur le curseur (préparée au premier appel
+    sur la connexion). Les résultats se lisent ensuite sur le curseur comme d'habitude.
+    """
+    requete, preparation, ordre = INSTRUCTIONS[nom]
+    connection = cursor.connection
+    if not isinstance(connection, ConnexionPreparee):
+        cursor.execute(requete, params)
+        return
+
+    valeurs = [params[cle] for cle in ordre]
+    execution = f"EXECUTE {nom} ({', '.join(['%s'] * len(valeurs))})" if valeurs else f"EXECUTE {nom}"
+    hors_transaction = connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+
+    if nom not in connection.preparees:
+        cursor.execute(preparation)
+        connection.preparees.add(nom)
+
+    try:
+        cursor.execute(execution, valeurs)
+    except errors.InvalidSqlStatementName:
+        # Instruction inconnue du serveur : la transaction est perdue. Elle ne peut être
+        # rejouée que si elle ne contenait rien d'autre que cette instruction.
+        connection.preparees.discard(nom)
+        if not hors_transaction:
+            raise
+        connection.rollback()
+        cursor.execute(preparation)
+        connection.preparees.add(nom)
+        cursor.execute(execution, valeurs)
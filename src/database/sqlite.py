@@ -0,0 +1,465 @@
+"""
+Moteur de stockage SQLite, pour les sites sans serveur PostgreSQL (un seul poste).
+
+Les modèles gardent leurs requêtes écrites pour PostgreSQL : le curseur de ce module
+les traduit une fois (traduire, mise en cache) puis SQLite les prépare et garde les
+instructions compilées dans son propre cache (cached_statements) :
+  - paramètres %s / %(nom)s -> ? / :nom ; ILIKE -> LIKE ; conversions ::type retirées ;
+  - = ANY(%s) (liste Python) -> IN (SELECT value FROM json_each(?)) ;
+  - CURRENT_DATE -> date locale du poste ;
+  - f_unaccent() et similarity() sont fournies par des fonctions Python.
+Les quelques requêtes sans traduction directe (CTE avec INSERT, json_agg, LOCK...)
+ont un équivalent enregistré par le modèle avec equivalent().
+
+La base est en mode WAL (lectures pendant une écriture) ; le schéma et ses index
+sont créés à la première ouverture du fichier.
+"""
+import functools
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import date, datetime, time as heure
+
+from utils.metriques import etat as etat_metriques, enregistrer_requete
+
+# Nombre maximal de variables liées par instruction (SQLite >= 3.32)
+MAX_VARIABLES = 32766
+
+PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",      # sûr en mode WAL, évite un fsync par COMMIT
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",        # 8 Mo par connexion
+    "PRAGMA mmap_size = 67108864",
+)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS utilisateurs (
+        id INTEGER PRIMARY KEY,
+        nom TEXT NOT NULL,
+        prenom TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        mot_de_passe TEXT NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('medecin', 'secretaire')),
+        specialite TEXT,
+        telephone TEXT,
+        date_creation TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+    );
+
+    CREATE TABLE IF NOT EXISTS patients (
+        id INTEGER PRIMARY KEY,
+        nom TEXT NOT NULL,
+        prenom TEXT NOT NULL,
+        date_naissance DATE NOT NULL,
+        sexe TEXT CHECK (sexe IN ('M', 'F', 'Autre')),
+        adresse TEXT,
+        telephone TEXT NOT NULL,
+        email TEXT,
+        numero_securite_sociale TEXT,
+        date_inscription TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        uid TEXT UNIQUE NOT NULL DEFAULT (lower(hex(randomblob(16))))
+    );
+
+    CREATE TABLE IF NOT EXISTS rendez_vous (
+        id INTEGER PRIMARY KEY,
+        patient_id INTEGER REFERENCES patients(id) ON DELETE CASCADE,
+        medecin_id INTEGER REFERENCES utilisateurs(id) ON DELETE CASCADE,
+        date_rdv DATE NOT NULL,
+        heure_rdv TIME NOT NULL,
+        motif TEXT,
+        statut TEXT DEFAULT 'planifie' CHECK (statut IN ('planifie', 'termine', 'annule')),
+        notes TEXT,
+        date_creation TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        uid TEXT UNIQUE NOT NULL DEFAULT (lower(hex(randomblob(16))))
+    );
+
+    CREATE TABLE IF NOT EXISTS rendez_vous_archive (
+        id INTEGER PRIMARY KEY,
+        patient_id INTEGER REFERENCES patients(id) ON DELETE CASCADE,
+        medecin_id INTEGER REFERENCES utilisateurs(id) ON DELETE CASCADE,
+        date_rdv DATE NOT NULL,
+        heure_rdv TIME NOT NULL,
+        motif TEXT,
+        statut TEXT,
+        notes TEXT,
+        date_creation TIMESTAMP,
+        date_archivage TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+    );
+
+    CREATE TABLE IF NOT EXISTS liste_attente (
+        id INTEGER PRIMARY KEY,
+        patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+        medecin_id INTEGER REFERENCES utilisateurs(id) ON DELETE CASCADE,
+        specialite TEXT,
+        date_debut DATE NOT NULL,
+        date_fin DATE NOT NULL,
+        priorite INTEGER NOT NULL DEFAULT 0,
+        motif TEXT,
+        statut TEXT NOT NULL DEFAULT 'en_attente' CHECK (statut IN ('en_attente', 'servi', 'retire')),
+        rdv_id INTEGER,
+        date_inscription TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        CHECK (medecin_id IS NOT NULL OR specialite IS NOT NULL),
+        CHECK (date_debut <= date_fin)
+    );
+
+    CREATE TABLE IF NOT EXISTS taches (
+        id INTEGER PRIMARY KEY,
+        nom TEXT NOT NULL,
+        parametres TEXT NOT NULL DEFAULT '{}',
+        statut TEXT NOT NULL DEFAULT 'en_attente'
+            CHECK (statut IN ('en_attente', 'en_cours', 'terminee', 'echouee')),
+        tentatives INTEGER NOT NULL DEFAULT 0,
+        max_tentatives INTEGER NOT NULL DEFAULT 5,
+        executer_apres TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+        bail TIMESTAMP,
+        cle_unicite TEXT,
+        resultat TEXT,
+        derniere_erreur TEXT,
+        date_creation TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        date_fin TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_rdv_jour (
+        jour DATE NOT NULL,
+        medecin_id INTEGER NOT NULL,
+        statut TEXT NOT NULL,
+        nombre INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (jour, medecin_id, statut)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS stats_patients_semaine (
+        semaine DATE PRIMARY KEY,
+        nombre INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_patients_nom_prenom_id ON patients (nom, prenom, id);
+    -- L'optimisation de LIKE 'xxx%' exige un index NOCASE (LIKE ignore la casse)
+    CREATE INDEX IF NOT EXISTS idx_patients_telephone_prefixe
+        ON patients (telephone COLLATE NOCASE);
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_rdv_creneau_actif
+        ON rendez_vous (medecin_id, date_rdv, heure_rdv) WHERE statut <> 'annule';
+    CREATE INDEX IF NOT EXISTS idx_rdv_patient_date ON rendez_vous (patient_id, date_rdv, heure_rdv);
+    CREATE INDEX IF NOT EXISTS idx_rdv_medecin_date ON rendez_vous (medecin_id, date_rdv, heure_rdv);
+    CREATE INDEX IF NOT EXISTS idx_rdv_date ON rendez_vous (date_rdv, heure_rdv);
+    CREATE INDEX IF NOT EXISTS idx_rdv_statut_date ON rendez_vous (statut, date_rdv, heure_rdv);
+    CREATE INDEX IF NOT EXISTS idx_rdv_archive_patient_date
+        ON rendez_vous_archive (patient_id, date_rdv, heure_rdv);
+    CREATE INDEX IF NOT EXISTS idx_rdv_archive_medecin_date
+        ON rendez_vous_archive (medecin_id, date_rdv, heure_rdv);
+    CREATE INDEX IF NOT EXISTS idx_attente_en_cours
+        ON liste_attente (date_fin) WHERE statut = 'en_attente';
+    CREATE INDEX IF NOT EXISTS idx_taches_a_faire
+        ON taches (executer_apres) WHERE statut = 'en_attente';
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_taches_unicite
+        ON taches (cle_unicite) WHERE cle_unicite IS NOT NULL;
+
+    -- Statistiques tenues à jour comme dans init_db.create_statistiques
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rdv_insert AFTER INSERT ON rendez_vous BEGIN
+        INSERT OR IGNORE INTO stats_rdv_jour VALUES (NEW.date_rdv, NEW.medecin_id, NEW.statut, 0);
+        UPDATE stats_rdv_jour SET nombre = nombre + 1
+        WHERE jour = NEW.date_rdv AND medecin_id = NEW.medecin_id AND statut = NEW.statut;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rdv_delete AFTER DELETE ON rendez_vous BEGIN
+        UPDATE stats_rdv_jour SET nombre = nombre - 1
+        WHERE jour = OLD.date_rdv AND medecin_id = OLD.medecin_id AND statut = OLD.statut;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rdv_update
+    AFTER UPDATE OF date_rdv, medecin_id, statut ON rendez_vous BEGIN
+        UPDATE stats_rdv_jour SET nombre = nombre - 1
+        WHERE jour = OLD.date_rdv AND medecin_id = OLD.medecin_id AND statut = OLD.statut;
+        INSERT OR IGNORE INTO stats_rdv_jour VALUES (NEW.date_rdv, NEW.medecin_id, NEW.statut, 0);
+        UPDATE stats_rdv_jour SET nombre = nombre + 1
+        WHERE jour = NEW.date_rdv AND medecin_id = NEW.medecin_id AND statut = NEW.statut;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_patients_insert AFTER INSERT ON patients BEGIN
+        INSERT OR IGNORE INTO stats_patients_semaine
+        VALUES (date(NEW.date_inscription, '-6 days', 'weekday 1'), 0);
+        UPDATE stats_patients_semaine SET nombre = nombre + 1
+        WHERE semaine = date(NEW.date_inscription, '-6 days', 'weekday 1');
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_stats_patients_delete AFTER DELETE ON patients BEGIN
+        UPDATE stats_patients_semaine SET nombre = nombre - 1
+        WHERE semaine = date(OLD.date_inscription, '-6 days', 'weekday 1');
+    END;
+
+    -- Base créée avant les tables de statistiques : remplissage unique
+    INSERT INTO stats_rdv_jour (jour, medecin_id, statut, nombre)
+    SELECT date_rdv, medecin_id, statut, COUNT(*)
+    FROM (
+        SELECT date_rdv, medecin_id, statut FROM rendez_vous
+        UNION ALL
+        SELECT date_rdv, medecin_id, statut FROM rendez_vous_archive
+    )
+    WHERE NOT EXISTS (SELECT 1 FROM stats_rdv_jour)
+    GROUP BY date_rdv, medecin_id, statut;
+    INSERT INTO stats_patients_semaine (semaine, nombre)
+    SELECT date(date_inscription, '-6 days', 'weekday 1'), COUNT(*)
+    FROM patients
+    WHERE NOT EXISTS (SELECT 1 FROM stats_patients_semaine)
+    GROUP BY 1;
+
+    -- Numéros enregistrés avant la normalisation (voir init_db.NORMALISER_TELEPHONES)
+    UPDATE patients SET telephone = replace(replace(telephone, ' ', ''), '+221', '')
+    WHERE telephone LIKE '% %' OR telephone LIKE '+221%';
+'''
+
+# Valeurs Python -> SQLite (texte ISO, comparable et triable) et retour selon le type déclaré
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda valeur: valeur.isoformat(' '))
+sqlite3.register_adapter(heure, heure.isoformat)
+sqlite3.register_adapter(list, json.dumps)
+sqlite3.register_converter('DATE', lambda valeur: date.fromisoformat(valeur.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda valeur: datetime.fromisoformat(valeur.decode()))
+sqlite3.register_converter('TIME', lambda valeur: heure.fromisoformat(valeur.decode()))
+
+
+@functools.lru_cache(maxsize=4096)
+def f_unaccent(texte):
+    """
+    Équivalent de la fonction f_unaccent de PostgreSQL (voir init_db.create_indexes).
+    """
+    if texte is None:
+        return None
+    decompose = unicodedata.normalize('NFKD', texte)
+    return ''.join(c for c in decompose if not unicodedata.combining(c))
+
+
+def _trigrammes(texte):
+    trigrammes = set()
+    for mot in re.findall(r'\w+', texte.lower()):
+        mot = f"  {mot} "
+        trigrammes.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return trigrammes
+
+
+def similarity(texte, autre):
+    """
+    Similarité par trigrammes, calculée comme similarity() de pg_trgm.
+    """
+    if texte is None or autre is None:
+        return None
+    a, b = _trigrammes(texte), _trigrammes(autre)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# requête PostgreSQL -> instructions SQLite exécutées à sa place
+EQUIVALENTS = {}
+
+
+def equivalent(requete, *instructions):
+    """
+    Enregistre les instructions SQLite à exécuter à la place de `requete`
+    (dans l'ordre, avec les mêmes paramètres ; les résultats sont ceux de la dernière).
+    Sans instruction, la requête est ignorée sur SQLite.
+    """
+    EQUIVALENTS[requete] = tuple(instructions)
+    traduire.cache_clear()
+
+
+_REMPLACEMENTS = (
+    (re.compile(r'=\s*ANY\s*\(\s*%s\s*\)', re.IGNORECASE), 'IN (SELECT value FROM json_each(%s))'),
+    (re.compile(r'%\((\w+)\)s'), r':\1'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'%%'), '%'),
+    (re.compile(r'\bILIKE\b', re.IGNORECASE), 'LIKE'),
+    (re.compile(r'::\w+'), ''),
+    (re.compile(r'\bCURRENT_DATE\b', re.IGNORECASE), "date('now', 'localtime')"),
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def traduire(requete):
+    """
+    Retourne le tuple des instructions SQLite correspondant à une requête PostgreSQL.
+    """
+    if requete in EQUIVALENTS:
+        return EQUIVALENTS[requete]
+    for motif, remplacement in _REMPLACEMENTS:
+        requete = motif.sub(remplacement, requete)
+    return (requete,)
+
+
+class CurseurSQLite(sqlite3.Cursor):
+    """
+    Curseur qui accepte les requêtes écrites pour PostgreSQL et construit
+    les lignes avec `type_ligne` (tuples bruts si None), comme CurseurLignes.
+    """
+    type_ligne = None
+    itersize = 2000     # compatibilité avec les curseurs nommés : SQLite lit déjà au fil de l'eau
+
+    def execute(self, requete, params=()):
+        return self._executer(traduire(requete), params, requete)
+
+    def _executer(self, instructions, params, requete):
+        if not etat_metriques.actif:
+            for instruction in instructions:
+                super().execute(instruction, params)
+            return self
+
+        debut = time.perf_counter()
+        erreur = None
+        try:
+            for instruction in instructions:
+                super().execute(instruction, params)
+            return self
+        except Exception as e:
+            erreur = e
+            raise
+        finally:
+            enregistrer_requete(requete, time.perf_counter() - debut, self.rowcount, erreur)
+
+    def executemany(self, requete, lignes):
+        instruction, = traduire(requete)
+        return super().executemany(instruction, lignes)
+
+    def execute_values(self, requete, lignes, template=None, page_size=100, fetch=False):
+        """
+        Équivalent de psycopg2.extras.execute_values : `VALUES %s` reçoit
+        plusieurs lignes par instruction (page_size lignes au plus).
+        """
+        lignes = list(lignes)
+        if not lignes:
+            return [] if fetch else None
+        avant, apres = requete.split('%s', 1)
+        avant, = traduire(avant)
+        apres, = traduire(apres)
+        modele, = traduire(template) if template else ('(' + ', '.join('?' * len(lignes[0])) + ')',)
+        taille = max(1, min(page_size, MAX_VARIABLES // len(lignes[0])))
+
+        resultats = []
+        for debut in range(0, len(lignes), taille):
+            page = lignes[debut:debut + taille]
+            instruction = avant + ', '.join([modele] * len(page)) + apres
+            self._executer((instruction,), [valeur for ligne in page for valeur in ligne], requete)
+            if fetch:
+                resultats.extend(self.fetchall())
+        return resultats if fetch else None
+
+    def fetchone(self):
+        ligne = super().fetchone()
+        if ligne is None or self.type_ligne is None:
+            return ligne
+        return self.type_ligne._make(ligne)
+
+    def fetchmany(self, size=None):
+        lignes = super().fetchmany(size) if size is not None else super().fetchmany()
+        if self.type_ligne is None:
+            return lignes
+        return list(map(self.type_ligne._make, lignes))
+
+    def fetchall(self):
+        lignes = super().fetchall()
+        if self.type_ligne is None:
+            return lignes
+        return list(map(self.type_ligne._make, lignes))
+
+    def __next__(self):
+        ligne = super().__next__()
+        if self.type_ligne is None:
+            return ligne
+        return self.type_ligne._make(ligne)
+
+
+class ConnexionSQLite(sqlite3.Connection):
+    """
+    Connexion SQLite qui ouvre des CurseurSQLite (name et cursor_factory,
+    propres à psycopg2, sont ignorés).
+    """
+
+    def cursor(self, name=None, cursor_factory=None):
+        return super().cursor(CurseurSQLite)
+
+
+def ouvrir(chemin, timeout=30):
+    """
+    Ouvre une connexion configurée (PRAGMAs, fonctions Python, types).
+    """
+    connection = sqlite3.connect(chemin, timeout=timeout, factory=ConnexionSQLite,
+                                 detect_types=sqlite3.PARSE_DECLTYPES,
+                                 check_same_thread=False, cached_statements=256)
+    for pragma in PRAGMAS:
+        connection.execute(pragma)
+    connection.create_function('f_unaccent', 1, f_unaccent, deterministic=True)
+    connection.create_function('similarity', 2, similarity, deterministic=True)
+    return connection
+
+
+def creer_schema(connection):
+    """
+    Passe la base en mode WAL et crée les tables, index et triggers (idempotent).
+    """
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(SCHEMA)
+    connection.commit()
+
+
+class PoolSQLite:
+    """
+    Pool de connexions SQLite, avec la même interface que PoolConnexions.
+    Les connexions sont ouvertes à la demande : le démarrage ne coûte qu'une ouverture.
+    """
+
+    def __init__(self, chemin, maxconn=4, timeout=30):
+        self.chemin = chemin
+        self.timeout = timeout
+        self._libres = queue.LifoQueue()
+        self._places = threading.BoundedSemaphore(maxconn)
+        self._ferme = False
+        connection = ouvrir(chemin, timeout)
+        creer_schema(connection)
+        self._libres.put(connection)
+
+    def emprunter(self, timeout=None):
+        delai = self.timeout if timeout is None else timeout
+        if not self._places.acquire(timeout=delai):
+            raise sqlite3.OperationalError(f"Aucune connexion disponible après {delai} s")
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            try:
+                return ouvrir(self.chemin, self.timeout)
+            except Exception:
+                self._places.release()
+                raise
+
+    def rendre(self, connection, fermer=False):
+        try:
+            if fermer or self._ferme:
+                connection.close()
+            else:
+                connection.rollback()
+                self._libres.put(connection)
+        finally:
+            self._places.release()
+
+    @contextmanager
+    def connexion(self, timeout=None):
+        connection = self.emprunter(timeout)
+        try:
+            yield connection
+        finally:
+            self.rendre(connection)
+
+    def fermer(self):
+        """
+        Ferme les connexions libres (PRAGMA optimize met à jour les statistiques du planificateur) ;
+        les connexions encore empruntées seront fermées à leur retour.
+        """
+        self._ferme = True
+        while True:
+            try:
+                connection = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.execute("PRAGMA optimize")
+            finally:
+                connection.close()
@@ -0,0 +1,683 @@
+"""
+Réplique locale et synchronisation incrémentale avec la base centrale.
+
+Sur un site satellite, l'application travaille sur une base SQLite locale
+(MOTEUR = 'sqlite') : les écritures réussissent même sans réseau. Chaque base tient
+un journal de ses modifications (journal_synchro : table, clé, origine) rempli par
+des triggers. La clé d'une ligne est la même sur toutes les bases : uid pour les
+patients et les rendez-vous, email pour les utilisateurs.
+
+synchroniser() :
+  1. pousse vers la base centrale, par lots, les lignes modifiées localement depuis
+     le dernier envoi (leur état courant : plusieurs modifications d'une ligne n'en
+     font qu'une) ;
+  2. tire les modifications faites sur la base centrale ou par les autres sites,
+     à partir de la dernière position lue dans le journal central.
+Seules les lignes modifiées circulent. La position de lecture est (txid, version) et
+ne dépasse jamais la plus ancienne transaction encore en cours sur la base centrale :
+une transaction validée après une autre plus récente n'est pas sautée.
+
+Conflit de créneau (index unique idx_rdv_creneau_actif) : le rendez-vous créé le
+premier (date_creation, puis uid) garde le créneau, l'autre est annulé avec une note.
+La règle ne dépend pas de l'ordre des synchronisations : toutes les bases convergent.
+Un rendez-vous dont le patient ou le médecin manque à la base de destination (médecin
+créé sur un site, par exemple) fait échouer le lot : le journal est conservé et
+l'envoi reprend à la synchronisation suivante.
+
+Les fonctions de synchronisation reçoivent deux connexions de l'un ou l'autre moteur :
+deux bases SQLite locales suffisent pour les essais (benchmarks/bench_synchro.py).
+
+Usage : python database/synchro.py [--site nom]
+        python database/synchro.py purger [--jours 90]
+"""
+import argparse
+import os
+import sys
+import threading
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+
+from database import config
+from database.config import get_connection, close_connection, execute_values, DB_CONFIG, SYNCHRONISATION
+from database.partitions import DRAPEAU_DEPLACEMENT
+from database.sqlite import equivalent
+from utils.cache import CACHES
+
+# Variable de session : site à l'origine des écritures de la transaction en cours
+VARIABLE_ORIGINE = 'clinique.origine'
+
+# Origine des lignes reçues de la base centrale, dans le journal d'une réplique
+ORIGINE_CENTRALE = 'centrale'
+
+# Âge (en jours) des entrées du journal central supprimées par purger_journal()
+ANCIENNETE_JOURNAL = 90
+
+# Tables synchronisées et leur clé, parents avant enfants
+TABLES_SYNCHRO = (('utilisateurs', 'email'), ('patients', 'uid'), ('rendez_vous', 'uid'))
+
+# Les utilisateurs sont gérés sur la base centrale : les sites ne les envoient pas
+TABLES_POUSSEES = ('patients', 'rendez_vous')
+
+SELECT_SYNCHRO = {
+    'utilisateurs': '''
+        SELECT email, nom, prenom, mot_de_passe, role, specialite, telephone
+        FROM utilisateurs
+    ''',
+    'patients': '''
+        SELECT uid, nom, prenom, date_naissance, sexe, adresse, telephone, email,
+               numero_securite_sociale, date_inscription
+        FROM patients
+    ''',
+    'rendez_vous': '''
+        SELECT r.uid, p.uid, u.email, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+               r.notes, r.date_creation
+        FROM rendez_vous r
+        JOIN patients p ON p.id = r.patient_id
+        JOIN utilisateurs u ON u.id = r.medecin_id
+    ''',
+}
+CLES_SELECT = {'utilisateurs': 'email', 'patients': 'uid', 'rendez_vous': 'r.uid'}
+
+ECRIRE = {
+    'utilisateurs': '''
+        INSERT INTO utilisateurs (email, nom, prenom, mot_de_passe, role, specialite, telephone)
+        VALUES %s
+        ON CONFLICT (email) DO UPDATE SET
+            nom = EXCLUDED.nom, prenom = EXCLUDED.prenom, mot_de_passe = EXCLUDED.mot_de_passe,
+            role = EXCLUDED.role, specialite = EXCLUDED.specialite, telephone = EXCLUDED.telephone
+    ''',
+    'patients': '''
+        INSERT INTO patients (uid, nom, prenom, date_naissance, sexe, adresse, telephone, email,
+                              numero_securite_sociale, date_inscription)
+        VALUES %s
+        ON CONFLICT (uid) DO UPDATE SET
+            nom = EXCLUDED.nom, prenom = EXCLUDED.prenom, date_naissance = EXCLUDED.date_naissance,
+            sexe = EXCLUDED.sexe, adresse = EXCLUDED.adresse, telephone = EXCLUDED.telephone,
+            email = EXCLUDED.email, numero_securite_sociale = EXCLUDED.numero_securite_sociale
+    ''',
+}
+
+SUPPRIMER = {
+    'utilisateurs': "DELETE FROM utilisateurs WHERE email = ANY(%s)",
+    'patients': "DELETE FROM patients WHERE uid = ANY(%s)",
+    'rendez_vous': "DELETE FROM rendez_vous WHERE uid = ANY(%s)",
+}
+
+# Rendez-vous actifs sur les créneaux (medecin_id, date_rdv, heure_rdv) d'un lot
+REQUETE_OCCUPANTS = '''
+    WITH c (medecin_id, date_rdv, heure_rdv) AS (VALUES %s)
+    SELECT r.uid, r.medecin_id, r.date_rdv, r.heure_rdv, r.date_creation
+    FROM rendez_vous r
+    JOIN c ON r.medecin_id = c.medecin_id AND r.date_rdv = c.date_rdv AND r.heure_rdv = c.heure_rdv
+    WHERE r.statut <> 'annule'
+'''
+CRENEAU_OCCUPANTS = "(%s, %s::date, %s::time)"
+
+ANNULER_CONFLIT = '''
+    UPDATE rendez_vous
+    SET statut = 'annule', notes = COALESCE(notes || ' | ', '') || %(note)s
+    WHERE uid = %(uid)s
+'''
+
+MODIFIER_RENDEZ_VOUS = '''
+    WITH v (uid, patient_id, medecin_id, date_rdv, heure_rdv, motif, statut, notes) AS (VALUES %s)
+    UPDATE rendez_vous AS r
+    SET patient_id = v.patient_id, medecin_id = v.medecin_id, date_rdv = v.date_rdv,
+        heure_rdv = v.heure_rdv, motif = v.motif, statut = v.statut, notes = v.notes
+    FROM v
+    WHERE r.uid = v.uid
+'''
+LIGNE_MODIFIER = "(%s, %s::integer, %s::integer, %s::date, %s::time, %s::text, %s::text, %s::text)"
+
+INSERER_RENDEZ_VOUS = '''
+    INSERT INTO rendez_vous (uid, patient_id, medecin_id, date_rdv, heure_rdv, motif,
+                             statut, notes, date_creation)
+    VALUES %s
+'''
+
+# Modifications locales pas encore envoyées
+REQUETE_MODIFICATIONS_LOCALES = '''
+    SELECT version, table_nom, cle
+    FROM journal_synchro
+    WHERE version > %s AND origine IS NULL
+    ORDER BY version
+    LIMIT %s
+'''
+
+# Modifications centrales après la position (txid, version) ; la dernière colonne
+# signale celles envoyées par le site lui-même (inutile de les lui renvoyer)
+REQUETE_CHANGEMENTS = '''
+    SELECT txid, version, table_nom, cle, COALESCE(origine, '') = %s
+    FROM journal_synchro
+    WHERE (txid, version) > (%s, %s) AND txid < %s
+    ORDER BY txid, version
+    LIMIT %s
+'''
+
+REQUETE_XMIN = "SELECT txid_snapshot_xmin(txid_current_snapshot())"
+# Position du journal correspondant à une copie faite dans l'instantané courant
+REQUETE_POSITION_COPIE = "SELECT txid_snapshot_xmin(txid_current_snapshot()), 0"
+REQUETE_ORIGINE = f"SELECT set_config('{VARIABLE_ORIGINE}', %(site)s, true)"
+REQUETE_INSTANTANE = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+
+# SQLite : un seul écrivain, les versions sont validées dans l'ordre (txid toujours 0) ;
+# l'origine de la transaction est une ligne de synchro_origine, retirée avant le COMMIT
+equivalent(REQUETE_XMIN, "SELECT 9223372036854775807")
+equivalent(REQUETE_POSITION_COPIE, "SELECT 0, COALESCE(MAX(version), 0) FROM journal_synchro")
+equivalent(REQUETE_ORIGINE, "DELETE FROM synchro_origine",
+           "INSERT INTO synchro_origine (site) SELECT :site WHERE :site <> ''")
+equivalent(REQUETE_INSTANTANE, "BEGIN")
+
+SCHEMA_SQLITE = '''
+    CREATE TABLE IF NOT EXISTS journal_synchro (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        txid INTEGER NOT NULL DEFAULT 0,
+        table_nom TEXT NOT NULL,
+        cle TEXT NOT NULL,
+        origine TEXT,
+        horodatage TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_journal_synchro_position ON journal_synchro (txid, version);
+    CREATE TABLE IF NOT EXISTS synchro_origine (site TEXT);
+    CREATE TABLE IF NOT EXISTS synchro_etat (cle TEXT PRIMARY KEY, valeur INTEGER NOT NULL);
+'''
+
+
+def create_synchronisation(cursor):
+    """
+    Prépare la base centrale PostgreSQL : uid des patients et des rendez-vous,
+    journal des modifications et ses triggers (idempotent).
+    """
+    for table in ('patients', 'rendez_vous'):
+        cursor.execute(f'''
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS
+            uid TEXT NOT NULL DEFAULT replace(gen_random_uuid()::text, '-', '')
+        ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_uid ON patients (uid)")
+    # Sur une table partitionnée, un index unique devrait contenir date_rdv
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rdv_uid ON rendez_vous (uid)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS journal_synchro (
+            version BIGSERIAL PRIMARY KEY,
+            txid BIGINT NOT NULL DEFAULT txid_current(),
+            table_nom VARCHAR(20) NOT NULL,
+            cle TEXT NOT NULL,
+            origine TEXT,
+            horodatage TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_journal_synchro_position
+        ON journal_synchro (txid, version)
+    ''')
+
+    # Arguments : nom de la table (TG_TABLE_NAME serait celui de la partition), colonne clé.
+    # Les déplacements de lignes (partitions, archivage) ne sont pas des modifications.
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION journaliser_synchro() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ancienne TEXT;
+            nouvelle TEXT;
+        BEGIN
+            IF current_setting('{DRAPEAU_DEPLACEMENT}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                ancienne := to_jsonb(OLD) ->> TG_ARGV[1];
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                nouvelle := to_jsonb(NEW) ->> TG_ARGV[1];
+            END IF;
+            INSERT INTO journal_synchro (table_nom, cle, origine)
+            SELECT DISTINCT TG_ARGV[0], c.cle, NULLIF(current_setting('{VARIABLE_ORIGINE}', true), '')
+            FROM (VALUES (ancienne), (nouvelle)) AS c(cle)
+            WHERE c.cle IS NOT NULL;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    for table, colonne in TABLES_SYNCHRO:
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_synchro ON {table}")
+        cursor.execute(f'''
+            CREATE TRIGGER trg_synchro
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION journaliser_synchro('{table}', '{colonne}')
+        ''')
+
+
+def _triggers_sqlite():
+    origine = "(SELECT NULLIF(site, '') FROM synchro_origine)"
+    for table, colonne in TABLES_SYNCHRO:
+        yield f'''
+            CREATE TRIGGER IF NOT EXISTS trg_synchro_{table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO journal_synchro (table_nom, cle, origine)
+                VALUES ('{table}', NEW.{colonne}, {origine});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_synchro_{table}_update AFTER UPDATE ON {table} BEGIN
+                INSERT INTO journal_synchro (table_nom, cle, origine)
+                SELECT '{table}', OLD.{colonne}, {origine} WHERE OLD.{colonne} IS NOT NEW.{colonne};
+                INSERT INTO journal_synchro (table_nom, cle, origine)
+                VALUES ('{table}', NEW.{colonne}, {origine});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_synchro_{table}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO journal_synchro (table_nom, cle, origine)
+                VALUES ('{table}', OLD.{colonne}, {origine});
+            END;
+        '''
+
+
+def preparer_sqlite(connection):
+    """
+    Ajoute le journal des modifications et ses triggers à une base SQLite (idempotent).
+    À faire avant toute écriture à synchroniser : les modifications antérieures ne sont pas journalisées.
+    """
+    connection.executescript(SCHEMA_SQLITE + ''.join(_triggers_sqlite()))
+    connection.commit()
+
+
+def ouvrir_centrale():
+    """
+    Ouvre une connexion directe à la base centrale PostgreSQL (hors du pool de l'application).
+    """
+    return psycopg2.connect(**DB_CONFIG)
+
+
+def _definir_origine(cursor, site):
+    cursor.execute(REQUETE_ORIGINE, {'site': site})
+
+
+def _position(cursor, cle):
+    cursor.execute("SELECT valeur FROM synchro_etat WHERE cle = %s", (cle,))
+    ligne = cursor.fetchone()
+    return ligne[0] if ligne else 0
+
+
+def _enregistrer_position(cursor, cle, valeur):
+    cursor.execute('''
+        INSERT INTO synchro_etat (cle, valeur) VALUES (%s, %s)
+        ON CONFLICT (cle) DO UPDATE SET valeur = EXCLUDED.valeur
+    ''', (cle, valeur))
+
+
+def _grouper(paires):
+    """
+    {table: [clé, ...]} sans doublon, à partir de paires (table, clé).
+    """
+    cles = {}
+    for table, cle in paires:
+        cles.setdefault(table, {})[cle] = None
+    return {table: list(valeurs) for table, valeurs in cles.items()}
+
+
+def _lire(cursor, table, cles):
+    """
+    État courant des lignes `cles` de `table` : {clé: ligne}.
+    """
+    if not cles:
+        return {}
+    cursor.execute(f"{SELECT_SYNCHRO[table]} WHERE {CLES_SELECT[table]} = ANY(%s)", (list(cles),))
+    return {ligne[0]: tuple(ligne) for ligne in cursor.fetchall()}
+
+
+def _priorite(date_creation, uid):
+    return (date_creation or datetime.max, uid)
+
+
+def _note_conflit(notes, gagnant):
+    return (f"{notes} | " if notes else '') + \
+        f"Annulé à la synchronisation : créneau attribué au rendez-vous {gagnant}"
+
+
+def _identifiants(cursor, requete, cles):
+    cursor.execute(requete, (list(cles),))
+    return {cle: identifiant for cle, identifiant in cursor.fetchall()}
+
+
+def _ecrire_rendez_vous(cursor, lignes):
+    """
+    Crée ou met à jour des rendez-vous par leur uid, en arbitrant les conflits de créneau
+    (avec la base comme entre les lignes du lot), en quelques requêtes par lot.
+    Retourne le nombre de conflits. Un patient ou un médecin absent de la base lève
+    ValueError : le lot est annulé et les entrées du journal sont conservées.
+    """
+    patients = _identifiants(cursor, "SELECT uid, id FROM patients WHERE uid = ANY(%s)",
+                             {ligne[1] for ligne in lignes})
+    medecins = _identifiants(cursor, "SELECT email, id FROM utilisateurs WHERE email = ANY(%s)",
+                             {ligne[2] for ligne in lignes})
+    orphelins = [uid for uid, patient_uid, medecin_email, *_ in lignes
+                 if patient_uid not in patients or medecin_email not in medecins]
+    if orphelins:
+        raise ValueError(f"{len(orphelins)} rendez-vous sans patient ou médecin correspondant "
+                         f"dans la base de destination ({', '.join(orphelins[:5])})")
+
+    # uid -> [uid, patient_id, medecin_id, date_rdv, heure_rdv, motif, statut, notes, date_creation]
+    valeurs = {}
+    for uid, patient_uid, medecin_email, *reste in lignes:
+        valeurs[uid] = [uid, patients[patient_uid], medecins[medecin_email], *reste]
+
+    cursor.execute("SELECT uid FROM rendez_vous WHERE uid = ANY(%s)", (list(valeurs),))
+    existants = {ligne[0] for ligne in cursor.fetchall()}
+
+    # Occupants actuels des créneaux demandés ; les rendez-vous du lot prennent leur nouvel état
+    creneaux = {(v[2], v[3], v[4]) for v in valeurs.values() if v[6] != 'annule'}
+    occupants = {}
+    if creneaux:
+        for uid, medecin_id, date_rdv, heure_rdv, date_creation in execute_values(
+                cursor, REQUETE_OCCUPANTS, list(creneaux), template=CRENEAU_OCCUPANTS,
+                page_size=len(creneaux), fetch=True):
+            if uid not in valeurs:
+                occupants[(medecin_id, date_rdv, heure_rdv)] = (uid, date_creation)
+
+    conflits = 0
+    annulations = []
+    for v in valeurs.values():
+        uid, statut, date_creation = v[0], v[6], v[8]
+        if statut == 'annule':
+            continue
+        creneau = (v[2], v[3], v[4])
+        if creneau in occupants:
+            conflits += 1
+            occupant_uid, occupant_creation = occupants[creneau]
+            if _priorite(occupant_creation, occupant_uid) < _priorite(date_creation, uid):
+                v[6], v[7] = 'annule', _note_conflit(v[7], occupant_uid)
+                continue
+            if occupant_uid in valeurs:
+                perdant = valeurs[occupant_uid]
+                perdant[6], perdant[7] = 'annule', _note_conflit(perdant[7], uid)
+            else:
+                annulations.append({'uid': occupant_uid, 'note': _note_conflit(None, uid)})
+        occupants[creneau] = (uid, date_creation)
+
+    if annulations:
+        cursor.executemany(ANNULER_CONFLIT, annulations)
+    # Les annulations d'abord : elles libèrent les créneaux repris par les autres lignes
+    for annules in (True, False):
+        lot = [v for v in valeurs.values() if (v[6] == 'annule') == annules]
+        modifies = [tuple(v[:8]) for v in lot if v[0] in existants]
+        if modifies:
+            execute_values(cursor, MODIFIER_RENDEZ_VOUS, modifies, template=LIGNE_MODIFIER,
+                           page_size=len(modifies))
+        nouveaux = [(*v[:8], v[8] or datetime.now()) for v in lot if v[0] not in existants]
+        if nouveaux:
+            execute_values(cursor, INSERER_RENDEZ_VOUS, nouveaux, page_size=len(nouveaux))
+    return conflits
+
+
+def _ecrire(cursor, table, lignes):
+    """
+    Écrit des lignes lues par SELECT_SYNCHRO[table] ; retourne le nombre de conflits de créneau.
+    """
+    if not lignes:
+        return 0
+    if table == 'rendez_vous':
+        return _ecrire_rendez_vous(cursor, lignes)
+    execute_values(cursor, ECRIRE[table], lignes, page_size=len(lignes))
+    return 0
+
+
+def _appliquer(cursor, cles, source):
+    """
+    Recopie par `cursor` l'état courant, lu par `source`, des lignes `cles` ({table: [clé, ...]}).
+    Une clé qui n'existe plus dans la source est supprimée.
+    Retourne le nombre de conflits de créneau.
+    """
+    lignes = {table: _lire(source, table, cles.get(table)) for table, _ in TABLES_SYNCHRO}
+
+    conflits = 0
+    for table, _ in TABLES_SYNCHRO:
+        conflits += _ecrire(cursor, table, list(lignes[table].values()))
+    for table, _ in reversed(TABLES_SYNCHRO):
+        absentes = [cle for cle in cles.get(table, []) if cle not in lignes[table]]
+        if absentes:
+            cursor.execute(SUPPRIMER[table], (absentes,))
+    return conflits
+
+
+def initialiser(replique, centrale, taille_lot=500):
+    """
+    Première copie de la base centrale dans la réplique, puis position de lecture
+    du journal central fixée à l'instant de la copie.
+    """
+    locale, distante = replique.cursor(), centrale.cursor()
+    try:
+        distante.execute(REQUETE_INSTANTANE)
+        distante.execute(REQUETE_POSITION_COPIE)
+        txid, version = distante.fetchone()
+
+        _definir_origine(locale, ORIGINE_CENTRALE)
+        for table, _ in TABLES_SYNCHRO:
+            distante.execute(SELECT_SYNCHRO[table])
+            while True:
+                lignes = distante.fetchmany(taille_lot)
+                if not lignes:
+                    break
+                _ecrire(locale, table, [tuple(ligne) for ligne in lignes])
+        _definir_origine(locale, '')
+
+        # PostgreSQL : les transactions à partir de xmin peuvent manquer à la copie, elles seront relues
+        _enregistrer_position(locale, 'tire_txid', txid)
+        _enregistrer_position(locale, 'tire_version', version)
+        _enregistrer_position(locale, 'initialisee', 1)
+        locale.execute("DELETE FROM journal_synchro WHERE origine IS NOT NULL")
+        replique.commit()
+        centrale.rollback()
+    finally:
+        locale.close()
+        distante.close()
+
+
+def pousser(replique, centrale, site, taille_lot=500):
+    """
+    Envoie à la base centrale l'état courant des lignes modifiées localement
+    depuis le dernier envoi. Retourne (lignes envoyées, conflits de créneau).
+    """
+    locale, distante = replique.cursor(), centrale.cursor()
+    envoyees = conflits = 0
+    try:
+        while True:
+            locale.execute(REQUETE_MODIFICATIONS_LOCALES, (_position(locale, 'pousse'), taille_lot))
+            modifications = locale.fetchall()
+            if not modifications:
+                break
+
+            cles = _grouper((table, cle) for _, table, cle in modifications if table in TABLES_POUSSEES)
+            _definir_origine(distante, site)
+            conflits += _appliquer(distante, cles, locale)
+            _definir_origine(distante, '')
+            centrale.commit()
+
+            # Un envoi interrompu ici est simplement rejoué : les écritures sont idempotentes
+            derniere = modifications[-1][0]
+            _enregistrer_position(locale, 'pousse', derniere)
+            locale.execute("DELETE FROM journal_synchro WHERE version <= %s", (derniere,))
+            replique.commit()
+            envoyees += sum(len(valeurs) for valeurs in cles.values())
+            if len(modifications) < taille_lot:
+                break
+        return envoyees, conflits
+    except Exception:
+        centrale.rollback()
+        replique.rollback()
+        raise
+    finally:
+        locale.close()
+        distante.close()
+
+
+def tirer(replique, centrale, site, taille_lot=500):
+    """
+    Applique à la réplique les modifications centrales faites par les autres sites
+    ou sur la base centrale. Retourne (lignes reçues, conflits de créneau).
+    """
+    locale, distante = replique.cursor(), centrale.cursor()
+    recues = conflits = 0
+    try:
+        distante.execute(REQUETE_XMIN)
+        xmin = distante.fetchone()[0]
+        while True:
+            position = (_position(locale, 'tire_txid'), _position(locale, 'tire_version'))
+            distante.execute(REQUETE_CHANGEMENTS, (site, *position, xmin, taille_lot))
+            changements = distante.fetchall()
+            if not changements:
+                break
+
+            cles = _grouper((table, cle) for _, _, table, cle, propre in changements if not propre)
+            _definir_origine(locale, ORIGINE_CENTRALE)
+            conflits += _appliquer(locale, cles, distante)
+            _definir_origine(locale, '')
+
+            txid, version = changements[-1][:2]
+            _enregistrer_position(locale, 'tire_txid', txid)
+            _enregistrer_position(locale, 'tire_version', version)
+            # Les lignes reçues n'ont pas à être renvoyées : inutile de les garder au journal
+            locale.execute("DELETE FROM journal_synchro WHERE origine IS NOT NULL")
+            replique.commit()
+            centrale.rollback()
+            recues += sum(len(valeurs) for valeurs in cles.values())
+            if len(changements) < taille_lot:
+                break
+        return recues, conflits
+    except Exception:
+        replique.rollback()
+        centrale.rollback()
+        raise
+    finally:
+        locale.close()
+        distante.close()
+
+
+def synchroniser(site=None, taille_lot=None):
+    """
+    Pousse puis tire les modifications entre la réplique locale (base de l'application,
+    MOTEUR = 'sqlite') et la base centrale. Sans réseau, rien n'est perdu : les
+    modifications restent au journal local jusqu'à la prochaine tentative.
+    Retourne (succes, message).
+    """
+    if config.MOTEUR != 'sqlite':
+        return False, "La synchronisation demande une réplique locale (MOTEUR = 'sqlite')"
+    site = site or SYNCHRONISATION['site']
+    taille_lot = taille_lot or SYNCHRONISATION['lot']
+
+    replique = get_connection()
+    if not replique:
+        return False, "Réplique locale indisponible"
+    try:
+        centrale = ouvrir_centrale()
+    except psycopg2.Error as e:
+        close_connection(replique)
+        return False, f"Base centrale injoignable : {e}"
+
+    try:
+        cursor = replique.cursor()
+        initialisee = _position(cursor, 'initialisee')
+        cursor.close()
+        if not initialisee:
+            initialiser(replique, centrale, taille_lot)
+
+        envoyees, conflits_envoi = pousser(replique, centrale, site, taille_lot)
+        recues, conflits_reception = tirer(replique, centrale, site, taille_lot)
+        if recues:
+            for cache in CACHES.values():
+                cache.vider()
+        return True, (f"Synchronisation : {envoyees} ligne(s) envoyée(s), {recues} reçue(s), "
+                      f"{conflits_envoi + conflits_reception} conflit(s) de créneau")
+
+    except Exception as e:
+        return False, f"Erreur de synchronisation : {e}"
+    finally:
+        centrale.close()
+        close_connection(replique)
+
+
+def purger_journal(jours=ANCIENNETE_JOURNAL):
+    """
+    Supprime de la base centrale les entrées du journal plus anciennes que `jours` jours.
+    Un site resté hors ligne plus longtemps doit être réinitialisé.
+    """
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            DELETE FROM journal_synchro
+            WHERE horodatage < CURRENT_TIMESTAMP - make_interval(days => %s)
+        ''', (jours,))
+        supprimees = cursor.rowcount
+        connection.commit()
+        return True, f"{supprimees} entrée(s) du journal supprimée(s)"
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+_arret = threading.Event()
+_thread = None
+
+
+def _boucle(intervalle):
+    en_ligne = None
+    while True:
+        succes, message = synchroniser()
+        if succes != en_ligne:
+            # Seuls les passages en ligne / hors ligne sont signalés
+            print(f"\n[{'✓' if succes else '✗'}] {message}")
+            en_ligne = succes
+        if _arret.wait(intervalle):
+            break
+
+
+def demarrer_synchronisation(intervalle=None):
+    """
+    Prépare le journal de la réplique puis démarre (une seule fois) la synchronisation
+    périodique en arrière-plan.
+    """
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    connection = get_connection()
+    if connection:
+        try:
+            preparer_sqlite(connection)
+        finally:
+            close_connection(connection)
+    _arret.clear()
+    _thread = threading.Thread(target=_boucle, args=(intervalle or SYNCHRONISATION['intervalle'],),
+                               daemon=True, name='synchronisation')
+    _thread.start()
+
+
+def arreter_synchronisation():
+    _arret.set()
+    if _thread is not None:
+        _thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synchronisation avec la base centrale")
+    parser.add_argument('commande', nargs='?', choices=['synchroniser', 'purger'], default='synchroniser')
+    parser.add_argument('--site', help="Nom du site (par défaut SYNCHRONISATION['site'])")
+    parser.add_argument('--jours', type=int, default=ANCIENNETE_JOURNAL,
+                        help="Ancienneté des entrées du journal central à supprimer")
+    args = parser.parse_args()
+
+    if args.commande == 'purger':
+        succes, message = purger_journal(args.jours)
+    else:
+        connection = get_connection()
+        if connection:
+            preparer_sqlite(connection)
+            close_connection(connection)
+        succes, message = synchroniser(args.site)
+    print(f"{'✓' if succes else '✗'} {message}")
+    sys.exit(0 if succes else 1)
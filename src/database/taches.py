@@ -0,0 +1,532 @@
+"""
+Tâches de fond : file d'attente en base et travailleurs hors du chemin interactif.
+
+Une tâche est une ligne de la table taches (nom enregistré avec @tache, paramètres
+en JSON). Chaque travailleur (thread) prend la plus ancienne tâche due avec
+SELECT ... FOR UPDATE SKIP LOCKED : plusieurs threads ou processus se partagent la
+file sans jamais prendre la même tâche. La tâche prise reçoit un bail, prolongé
+tant qu'elle s'exécute ; si son travailleur disparaît, elle est reprise à
+l'expiration du bail (ou marquée 'echouee' si c'était sa dernière tentative).
+Le résultat n'est enregistré que par le travailleur qui détient encore le bail.
+
+Une tâche qui échoue (exception ou succès False) est reportée avec un délai
+exponentiel (DELAI_REPRISE, doublé à chaque tentative, plafonné à DELAI_REPRISE_MAX),
+puis marquée 'echouee' après max_tentatives essais.
+
+Le planificateur ajoute les tâches périodiques (TACHES_PERIODIQUES) une fois par
+période : la clé d'unicité (nom et période) évite les doublons entre processus.
+
+Les rappels sont déposés dans des fichiers (un par jour, TACHES_FOND['dossier_rappels']) :
+une vraie passerelle SMS ou e-mail n'aurait qu'à lire ce dossier.
+
+Usage : python database/taches.py travailler [--travailleurs 2]
+        python database/taches.py planifier nom [--parametres '{"jour": "2025-01-31"}']
+        python database/taches.py lister
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import config
+from database.config import get_connection, close_connection, TACHES_FOND
+from database.init_db import migrer_index
+from database.partitions import archiver_rendez_vous, maintenir_partitions
+from database.sqlite import equivalent
+from models.statistiques import Statistiques
+
+# Durée (secondes) pendant laquelle une tâche prise est réservée à son travailleur ;
+# le bail est prolongé toutes les DUREE_BAIL / 3 secondes tant que la tâche s'exécute
+DUREE_BAIL = 600
+
+# Délai (secondes) avant la première reprise d'une tâche échouée, doublé ensuite
+DELAI_REPRISE = 30
+DELAI_REPRISE_MAX = 3600
+
+# Âge (en jours) des tâches terminées ou échouées supprimées par la tâche 'nettoyage'
+CONSERVATION_TACHES = 30
+
+# nom -> fonction(**parametres) retournant (succes, message)
+TACHES = {}
+
+REQUETE_PLANIFIER = '''
+    INSERT INTO taches (nom, parametres, executer_apres, cle_unicite, max_tentatives)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (cle_unicite) WHERE cle_unicite IS NOT NULL DO NOTHING
+'''
+
+REQUETE_PRENDRE = '''
+    UPDATE taches
+    SET statut = 'en_cours', tentatives = tentatives + 1, bail = %(bail)s
+    WHERE id = (
+        SELECT id FROM taches
+        WHERE statut = 'en_attente' AND executer_apres <= %(maintenant)s
+           OR statut = 'en_cours' AND bail < %(maintenant)s AND tentatives < max_tentatives
+        ORDER BY executer_apres, id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, nom, parametres, tentatives, max_tentatives
+'''
+
+# SQLite : un seul écrivain à la fois, l'UPDATE suffit à réserver la tâche
+equivalent(REQUETE_PRENDRE, '''
+    UPDATE taches
+    SET statut = 'en_cours', tentatives = tentatives + 1, bail = :bail
+    WHERE id = (
+        SELECT id FROM taches
+        WHERE statut = 'en_attente' AND executer_apres <= :maintenant
+           OR statut = 'en_cours' AND bail < :maintenant AND tentatives < max_tentatives
+        ORDER BY executer_apres, id
+        LIMIT 1
+    )
+    RETURNING id, nom, parametres, tentatives, max_tentatives
+''')
+
+# Tâche dont le travailleur a disparu pendant la dernière tentative (arrêt brutal,
+# mémoire épuisée) : abandonnée plutôt que reprise indéfiniment
+REQUETE_ABANDONNER = '''
+    UPDATE taches
+    SET statut = 'echouee', derniere_erreur = 'Bail expiré pendant la dernière tentative',
+        date_fin = %(maintenant)s, bail = NULL
+    WHERE statut = 'en_cours' AND bail < %(maintenant)s AND tentatives >= max_tentatives
+'''
+
+REQUETE_PROLONGER = '''
+    UPDATE taches SET bail = %s
+    WHERE id = %s AND statut = 'en_cours' AND bail = %s
+'''
+
+# Le bail sert de jeton : un travailleur dont la tâche a été reprise n'écrase rien
+REQUETE_TERMINER = '''
+    UPDATE taches
+    SET statut = 'terminee', resultat = %s, date_fin = %s, bail = NULL
+    WHERE id = %s AND statut = 'en_cours' AND bail = %s
+'''
+
+REQUETE_REPORTER = '''
+    UPDATE taches
+    SET statut = %s, derniere_erreur = %s, executer_apres = %s, date_fin = %s, bail = NULL
+    WHERE id = %s AND statut = 'en_cours' AND bail = %s
+'''
+
+REQUETE_RAPPELS = '''
+    SELECT r.id, r.heure_rdv, p.nom || ' ' || p.prenom, p.telephone, p.email,
+           u.nom || ' ' || u.prenom
+    FROM rendez_vous r
+    JOIN patients p ON p.id = r.patient_id
+    JOIN utilisateurs u ON u.id = r.medecin_id
+    WHERE r.date_rdv = %s AND r.statut = 'planifie'
+    ORDER BY r.heure_rdv, r.id
+'''
+
+
+def tache(nom):
+    """
+    Décorateur : enregistre une fonction comme tâche `nom`.
+    """
+    def enregistrer(fonction):
+        TACHES[nom] = fonction
+        return fonction
+    return enregistrer
+
+
+def delai_reprise(tentatives):
+    """
+    Délai avant la tentative suivante : exponentiel, plafonné, avec 10 % d'aléa
+    pour que des tâches échouées ensemble ne reviennent pas toutes au même instant.
+    """
+    delai = min(DELAI_REPRISE_MAX, DELAI_REPRISE * 2 ** (tentatives - 1))
+    return timedelta(seconds=delai * random.uniform(1, 1.1))
+
+
+def planifier(nom, parametres=None, executer_apres=None, cle_unicite=None, max_tentatives=5):
+    """
+    Ajoute une tâche à la file. Avec cle_unicite, une tâche de même clé n'est
+    ajoutée qu'une fois. Retourne (succes, message).
+    """
+    if nom not in TACHES:
+        return False, f"Tâche inconnue : {nom}"
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute(REQUETE_PLANIFIER, (nom, json.dumps(parametres or {}),
+                                           executer_apres or datetime.now(), cle_unicite,
+                                           max_tentatives))
+        ajoutee = cursor.rowcount > 0
+        connection.commit()
+        return True, f"Tâche '{nom}' planifiée" if ajoutee else f"Tâche '{nom}' déjà planifiée"
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def _prendre():
+    """
+    Réserve la prochaine tâche due ; retourne ((id, nom, parametres, tentatives,
+    max_tentatives), bail) ou None.
+    """
+    connection = get_connection()
+    if not connection:
+        return None
+
+    try:
+        cursor = connection.cursor()
+        maintenant = datetime.now()
+        bail = maintenant + timedelta(seconds=DUREE_BAIL)
+        cursor.execute(REQUETE_ABANDONNER, {'maintenant': maintenant})
+        cursor.execute(REQUETE_PRENDRE, {'maintenant': maintenant, 'bail': bail})
+        ligne = cursor.fetchone()
+        connection.commit()
+        return (ligne, bail) if ligne else None
+
+    except Exception as e:
+        print(f"Erreur lors de la prise d'une tâche : {e}")
+        connection.rollback()
+        return None
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def _prolonger_bail(tache_id, bail, fin):
+    """
+    Prolonge le bail (bail[0]) toutes les DUREE_BAIL / 3 secondes jusqu'à ce que
+    `fin` soit signalé. S'arrête si le bail a été perdu (tâche reprise ailleurs).
+    """
+    while not fin.wait(DUREE_BAIL / 3):
+        nouveau = datetime.now() + timedelta(seconds=DUREE_BAIL)
+        connection = get_connection()
+        if not connection:
+            continue
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute(REQUETE_PROLONGER, (nouveau, tache_id, bail[0]))
+            prolonge = cursor.rowcount > 0
+            connection.commit()
+        except Exception as e:
+            print(f"Erreur lors de la prolongation du bail de la tâche {tache_id} : {e}")
+            connection.rollback()
+            continue
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+        if not prolonge:
+            return
+        bail[0] = nouveau
+
+
+def _enregistrer_resultat(tache_id, bail, tentatives, max_tentatives, succes, message):
+    connection = get_connection()
+    if not connection:
+        return
+
+    try:
+        cursor = connection.cursor()
+        maintenant = datetime.now()
+        if succes:
+            cursor.execute(REQUETE_TERMINER, (message, maintenant, tache_id, bail))
+        elif tentatives >= max_tentatives:
+            cursor.execute(REQUETE_REPORTER, ('echouee', message, maintenant, maintenant, tache_id, bail))
+        else:
+            cursor.execute(REQUETE_REPORTER, ('en_attente', message, maintenant + delai_reprise(tentatives),
+                                              None, tache_id, bail))
+        if cursor.rowcount == 0:
+            print(f"Tâche {tache_id} : bail perdu, le résultat n'est pas enregistré")
+        connection.commit()
+
+    except Exception as e:
+        print(f"Erreur lors de l'enregistrement du résultat de la tâche {tache_id} : {e}")
+        connection.rollback()
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def executer_une():
+    """
+    Exécute la prochaine tâche due, hors de toute transaction (la tâche ouvre
+    ses propres connexions). Retourne False si aucune tâche n'était due.
+    """
+    prise = _prendre()
+    if prise is None:
+        return False
+
+    (tache_id, nom, parametres, tentatives, max_tentatives), bail = prise
+    fonction = TACHES.get(nom)
+    if fonction is None:
+        _enregistrer_resultat(tache_id, bail, max_tentatives, max_tentatives, False, f"Tâche inconnue : {nom}")
+        return True
+
+    # Battement de cœur : le bail reste valide tant que la tâche s'exécute
+    bail = [bail]
+    fin = threading.Event()
+    battement = threading.Thread(target=_prolonger_bail, args=(tache_id, bail, fin), daemon=True,
+                                 name=f'bail-{tache_id}')
+    battement.start()
+    try:
+        succes, message = fonction(**json.loads(parametres or '{}'))
+    except Exception as e:
+        succes, message = False, f"{type(e).__name__} : {e}"
+    finally:
+        fin.set()
+        battement.join()
+    _enregistrer_resultat(tache_id, bail[0], tentatives, max_tentatives, succes, message)
+    return True
+
+
+# === TÂCHES ===
+
+def deposer_rappels(jour, rappels):
+    """
+    Boîte d'envoi locale : écrit les rappels du jour dans un fichier JSON Lines.
+    Le fichier est remplacé d'un bloc : une tâche reprise ne duplique aucun rappel.
+    """
+    dossier = TACHES_FOND['dossier_rappels']
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, f"rappels_{jour}.jsonl")
+    with open(chemin + '.tmp', 'w', encoding='utf-8') as fichier:
+        for rappel in rappels:
+            fichier.write(json.dumps(rappel, ensure_ascii=False) + '\n')
+    os.replace(chemin + '.tmp', chemin)
+    return chemin
+
+
+@tache('rappels')
+def generer_rappels(jour=None):
+    """
+    Rappels des rendez-vous planifiés de `jour` (YYYY-MM-DD, demain par défaut).
+    """
+    jour = date.fromisoformat(jour) if jour else date.today() + timedelta(days=1)
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute(REQUETE_RAPPELS, (jour,))
+        rappels = [{
+            'rdv_id': rdv_id, 'patient': patient, 'telephone': telephone, 'email': email,
+            'message': f"Rappel : rendez-vous le {jour:%d/%m/%Y} à {heure_rdv:%H:%M} avec le Dr {medecin}",
+        } for rdv_id, heure_rdv, patient, telephone, email, medecin in cursor.fetchall()]
+    finally:
+        cursor.close()
+        connection.rollback()
+        close_connection(connection)
+
+    chemin = deposer_rappels(jour, rappels)
+    return True, f"{len(rappels)} rappel(s) déposé(s) dans {chemin}"
+
+
+@tache('archivage')
+def archiver():
+    if config.MOTEUR == 'sqlite':
+        return True, "Archivage non disponible sur SQLite"
+    return archiver_rendez_vous()
+
+
+@tache('partitions')
+def creer_partitions_a_venir():
+    if config.MOTEUR == 'sqlite':
+        return True, "Pas de partitions sur SQLite"
+    return maintenir_partitions()
+
+
+@tache('statistiques')
+def reconstruire_statistiques():
+    """
+    Réparation à la demande (taches.py planifier statistiques) : les triggers tiennent
+    déjà les tables à jour, et le recalcul bloque les écritures le temps de tout relire.
+    """
+    return Statistiques.reconstruire()
+
+
+@tache('index')
+def entretenir_index():
+    """
+    Crée les index manquants et met à jour les statistiques du planificateur.
+    """
+    if config.MOTEUR != 'sqlite':
+        if not migrer_index():
+            return False, "Échec de la création des index (voir la sortie du travailleur)"
+        return True, "Index vérifiés"
+
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+    try:
+        connection.execute("PRAGMA optimize")
+        return True, "Statistiques SQLite mises à jour"
+    finally:
+        close_connection(connection)
+
+
+@tache('nettoyage')
+def nettoyer_taches(jours=CONSERVATION_TACHES):
+    """
+    Supprime les tâches terminées ou échouées depuis plus de `jours` jours.
+    """
+    connection = get_connection()
+    if not connection:
+        return False, "Erreur de connexion"
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            DELETE FROM taches
+            WHERE statut IN ('terminee', 'echouee') AND date_fin < %s
+        ''', (datetime.now() - timedelta(days=jours),))
+        supprimees = cursor.rowcount
+        connection.commit()
+        return True, f"{supprimees} tâche(s) supprimée(s)"
+
+    except Exception as e:
+        connection.rollback()
+        return False, f"Erreur : {str(e)}"
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+def _demain():
+    return {'jour': (date.today() + timedelta(days=1)).isoformat()}
+
+
+# nom -> (période : 'jour' ou 'semaine', paramètres)
+TACHES_PERIODIQUES = {
+    'rappels': ('jour', _demain),
+    'partitions': ('jour', dict),
+    'archivage': ('semaine', dict),
+    'index': ('semaine', dict),
+    'nettoyage': ('semaine', dict),
+}
+
+
+def planifier_periodiques():
+    """
+    Ajoute les tâches périodiques de la période en cours (sans doublon).
+    """
+    aujourd_hui = date.today()
+    annee, semaine, _ = aujourd_hui.isocalendar()
+    periodes = {'jour': aujourd_hui.isoformat(), 'semaine': f"{annee}-S{semaine:02d}"}
+    for nom, (periode, parametres) in TACHES_PERIODIQUES.items():
+        planifier(nom, parametres(), cle_unicite=f"{nom}:{periodes[periode]}")
+
+
+# === TRAVAILLEURS ===
+
+_arret = threading.Event()
+_threads = []
+
+
+def _travailler(attente):
+    while not _arret.is_set():
+        if not executer_une():
+            _arret.wait(attente)
+
+
+def _planificateur(intervalle):
+    while not _arret.is_set():
+        planifier_periodiques()
+        _arret.wait(intervalle)
+
+
+def demarrer_travailleurs(nombre=None, attente=None):
+    """
+    Démarre (une seule fois) les threads travailleurs et le planificateur.
+    """
+    if any(thread.is_alive() for thread in _threads):
+        return
+    _arret.clear()
+    _threads.clear()
+    nombre = nombre or TACHES_FOND['travailleurs']
+    attente = attente or TACHES_FOND['attente']
+    for numero in range(nombre):
+        _threads.append(threading.Thread(target=_travailler, args=(attente,), daemon=True,
+                                         name=f'taches-{numero + 1}'))
+    _threads.append(threading.Thread(target=_planificateur, args=(60,), daemon=True,
+                                     name='taches-planificateur'))
+    for thread in _threads:
+        thread.start()
+
+
+def arreter_travailleurs():
+    """
+    Arrête les travailleurs après la tâche en cours de chacun.
+    """
+    _arret.set()
+    for thread in _threads:
+        thread.join()
+
+
+def lister_taches(limite=50):
+    """
+    Dernières tâches de la file, les plus récentes d'abord.
+    """
+    connection = get_connection()
+    if not connection:
+        return []
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute('''
+            SELECT id, nom, statut, tentatives, executer_apres, COALESCE(resultat, derniere_erreur)
+            FROM taches
+            ORDER BY id DESC
+            LIMIT %s
+        ''', (limite,))
+        return cursor.fetchall()
+
+    except Exception as e:
+        print(f"Erreur lors de la récupération des tâches : {e}")
+        return []
+    finally:
+        cursor.close()
+        connection.rollback()
+        close_connection(connection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tâches de fond")
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+    commande_travailler = sous_commandes.add_parser('travailler')
+    commande_travailler.add_argument('--travailleurs', type=int, default=TACHES_FOND['travailleurs'])
+    commande_planifier = sous_commandes.add_parser('planifier')
+    commande_planifier.add_argument('nom', choices=sorted(TACHES))
+    commande_planifier.add_argument('--parametres', default='{}', help="Paramètres JSON")
+    sous_commandes.add_parser('lister')
+    args = parser.parse_args()
+
+    if args.commande == 'planifier':
+        succes, message = planifier(args.nom, json.loads(args.parametres))
+        print(f"{'✓' if succes else '✗'} {message}")
+        sys.exit(0 if succes else 1)
+    elif args.commande == 'lister':
+        for tache_id, nom, statut, tentatives, executer_apres, detail in lister_taches():
+            print(f"{tache_id:>6} | {nom:<12} | {statut:<10} | essai {tentatives} | "
+                  f"{executer_apres:%Y-%m-%d %H:%M} | {detail or ''}")
+    else:
+        demarrer_travailleurs(args.travailleurs)
+        print(f"✓ {args.travailleurs} travailleur(s) démarré(s) (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                _arret.wait(3600)
+        except KeyboardInterrupt:
+            print("\nArrêt après les tâches en cours...")
+            arreter_travailleurs()
@@ -0,0 +1,232 @@
+"""
+Vérification des plans d'exécution des requêtes des modèles.
+
+Le script remplit la base avec un jeu de données de test (dans une transaction
+annulée à la fin), lance EXPLAIN (FORMAT JSON) sur chaque requête des modèles et
+échoue si un parcours séquentiel ou un tri explicite apparaît là où un index
+devrait servir la requête. À lancer sur une base de développement après init_db.
+
+Usage : python database/verifier_plans.py   (code de sortie 1 en cas de régression)
+"""
+import json
+import os
+import re
+import sys
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_connection, close_connection
+from database.partitions import creer_partitions
+from database.taches import REQUETE_RAPPELS
+from models.agenda import REQUETE_AGENDA
+from models.patient import (
+    SELECT_FICHE_PATIENT, SELECT_PAGE_PATIENTS_SUIVANTE, REQUETE_RECHERCHE_NOM,
+    REQUETE_RECHERCHE_TELEPHONE, REQUETE_DOSSIER_COMPLET
+)
+from models.rendez_vous import REQUETE_RESERVATION, REQUETE_OCCUPATIONS, _requete_liste, _requete_recherche
+from models.statistiques import REQUETE_RDV_PAR_JOUR, REQUETE_TAUX
+from models.utilisateur import REQUETE_IDENTIFIANTS
+
+NB_MEDECINS = 20
+NB_SECRETAIRES = 5000
+NB_PATIENTS = 50_000
+NB_RENDEZ_VOUS = 200_000
+
+# Paramètres remplacés par les identifiants des lignes de test
+MEDECIN = object()
+PATIENT = object()
+LISTE_MEDECINS = object()
+
+# (nom, requête, paramètres, noeuds interdits) ; les requêtes sont celles des modèles.
+# Un noeud interdit est soit un type de noeud ('Sort'), soit (type, table) : la table
+# ou l'une de ses partitions (rendez_vous_archive n'est pas une partition de rendez_vous).
+REQUETES = [
+    ("Patient.obtenir_patient", SELECT_FICHE_PATIENT, (PATIENT,), [('Seq Scan', 'patients')]),
+
+    ("Patient.lister_patients_page", SELECT_PAGE_PATIENTS_SUIVANTE,
+     ('Diop', 'Awa', 0, 51), [('Seq Scan', 'patients'), 'Sort']),
+
+    ("Patient.rechercher_patient (nom)", REQUETE_RECHERCHE_NOM,
+     ('sene1234', 'sene1234', 50), [('Seq Scan', 'patients')]),
+
+    ("Patient.rechercher_patient (téléphone)", REQUETE_RECHERCHE_TELEPHONE,
+     ('7712345%', 50), [('Seq Scan', 'patients')]),
+
+    ("Patient.dossier_complet", REQUETE_DOSSIER_COMPLET,
+     (20, PATIENT), [('Seq Scan', 'patients'), ('Seq Scan', 'rendez_vous')]),
+
+    ("Utilisateur.authentifier", REQUETE_IDENTIFIANTS,
+     ('bench.plan.1@clinique.sn',), [('Seq Scan', 'utilisateurs')]),
+
+    ("RendezVous.reserver", REQUETE_RESERVATION,
+     {'patient_id': PATIENT, 'medecin_id': MEDECIN, 'date_rdv': '2016-03-01',
+      'heure_rdv': '09:00', 'motif': None},
+     [('Seq Scan', 'patients'), ('Seq Scan', 'utilisateurs'), ('Seq Scan', 'rendez_vous')]),
+
+    ("RendezVous.creneaux_disponibles", REQUETE_OCCUPATIONS,
+     (LISTE_MEDECINS, '2016-03-01', '2016-03-31'), [('Seq Scan', 'rendez_vous')]),
+
+    ("RendezVous.lister_rendez_vous('patient')", *_requete_liste('patient', PATIENT),
+     [('Seq Scan', 'rendez_vous'), 'Sort']),
+
+    ("RendezVous.lister_rendez_vous('medecin')", *_requete_liste('medecin', MEDECIN),
+     [('Seq Scan', 'rendez_vous')]),
+
+    ("RendezVous.lister_rendez_vous('date')", *_requete_liste('date', '2016-03-01'),
+     [('Seq Scan', 'rendez_vous'), 'Sort']),
+
+    ("RendezVous.rechercher_rendez_vous(médecin, à venir, page suivante)",
+     *_requete_recherche(medecin_id=MEDECIN, date_debut='2016-03-01', apres=('2016-03-01', '09:00', 0)),
+     [('Seq Scan', 'rendez_vous'), 'Sort']),
+
+    ("RendezVous.rechercher_rendez_vous(planifie, à venir)",
+     *_requete_recherche(date_debut='2016-03-01', statut='planifie'),
+     [('Seq Scan', 'rendez_vous'), 'Sort']),
+
+    ("Agenda.de_la_semaine", REQUETE_AGENDA,
+     (MEDECIN, '2016-02-29', '2016-03-06'), [('Seq Scan', 'rendez_vous')]),
+
+    ("Tâche 'rappels'", REQUETE_RAPPELS, ('2016-03-01',), [('Seq Scan', 'rendez_vous')]),
+
+    # Tableaux de bord : tables résumées uniquement, par plage de jours
+    ("Statistiques.rdv_par_jour", REQUETE_RDV_PAR_JOUR + '''
+        ORDER BY s.jour, medecin, s.statut
+     ''', ('2016-03-01', '2016-03-07'), [('Seq Scan', 'stats_rdv_jour')]),
+
+    ("Statistiques.taux", REQUETE_TAUX + '''
+        AND medecin_id = %s
+     ''', ('2016-02-01', '2016-03-01', MEDECIN), [('Seq Scan', 'stats_rdv_jour')]),
+]
+
+
+def peupler(cursor):
+    """
+    Insère le jeu de données de test et met à jour les statistiques du planificateur.
+    Retourne (premier medecin_id, premier patient_id).
+    """
+    cursor.execute('''
+        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite)
+        SELECT 'Plan', 'Medecin ' || g, 'bench.plan.' || g || '@clinique.sn', '-', 'medecin', 'Généraliste'
+        FROM generate_series(1, %s) AS g
+        RETURNING id
+    ''', (NB_MEDECINS,))
+    medecins = [ligne[0] for ligne in cursor.fetchall()]
+
+    # Comptes sans rendez-vous : assez de lignes pour que l'index sur email soit
+    # préféré au parcours de la table
+    cursor.execute('''
+        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role)
+        SELECT 'Plan', 'Secretaire ' || g, 'bench.plan.s' || g || '@clinique.sn', '-', 'secretaire'
+        FROM generate_series(1, %s) AS g
+    ''', (NB_SECRETAIRES,))
+
+    cursor.execute('''
+        INSERT INTO patients (nom, prenom, date_naissance, sexe, telephone)
+        SELECT (ARRAY['Diop','Ndiaye','Fall','Sène','Faye','Sarr','Gueye','Ba'])[1 + g %% 8] || g,
+               (ARRAY['Awa','Moussa','Fatou','Ibrahima','Aïssatou','Cheikh'])[1 + g %% 6],
+               DATE '1950-01-01' + (g %% 25000),
+               (ARRAY['M','F'])[1 + g %% 2],
+               '77' || lpad(g::text, 7, '0')
+        FROM generate_series(1, %s) AS g
+        RETURNING id
+    ''', (NB_PATIENTS,))
+    patients = [ligne[0] for ligne in cursor.fetchall()]
+
+    # Partitions mensuelles couvrant les dates générées (2015-01 à 2016-09)
+    creer_partitions(cursor, date(2015, 1, 1), date(2016, 12, 1))
+
+    # Créneaux de 30 minutes distincts par médecin, statuts réalistes
+    cursor.execute('''
+        INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, statut)
+        SELECT (%s::int[])[1 + (g * 7919) %% %s],
+               (%s::int[])[1 + g %% %s],
+               DATE '2015-01-01' + (g / %s) / 16,
+               TIME '08:00' + ((g / %s) %% 16) * INTERVAL '30 minutes',
+               CASE WHEN g %% 10 = 0 THEN 'annule'
+                    WHEN g %% 10 = 1 THEN 'planifie'
+                    ELSE 'termine' END
+        FROM generate_series(0, %s - 1) AS g
+    ''', (patients, len(patients), medecins, len(medecins),
+          len(medecins), len(medecins), NB_RENDEZ_VOUS))
+
+    for table in ('utilisateurs', 'patients', 'rendez_vous', 'stats_rdv_jour'):
+        cursor.execute(f"ANALYZE {table}")
+    return medecins[0], patients[0]
+
+
+def noeuds(plan):
+    """
+    Parcourt récursivement les noeuds d'un plan JSON.
+    """
+    yield plan
+    for enfant in plan.get('Plans', []):
+        yield from noeuds(enfant)
+
+
+def est_table(relation, table):
+    """
+    Vrai si `relation` est la table ou l'une de ses partitions mensuelles.
+    """
+    return relation == table or re.fullmatch(rf"{table}_(\d{{4}}_\d{{2}}|defaut)", relation) is not None
+
+
+def violations(plan, interdits):
+    trouvees = []
+    for noeud in noeuds(plan):
+        for interdit in interdits:
+            if isinstance(interdit, tuple):
+                type_noeud, table = interdit
+                if noeud['Node Type'] == type_noeud and est_table(noeud.get('Relation Name', ''), table):
+                    trouvees.append(f"{type_noeud} sur {noeud['Relation Name']}")
+            elif noeud['Node Type'] == interdit:
+                trouvees.append(interdit)
+    return trouvees
+
+
+def verifier():
+    """
+    Vérifie tous les plans ; retourne le nombre de requêtes en régression.
+    """
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    echecs = 0
+    try:
+        cursor = connection.cursor()
+        medecin_id, patient_id = peupler(cursor)
+
+        substitutions = {MEDECIN: medecin_id, PATIENT: patient_id, LISTE_MEDECINS: [medecin_id]}
+
+        for nom, requete, params, interdits in REQUETES:
+            if isinstance(params, dict):
+                params = {cle: substitutions.get(p, p) for cle, p in params.items()}
+            else:
+                params = tuple(substitutions.get(p, p) for p in params)
+
+            cursor.execute("EXPLAIN (FORMAT JSON) " + requete, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            problemes = violations(plan[0]['Plan'], interdits)
+
+            if problemes:
+                echecs += 1
+                print(f"✗ {nom} : {', '.join(sorted(set(problemes)))}")
+            else:
+                print(f"✓ {nom}")
+
+    finally:
+        # Les données de test ne sont jamais conservées
+        connection.rollback()
+        cursor.close()
+        close_connection(connection)
+
+    return echecs
+
+
+if __name__ == "__main__":
+    nb_echecs = verifier()
+    print(f"\n{len(REQUETES) - nb_echecs}/{len(REQUETES)} plans conformes")
+    sys.exit(1 if nb_echecs else 0)
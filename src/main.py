@@ -1,15 +1,36 @@
 import sys
 import os
+from datetime import date, timedelta
 
 # Ajouter le dossier parent au path pour les imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from database.config import fermer_pool, CACHE_INVALIDATION_DISTANTE, INSTRUMENTATION, SYNCHRONISATION, TACHES_FOND
+from database.invalidation import demarrer_ecoute
+from database.synchro import demarrer_synchronisation, arreter_synchronisation, synchroniser
+from database.taches import demarrer_travailleurs, arreter_travailleurs
 from models.utilisateur import Utilisateur
 from models.patient import Patient
 from models.rendez_vous import RendezVous
+from models.statistiques import Statistiques
+from models.agenda import Agenda
+from models.liste_attente import ListeAttente
 from utils.validation import *
+from utils import metriques
 
 print("test deusieme commit")
+
+# Nombre de lignes affichées par page dans les listes
+TAILLE_PAGE = 20
+
+# Nombre de rendez-vous passés affichés dans le dossier d'un patient
+HISTORIQUE_CONSULTATION = 20
+
+# Nombre de jours détaillés dans le tableau de bord
+JOURS_TABLEAU_DE_BORD = 7
+
+JOURS_SEMAINE = ('Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche')
+
 class ApplicationClinique:
     """
     Application principale de gestion de la clinique.
@@ -28,8 +49,8 @@ class ApplicationClinique:
         print("          SYSTÈME DE GESTION DE CLINIQUE")
         print("="*60)
         if self.utilisateur_connecte:
-            print(f"Connecté : {self.utilisateur_connecte['prenom']} {self.utilisateur_connecte['nom']}")
-            print(f"Rôle : {self.utilisateur_connecte['role'].capitalize()}")
+            print(f"Connecté : {self.utilisateur_connecte.prenom} {self.utilisateur_connecte.nom}")
+            print(f"Rôle : {self.utilisateur_connecte.role.capitalize()}")
         print("="*60 + "\n")
     
     def connexion(self):
@@ -44,7 +65,7 @@ class ApplicationClinique:
         
         if user:
             self.utilisateur_connecte = user
-            print(f"\n✓ Connexion réussie ! Bienvenue {user['prenom']} {user['nom']}")
+            print(f"\n✓ Connexion réussie ! Bienvenue {user.prenom} {user.nom}")
             input("\nAppuyez sur Entrée pour continuer...")
             return True
         else:
@@ -58,7 +79,7 @@ class ApplicationClinique:
             self.clear_screen()
             self.afficher_header()
             
-            if self.utilisateur_connecte['role'] == 'medecin':
+            if self.utilisateur_connecte.role == 'medecin':
                 self.menu_medecin()
             else:
                 self.menu_secretaire()
@@ -66,11 +87,12 @@ class ApplicationClinique:
     def menu_medecin(self):
         """Menu pour les médecins."""
         print("=== MENU MÉDECIN ===\n")
-        print("1. Voir mes rendez-vous")
+        print("1. Mon agenda")
         print("2. Consulter un patient")
         print("3. Marquer un rendez-vous comme terminé")
         print("4. Rechercher un patient")
         print("5. Voir tous les patients")
+        print("6. Tableau de bord")
         print("0. Déconnexion")
         
         choix = input("\nVotre choix : ").strip()
@@ -85,6 +107,8 @@ class ApplicationClinique:
             self.rechercher_patient()
         elif choix == '5':
             self.lister_tous_patients()
+        elif choix == '6':
+            self.tableau_de_bord(medecin_id=self.utilisateur_connecte.id)
         elif choix == '0':
             self.deconnexion()
         else:
@@ -98,9 +122,11 @@ class ApplicationClinique:
         print("2. Rechercher un patient")
         print("3. Modifier un patient")
         print("4. Créer un rendez-vous")
-        print("5. Voir tous les rendez-vous")
+        print("5. Voir les rendez-vous")
         print("6. Annuler un rendez-vous")
         print("7. Lister tous les patients")
+        print("8. Tableau de bord")
+        print("9. Liste d'attente")
         print("0. Déconnexion")
         
         choix = input("\nVotre choix : ").strip()
@@ -119,6 +145,10 @@ class ApplicationClinique:
             self.annuler_rendez_vous()
         elif choix == '7':
             self.lister_tous_patients()
+        elif choix == '8':
+            self.tableau_de_bord()
+        elif choix == '9':
+            self.gerer_liste_attente()
         elif choix == '0':
             self.deconnexion()
         else:
@@ -166,7 +196,7 @@ class ApplicationClinique:
         if patients:
             print(f"\n{len(patients)} patient(s) trouvé(s) :\n")
             for p in patients:
-                print(f"ID: {p[0]} | {p[1]} {p[2]} | Né(e) le {p[3]} | Tel: {p[5]}")
+                print(f"ID: {p.id} | {p.nom} {p.prenom} | Né(e) le {p.date_naissance} | Tel: {p.telephone}")
         else:
             print("\nAucun patient trouvé")
         
@@ -177,16 +207,31 @@ class ApplicationClinique:
         self.clear_screen()
         print("\n=== LISTE DES PATIENTS ===\n")
         
-        patients = Patient.lister_patients()
+        patients, suivante = Patient.lister_patients_page(TAILLE_PAGE)
         
-        if patients:
-            print(f"Total : {len(patients)} patients\n")
-            for p in patients:
-                print(f"ID: {p[0]} | {p[1]} {p[2]} | Né(e) le {p[3]} | {p[4]} | Tel: {p[5]}")
-        else:
+        if not patients:
             print("Aucun patient enregistré")
+            input("\nAppuyez sur Entrée...")
+            return
         
-        input("\nAppuyez sur Entrée...")
+        numero_page = 1
+        while True:
+            print(f"--- Page {numero_page} ---\n")
+            for p in patients:
+                print(f"ID: {p.id} | {p.nom} {p.prenom} | Né(e) le {p.date_naissance} | {p.sexe} | Tel: {p.telephone}")
+            
+            if suivante is None:
+                input("\nFin de la liste. Appuyez sur Entrée...")
+                return
+            
+            reponse = input("\nEntrée : page suivante | q : quitter : ").strip().lower()
+            if reponse == 'q':
+                return
+            
+            patients, suivante = Patient.lister_patients_page(TAILLE_PAGE, apres=suivante)
+            numero_page += 1
+            if not patients:
+                return
     
     def modifier_patient(self):
         """Modifie les informations d'un patient."""
@@ -201,12 +246,12 @@ class ApplicationClinique:
             input("\nAppuyez sur Entrée...")
             return
         
-        print(f"\nPatient : {patient[1]} {patient[2]}")
+        print(f"\nPatient : {patient.nom} {patient.prenom}")
         print("\nLaissez vide pour ne pas modifier un champ\n")
         
-        nouveau_tel = input(f"Nouveau téléphone ({patient[5]}) : ").strip()
-        nouvelle_adresse = input(f"Nouvelle adresse ({patient[6] or 'N/A'}) : ").strip()
-        nouvel_email = input(f"Nouvel email ({patient[7] or 'N/A'}) : ").strip()
+        nouveau_tel = input(f"Nouveau téléphone ({patient.telephone}) : ").strip()
+        nouvelle_adresse = input(f"Nouvelle adresse ({patient.adresse or 'N/A'}) : ").strip()
+        nouvel_email = input(f"Nouvel email ({patient.email or 'N/A'}) : ").strip()
         
         modifications = {}
         if nouveau_tel:
@@ -231,27 +276,26 @@ class ApplicationClinique:
         
         patient_id = saisir_entier("ID du patient : ", min_val=1)
         
-        patient = Patient.obtenir_patient(patient_id)
+        patient, rdvs = Patient.dossier_complet(patient_id, limite_passes=HISTORIQUE_CONSULTATION)
         if not patient:
             print("\n✗ Patient non trouvé")
             input("\nAppuyez sur Entrée...")
             return
         
         print(f"\n--- Informations Patient ---")
-        print(f"Nom complet : {patient[1]} {patient[2]}")
-        print(f"Date de naissance : {patient[3]}")
-        print(f"Sexe : {patient[4]}")
-        print(f"Téléphone : {patient[5]}")
-        print(f"Adresse : {patient[6] or 'N/A'}")
-        print(f"Email : {patient[7] or 'N/A'}")
-        print(f"N° Sécurité sociale : {patient[8] or 'N/A'}")
-        
-        # Afficher les rendez-vous du patient
-        rdvs = RendezVous.lister_rendez_vous('patient', patient_id)
+        print(f"Nom complet : {patient.nom} {patient.prenom}")
+        print(f"Date de naissance : {patient.date_naissance}")
+        print(f"Sexe : {patient.sexe}")
+        print(f"Téléphone : {patient.telephone}")
+        print(f"Adresse : {patient.adresse or 'N/A'}")
+        print(f"Email : {patient.email or 'N/A'}")
+        print(f"N° Sécurité sociale : {patient.numero_securite_sociale or 'N/A'}")
+        
+        # Afficher les rendez-vous du patient (à venir + derniers passés)
         if rdvs:
             print(f"\n--- Rendez-vous ({len(rdvs)}) ---")
             for rdv in rdvs:
-                print(f"{rdv[1]} à {rdv[2]} | {rdv[4]} | Médecin: {rdv[6]}")
+                print(f"{rdv.date_rdv} à {rdv.heure_rdv} | {rdv.statut} | Médecin: {rdv.medecin}")
         
         input("\nAppuyez sur Entrée...")
     
@@ -273,10 +317,24 @@ class ApplicationClinique:
         
         print("\nMédecins disponibles :")
         for m in medecins:
-            spec = f" ({m[3]})" if m[3] else ""
-            print(f"  ID {m[0]} : Dr {m[1]} {m[2]}{spec}")
+            spec = f" ({m.specialite})" if m.specialite else ""
+            print(f"  ID {m.id} : Dr {m.nom} {m.prenom}{spec}")
         
         medecin_id = saisir_entier("\nID du médecin : ", min_val=1)
+        
+        # Proposer les prochains créneaux libres plutôt que de laisser deviner
+        aujourd_hui = date.today()
+        creneaux = RendezVous.creneaux_disponibles(
+            medecin_id, aujourd_hui, aujourd_hui + timedelta(days=14)
+        )[:10]
+        if creneaux:
+            print("\nProchains créneaux libres :")
+            for jour, heure in creneaux:
+                print(f"  {jour} à {heure.strftime('%H:%M')}")
+        else:
+            print("\nAucun créneau libre dans les 14 prochains jours")
+        print()
+        
         date_rdv = saisir_date("Date du rendez-vous")
         heure_rdv = saisir_heure("Heure du rendez-vous")
         motif = input("Motif (optionnel) : ").strip() or None
@@ -289,39 +347,142 @@ class ApplicationClinique:
         input("\nAppuyez sur Entrée...")
     
     def voir_rendez_vous_medecin(self):
-        """Affiche les rendez-vous d'un médecin."""
-        self.clear_screen()
-        print("\n=== MES RENDEZ-VOUS ===\n")
+        """Affiche l'agenda du médecin connecté (jour ou semaine) et met à jour les statuts."""
+        medecin_id = self.utilisateur_connecte.id
+        jour, semaine, recharger = date.today(), False, False
         
-        rdvs = RendezVous.lister_rendez_vous('medecin', self.utilisateur_connecte['id'])
-        
-        if rdvs:
-            print(f"Total : {len(rdvs)} rendez-vous\n")
-            for rdv in rdvs:
-                print(f"ID {rdv[0]} | {rdv[1]} à {rdv[2]} | Patient: {rdv[5]}")
-                print(f"  Statut: {rdv[4]} | Motif: {rdv[3] or 'N/A'}\n")
-        else:
-            print("Aucun rendez-vous")
-        
-        input("\nAppuyez sur Entrée...")
+        while True:
+            self.clear_screen()
+            if semaine:
+                agenda = Agenda.de_la_semaine(medecin_id, jour, recharger)
+            else:
+                agenda = Agenda.du_jour(medecin_id, jour, recharger)
+            recharger = False
+            
+            if agenda is None:
+                print("\n✗ Agenda indisponible")
+                input("\nAppuyez sur Entrée...")
+                return
+            
+            if semaine:
+                self.afficher_semaine(agenda)
+            else:
+                self.afficher_journee(agenda, jour)
+            
+            print("\nj : jour | s : semaine | < / > : précédent / suivant | r : actualiser")
+            print("t ID : terminé | a ID : annuler | q : quitter")
+            reponse = input("\nVotre choix : ").strip().lower()
+            action, _, rdv_id = reponse.partition(' ')
+            
+            if reponse == 'q':
+                return
+            elif reponse in ('j', 's'):
+                semaine = reponse == 's'
+            elif reponse in ('<', '>'):
+                pas = 7 if semaine else 1
+                jour += timedelta(days=pas if reponse == '>' else -pas)
+            elif reponse == 'r':
+                recharger = True
+            elif action in ('t', 'a') and rdv_id.strip().isdigit():
+                statut = 'termine' if action == 't' else 'annule'
+                succes, message = RendezVous.modifier_statut(int(rdv_id), statut)
+                print(f"\n{'✓' if succes else '✗'} {message}")
+                input("\nAppuyez sur Entrée...")
+    
+    def afficher_journee(self, agenda, jour):
+        """Affiche la chronologie d'une journée de l'agenda."""
+        print(f"\n=== AGENDA DU {JOURS_SEMAINE[jour.weekday()].upper()} {jour} ===\n")
+        
+        segments = agenda.chronologie(jour)
+        if not segments:
+            print("Pas de consultation ce jour")
+        for segment in segments:
+            horaire = f"{segment.debut:%H:%M}-{segment.fin:%H:%M}"
+            if segment.nature == 'libre':
+                print(f"{horaire} | libre")
+                continue
+            rdv = segment.rdv
+            alerte = "  ! dépassement" if segment.nature == 'depassement' else ""
+            print(f"{horaire} | ID {rdv.id} | {rdv.patient} | {rdv.statut} | {rdv.motif or 'N/A'}{alerte}")
+        
+        annules = [rdv for rdv in agenda.rendez_vous(jour) if rdv.statut == 'annule']
+        if annules:
+            print("\nAnnulés : " + ", ".join(f"{rdv.heure_rdv:%H:%M} {rdv.patient}" for rdv in annules))
+    
+    def afficher_semaine(self, agenda):
+        """Affiche le résumé de chaque jour d'une semaine de l'agenda."""
+        print(f"\n=== AGENDA : SEMAINE DU {agenda.debut} ===\n")
+        
+        for jour in agenda.jours():
+            resume = agenda.resume(jour)
+            libre = resume['minutes_libres']
+            ligne = (f"{JOURS_SEMAINE[jour.weekday()]:<9} {jour} | {resume['planifie']} planifié(s)"
+                     f" | {resume['termine']} terminé(s) | {resume['annule']} annulé(s)"
+                     f" | libre {libre // 60}h{libre % 60:02d}")
+            if resume['depassements']:
+                ligne += f" | {resume['depassements']} dépassement(s)"
+            print(ligne)
     
     def voir_tous_rendez_vous(self):
-        """Affiche tous les rendez-vous."""
+        """Affiche les rendez-vous (à venir par défaut), avec filtres combinables."""
         self.clear_screen()
-        print("\n=== TOUS LES RENDEZ-VOUS ===\n")
+        print("\n=== RENDEZ-VOUS ===\n")
+        print("Laissez vide pour ne pas filtrer\n")
         
-        rdvs = RendezVous.lister_rendez_vous()
+        filtres = {}
         
-        if rdvs:
-            print(f"Total : {len(rdvs)} rendez-vous\n")
-            for rdv in rdvs:
-                print(f"ID {rdv[0]} | {rdv[1]} à {rdv[2]}")
-                print(f"  Patient: {rdv[5]} | Médecin: {rdv[6]}")
-                print(f"  Statut: {rdv[4]} | Motif: {rdv[3] or 'N/A'}\n")
-        else:
+        medecin = input("ID du médecin : ").strip()
+        if medecin.isdigit():
+            filtres['medecin_id'] = int(medecin)
+        
+        date_debut = input(f"Du (YYYY-MM-DD, défaut {date.today()}) : ").strip()
+        filtres['date_debut'] = date_debut if valider_date(date_debut) else date.today()
+        
+        date_fin = input("Au (YYYY-MM-DD) : ").strip()
+        if valider_date(date_fin):
+            filtres['date_fin'] = date_fin
+        
+        statut = input("Statut (planifie/termine/annule) : ").strip().lower()
+        if statut in ('planifie', 'termine', 'annule'):
+            filtres['statut'] = statut
+        print()
+        
+        def afficher(rdv):
+            print(f"ID {rdv.id} | {rdv.date_rdv} à {rdv.heure_rdv}")
+            print(f"  Patient: {rdv.patient} | Médecin: {rdv.medecin}")
+            print(f"  Statut: {rdv.statut} | Motif: {rdv.motif or 'N/A'}\n")
+        
+        self.parcourir_rendez_vous(afficher, **filtres)
+    
+    def parcourir_rendez_vous(self, afficher, **filtres):
+        """Affiche page par page les rendez-vous correspondant aux filtres."""
+        rdvs, suivante = RendezVous.rechercher_rendez_vous(taille_page=TAILLE_PAGE, **filtres)
+        
+        if not rdvs:
             print("Aucun rendez-vous")
+            input("\nAppuyez sur Entrée...")
+            return
         
-        input("\nAppuyez sur Entrée...")
+        numero_page = 1
+        while True:
+            print(f"--- Page {numero_page} ---\n")
+            for rdv in rdvs:
+                afficher(rdv)
+            
+            if suivante is None:
+                input("Fin de la liste. Appuyez sur Entrée...")
+                return
+            
+            reponse = input("Entrée : page suivante | q : quitter : ").strip().lower()
+            if reponse == 'q':
+                return
+            
+            rdvs, suivante = RendezVous.rechercher_rendez_vous(
+                taille_page=TAILLE_PAGE, apres=suivante, **filtres
+            )
+            numero_page += 1
+            if not rdvs:
+                return
     
     def terminer_rendez_vous(self):
         """Marque un rendez-vous comme terminé."""
@@ -351,6 +512,79 @@ class ApplicationClinique:
         
         input("\nAppuyez sur Entrée...")
     
+    def gerer_liste_attente(self):
+        """Affiche la liste d'attente, inscrit ou retire un patient."""
+        self.clear_screen()
+        print("\n=== LISTE D'ATTENTE ===\n")
+        
+        inscriptions = ListeAttente.lister()
+        if not inscriptions:
+            print("Aucun patient en attente")
+        for inscription in inscriptions:
+            cible = (f"médecin ID {inscription.medecin_id}" if inscription.medecin_id is not None
+                     else inscription.specialite)
+            print(f"ID {inscription.id} | {inscription.patient} | {cible} | "
+                  f"du {inscription.date_debut} au {inscription.date_fin} | priorité {inscription.priorite}")
+        
+        print("\n1. Inscrire un patient")
+        print("2. Retirer une inscription")
+        print("0. Retour")
+        choix = input("\nVotre choix : ").strip()
+        
+        if choix == '1':
+            patient_id = saisir_entier("\nID du patient : ", min_val=1)
+            medecin = input("ID du médecin (vide : toute la spécialité) : ").strip()
+            medecin_id = int(medecin) if medecin.isdigit() else None
+            specialite = None
+            if medecin_id is None:
+                specialite = input("Spécialité : ").strip() or None
+            date_debut = saisir_date("Disponible du")
+            date_fin = saisir_date("Disponible au")
+            priorite = saisir_entier("Priorité (0 = normale, plus élevée = plus urgente) : ", min_val=0)
+            motif = input("Motif (optionnel) : ").strip() or None
+            succes, message = ListeAttente.inscrire(patient_id, date_debut, date_fin, medecin_id,
+                                                    specialite, priorite, motif)
+        elif choix == '2':
+            succes, message = ListeAttente.retirer(saisir_entier("\nID de l'inscription : ", min_val=1))
+        else:
+            return
+        
+        print(f"\n{'✓' if succes else '✗'} {message}")
+        input("\nAppuyez sur Entrée...")
+    
+    # === STATISTIQUES ===
+    
+    def tableau_de_bord(self, medecin_id=None):
+        """Affiche l'activité récente (d'un médecin ou de toute la clinique)."""
+        self.clear_screen()
+        print("\n=== TABLEAU DE BORD ===\n")
+        
+        aujourd_hui = date.today()
+        
+        print(f"--- Rendez-vous des {JOURS_TABLEAU_DE_BORD} derniers jours ---\n")
+        stats = Statistiques.rdv_par_jour(
+            aujourd_hui - timedelta(days=JOURS_TABLEAU_DE_BORD - 1), aujourd_hui, medecin_id
+        )
+        if stats:
+            for stat in stats:
+                print(f"{stat.jour} | {stat.medecin:<25} | {stat.statut:<9} | {stat.nombre}")
+        else:
+            print("Aucun rendez-vous")
+        
+        taux = Statistiques.taux(aujourd_hui - timedelta(days=29), aujourd_hui, medecin_id)
+        if taux:
+            print("\n--- 30 derniers jours ---\n")
+            print(f"Rendez-vous : {taux['total']}")
+            print(f"Annulations : {taux['annules']} ({taux['taux_annulation']} %)")
+            print(f"Absences    : {taux['absences']} ({taux['taux_absence']} %)")
+        
+        if medecin_id is None:
+            print("\n--- Nouveaux patients par semaine ---\n")
+            for stat in Statistiques.nouveaux_patients(8):
+                print(f"Semaine du {stat.semaine} : {stat.nombre}")
+        
+        input("\nAppuyez sur Entrée...")
+    
     def deconnexion(self):
         """Déconnexion de l'utilisateur."""
         if confirmer_action("\nVoulez-vous vraiment vous déconnecter ?"):
@@ -365,11 +599,33 @@ class ApplicationClinique:
         print("   Bienvenue dans le Système de Gestion de Clinique")
         print("="*60)
         
+        if CACHE_INVALIDATION_DISTANTE:
+            demarrer_ecoute()
+        
+        if SYNCHRONISATION['active']:
+            demarrer_synchronisation(SYNCHRONISATION['intervalle'])
+        
+        if TACHES_FOND['active']:
+            demarrer_travailleurs()
+        
+        if INSTRUMENTATION['active']:
+            metriques.activer(INSTRUMENTATION['seuil_lent_ms'], INSTRUMENTATION['journal'],
+                              INSTRUMENTATION['port'])
+        
         while True:
             if not self.utilisateur_connecte:
                 if not self.connexion():
                     if not confirmer_action("\nVoulez-vous réessayer ?"):
+                        if TACHES_FOND['active']:
+                            arreter_travailleurs()
+                        if SYNCHRONISATION['active']:
+                            arreter_synchronisation()
+                            succes, message = synchroniser()
+                            print(f"\n{'✓' if succes else '✗'} {message}")
                         print("\nAu revoir !")
+                        if metriques.etat.actif:
+                            print("\n" + metriques.rapport())
+                        fermer_pool()
                         break
                 else:
                     self.menu_principal()
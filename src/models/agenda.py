@@ -0,0 +1,229 @@
+"""
+Agenda d'un médecin pour un jour ou une semaine.
+
+La période est chargée en une requête sur l'index (medecin_id, date_rdv, heure_rdv) :
+le coût ne dépend que des rendez-vous de la période, pas de l'historique du médecin.
+Chaque journée est ensuite résumée en une chronologie précalculée : rendez-vous,
+plages libres (dans les horaires de consultation) et dépassements (rendez-vous hors
+des horaires ou qui chevauchent le précédent).
+
+Les agendas chargés restent en cache ; quand RendezVous.modifier_statut termine ou
+annule un rendez-vous, seule la journée concernée est recalculée en mémoire, sans
+nouvelle requête ; de même pour un créneau réattribué par la liste d'attente
+(reporter_reservation). Les autres réservations apparaissent à l'expiration du
+cache ou avec recharger=True.
+"""
+import threading
+from datetime import date, time, timedelta
+
+from database.config import get_connection, close_connection
+from database.preparees import enregistrer, executer
+from models.lignes import curseur, RendezVousAgenda, Segment
+from models.rendez_vous import ABONNES_STATUT, DUREE_RDV, HORAIRES_TRAVAIL, _minutes
+from utils.cache import CacheLRU
+from utils.metriques import instrumenter_methodes
+
+cache_agendas = CacheLRU('agendas', taille_max=200, ttl=60)
+
+REQUETE_AGENDA = '''
+    SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut, r.patient_id,
+           p.nom || ' ' || p.prenom AS patient
+    FROM rendez_vous r
+    JOIN patients p ON p.id = r.patient_id
+    WHERE r.medecin_id = %s AND r.date_rdv BETWEEN %s AND %s
+    ORDER BY r.date_rdv, r.heure_rdv
+'''
+
+enregistrer('agenda', REQUETE_AGENDA, ('integer', 'date', 'date'))
+
+
+def _heure(minutes):
+    return time(minutes // 60 % 24, minutes % 60)
+
+
+def _plages(jour):
+    if jour.weekday() not in HORAIRES_TRAVAIL['jours']:
+        return []
+    return [(_minutes(debut), _minutes(fin)) for debut, fin in HORAIRES_TRAVAIL['plages']]
+
+
+def _chronologie(jour, rendez_vous):
+    """
+    Chronologie d'une journée à partir de ses rendez-vous actifs triés par heure.
+    """
+    plages = _plages(jour)
+    segments = []
+    occupes = []
+    fin_occupee = 0
+    for rdv in rendez_vous:
+        debut = _minutes(rdv.heure_rdv)
+        fin = debut + DUREE_RDV
+        dans_horaires = any(debut_plage <= debut and fin <= fin_plage for debut_plage, fin_plage in plages)
+        nature = 'rdv' if dans_horaires and debut >= fin_occupee else 'depassement'
+        segments.append((debut, fin, nature, rdv))
+        occupes.append((debut, fin))
+        fin_occupee = max(fin_occupee, fin)
+
+    # Plages libres : parties des horaires non couvertes par un rendez-vous
+    for debut_plage, fin_plage in plages:
+        t = debut_plage
+        for debut, fin in occupes:
+            if fin <= t:
+                continue
+            if debut >= fin_plage:
+                break
+            if debut > t:
+                segments.append((t, debut, 'libre', None))
+            t = max(t, fin)
+        if t < fin_plage:
+            segments.append((t, fin_plage, 'libre', None))
+
+    segments.sort(key=lambda segment: (segment[0], segment[2] == 'libre'))
+    return [Segment(_heure(debut), _heure(fin), nature, rdv) for debut, fin, nature, rdv in segments]
+
+
+@instrumenter_methodes
+class Agenda:
+    """
+    Rendez-vous d'un médecin du `debut` au `fin` inclus, avec la chronologie de chaque jour.
+    """
+
+    def __init__(self, medecin_id, debut, fin, rendez_vous):
+        self.medecin_id = medecin_id
+        self.debut = debut
+        self.fin = fin
+        self._lock = threading.Lock()
+        self._jour_du_rdv = {}
+        self._par_jour = {jour: [] for jour in self.jours()}
+        for rdv in rendez_vous:
+            self._par_jour[rdv.date_rdv].append(rdv)
+            self._jour_du_rdv[rdv.id] = rdv.date_rdv
+        self._chronologies = {jour: self._calculer(jour) for jour in self._par_jour}
+
+    def _calculer(self, jour):
+        return _chronologie(jour, [rdv for rdv in self._par_jour[jour] if rdv.statut != 'annule'])
+
+    def jours(self):
+        return [self.debut + timedelta(days=i) for i in range((self.fin - self.debut).days + 1)]
+
+    def chronologie(self, jour):
+        """
+        Segments de la journée (liste vide hors de la période).
+        """
+        with self._lock:
+            return list(self._chronologies.get(jour, []))
+
+    def rendez_vous(self, jour):
+        """
+        Rendez-vous de la journée, annulés compris, dans l'ordre des heures.
+        """
+        with self._lock:
+            return list(self._par_jour.get(jour, []))
+
+    def resume(self, jour=None):
+        """
+        Nombre de rendez-vous par statut, dépassements et minutes libres (d'un jour ou de la période).
+        """
+        jours = [jour] if jour is not None else self.jours()
+        resume = {'planifie': 0, 'termine': 0, 'annule': 0, 'depassements': 0, 'minutes_libres': 0}
+        with self._lock:
+            for j in jours:
+                for rdv in self._par_jour.get(j, []):
+                    resume[rdv.statut] += 1
+                for segment in self._chronologies.get(j, []):
+                    if segment.nature == 'depassement':
+                        resume['depassements'] += 1
+                    elif segment.nature == 'libre':
+                        resume['minutes_libres'] += _minutes(segment.fin) - _minutes(segment.debut)
+        return resume
+
+    def appliquer_statut(self, rdv_id, statut):
+        """
+        Reporte un changement de statut ; retourne False si le rendez-vous n'est pas dans l'agenda.
+        """
+        with self._lock:
+            jour = self._jour_du_rdv.get(rdv_id)
+            if jour is None:
+                return False
+            rendez_vous = self._par_jour[jour]
+            for i, rdv in enumerate(rendez_vous):
+                if rdv.id == rdv_id:
+                    rendez_vous[i] = rdv._replace(statut=statut)
+                    break
+            self._chronologies[jour] = self._calculer(jour)
+            return True
+
+    def ajouter_rendez_vous(self, rdv):
+        """
+        Ajoute un rendez-vous réservé ; retourne False s'il est hors de la période ou déjà présent.
+        """
+        with self._lock:
+            rendez_vous = self._par_jour.get(rdv.date_rdv)
+            if rendez_vous is None or rdv.id in self._jour_du_rdv:
+                return False
+            rendez_vous.append(rdv)
+            rendez_vous.sort(key=lambda r: r.heure_rdv)
+            self._jour_du_rdv[rdv.id] = rdv.date_rdv
+            self._chronologies[rdv.date_rdv] = self._calculer(rdv.date_rdv)
+            return True
+
+    @staticmethod
+    def charger(medecin_id, debut, fin, recharger=False):
+        """
+        Agenda d'un médecin sur une période (depuis le cache si possible).
+        Retourne None en cas d'erreur.
+        """
+        cle = (medecin_id, debut, fin)
+        if recharger:
+            cache_agendas.invalider(cle)
+        return cache_agendas.obtenir(cle, lambda: Agenda._lire(medecin_id, debut, fin))
+
+    @staticmethod
+    def _lire(medecin_id, debut, fin):
+        connection = get_connection()
+        if not connection:
+            return None
+
+        try:
+            cursor = curseur(connection, RendezVousAgenda)
+            executer(cursor, 'agenda', (medecin_id, debut, fin))
+            return Agenda(medecin_id, debut, fin, cursor.fetchall())
+
+        except Exception as e:
+            print(f"Erreur lors du chargement de l'agenda : {e}")
+            return None
+        finally:
+            cursor.close()
+            connection.rollback()
+            close_connection(connection)
+
+    @staticmethod
+    def du_jour(medecin_id, jour=None, recharger=False):
+        jour = jour or date.today()
+        return Agenda.charger(medecin_id, jour, jour, recharger)
+
+    @staticmethod
+    def de_la_semaine(medecin_id, jour=None, recharger=False):
+        """
+        Agenda du lundi au dimanche de la semaine de `jour` (aujourd'hui par défaut).
+        """
+        jour = jour or date.today()
+        lundi = jour - timedelta(days=jour.weekday())
+        return Agenda.charger(medecin_id, lundi, lundi + timedelta(days=6), recharger)
+
+
+def reporter_reservation(medecin_id, rdv):
+    """
+    Ajoute un rendez-vous (RendezVousAgenda) aux agendas en cache du médecin.
+    """
+    for agenda in cache_agendas.valeurs():
+        if agenda.medecin_id == medecin_id:
+            agenda.ajouter_rendez_vous(rdv)
+
+
+def _suivre_statut(rdv_id, statut):
+    for agenda in cache_agendas.valeurs():
+        agenda.appliquer_statut(rdv_id, statut)
+
+
+ABONNES_STATUT.append(_suivre_statut)
@@ -0,0 +1,421 @@
+"""
+Équivalents asynchrones (asyncio) de Patient, RendezVous et Utilisateur.
+
+Mêmes contrats de retour que les modèles synchrones : tuples (succes, message)
+et mêmes types de lignes (models/lignes.py). Les requêtes des modèles synchrones sont réutilisées
+et converties au format asyncpg par convertir_requete().
+"""
+import asyncio
+from datetime import date, time
+
+from database.async_config import connexion_db, convertir_requete
+from database.invalidation import CANAL, message_invalidation
+from models.lignes import LignePatient, FichePatient, LigneRendezVous, Medecin
+from models.patient import (
+    cache_patients, REQUETE_RECHERCHE_TELEPHONE, REQUETE_RECHERCHE_NOM,
+    SELECT_FICHE_PATIENT, SELECT_PAGE_PATIENTS, SELECT_PAGE_PATIENTS_SUIVANTE, REQUETE_DOSSIER_COMPLET,
+    _dossier, _valider_patient, _requete_modification
+)
+from models.rendez_vous import (
+    REQUETE_RESERVATION, MESSAGES_RESERVATION, RESERVATION_OK,
+    PATIENT_INTROUVABLE, MEDECIN_INTROUVABLE, CRENEAU_PRIS, ERREUR_CONNEXION, ERREUR,
+    _requete_recherche, _notifier_abonnes
+)
+from models.utilisateur import (
+    cache_medecins, cache_sessions, REQUETE_IDENTIFIANTS, REQUETE_REHACHAGE, SELECT_MEDECINS,
+    _verifier_identifiants
+)
+from utils.securite import executeur, hacher_mot_de_passe, cle_session
+from utils.validation import normaliser_telephone
+
+
+def _date(valeur):
+    # asyncpg exige des objets date/time là où psycopg2 accepte des chaînes
+    return date.fromisoformat(valeur) if isinstance(valeur, str) else valeur
+
+
+def _heure(valeur):
+    return time.fromisoformat(valeur) if isinstance(valeur, str) else valeur
+
+
+async def _notifier(connection, nom_cache, cle=None):
+    """
+    Équivalent asynchrone de notifier_invalidation().
+    """
+    await connection.execute("SELECT pg_notify($1, $2)", CANAL, message_invalidation(nom_cache, cle))
+
+
+def _convertir(requete, params=()):
+    requete, valeurs = convertir_requete(requete, params)
+    return (requete, *valeurs)
+
+
+class PatientAsync:
+    """
+    Opérations CRUD asynchrones des patients.
+    """
+
+    @staticmethod
+    async def ajouter_patient(nom, prenom, date_naissance, sexe, telephone, adresse=None, email=None, numero_ss=None):
+        """
+        Ajoute un nouveau patient dans la base de données.
+        """
+        telephone = normaliser_telephone(telephone)
+        erreur = _valider_patient(telephone, date_naissance)
+        if erreur:
+            return False, erreur
+
+        async with connexion_db() as connection:
+            if not connection:
+                return False, "Erreur de connexion à la base de données"
+            try:
+                patient_id = await connection.fetchval('''
+                    INSERT INTO patients (nom, prenom, date_naissance, sexe, telephone, adresse, email, numero_securite_sociale)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    RETURNING id
+                ''', nom.strip(), prenom.strip(), _date(date_naissance), sexe, telephone, adresse, email, numero_ss)
+                return True, f"Patient ajouté avec succès (ID: {patient_id})"
+            except Exception as e:
+                return False, f"Erreur lors de l'ajout du patient : {str(e)}"
+
+    @staticmethod
+    async def lister_patients_page(taille_page=50, apres=None):
+        """
+        Récupère une page de patients triés par (nom, prénom, id) ; retourne (patients, cle_suivante).
+        """
+        async with connexion_db() as connection:
+            if not connection:
+                return [], None
+            try:
+                if apres:
+                    lignes = await connection.fetch(
+                        *_convertir(SELECT_PAGE_PATIENTS_SUIVANTE, (*apres, taille_page + 1))
+                    )
+                else:
+                    lignes = await connection.fetch(*_convertir(SELECT_PAGE_PATIENTS, (taille_page + 1,)))
+
+                patients = [LignePatient._make(ligne) for ligne in lignes]
+                if len(patients) > taille_page:
+                    patients = patients[:taille_page]
+                    dernier = patients[-1]
+                    return patients, (dernier[1], dernier[2], dernier[0])
+                return patients, None
+            except Exception as e:
+                print(f"Erreur lors de la récupération des patients : {e}")
+                return [], None
+
+    @staticmethod
+    async def rechercher_patient(terme_recherche, limite=50):
+        """
+        Recherche un patient par nom, prénom ou début de numéro de téléphone.
+        """
+        terme = terme_recherche.strip()
+        if not terme:
+            return []
+
+        async with connexion_db() as connection:
+            if not connection:
+                return []
+            try:
+                telephone = normaliser_telephone(terme)
+                if telephone.isdigit():
+                    requete = _convertir(REQUETE_RECHERCHE_TELEPHONE, (f"{telephone}%", limite))
+                else:
+                    requete = _convertir(REQUETE_RECHERCHE_NOM, (terme, terme, limite))
+                return [LignePatient._make(ligne) for ligne in await connection.fetch(*requete)]
+            except Exception as e:
+                print(f"Erreur lors de la recherche : {e}")
+                return []
+
+    @staticmethod
+    async def obtenir_patient(patient_id):
+        """
+        Récupère les informations détaillées d'un patient (via le cache partagé).
+        """
+        trouve, patient = cache_patients.get(patient_id)
+        if trouve:
+            return patient
+
+        async with connexion_db() as connection:
+            if not connection:
+                return None
+            try:
+                ligne = await connection.fetchrow(*_convertir(SELECT_FICHE_PATIENT, (patient_id,)))
+                patient = FichePatient._make(ligne) if ligne else None
+                if patient:
+                    cache_patients.set(patient_id, patient)
+                return patient
+            except Exception as e:
+                print(f"Erreur lors de la récupération du patient : {e}")
+                return None
+
+    @staticmethod
+    async def dossier_complet(patient_id, limite_passes=20):
+        """
+        Fiche du patient et ses rendez-vous en une requête ; retourne (patient, rendez_vous).
+        """
+        async with connexion_db() as connection:
+            if not connection:
+                return None, []
+            try:
+                ligne = await connection.fetchrow(
+                    *_convertir(REQUETE_DOSSIER_COMPLET, (limite_passes, patient_id))
+                )
+                return _dossier(ligne) if ligne else (None, [])
+            except Exception as e:
+                print(f"Erreur lors de la récupération du dossier patient : {e}")
+                return None, []
+
+    @staticmethod
+    async def modifier_patient(patient_id, **kwargs):
+        """
+        Modifie les informations d'un patient.
+        """
+        query, valeurs = _requete_modification(patient_id, kwargs)
+        if not query:
+            return False, "Aucun champ à modifier"
+
+        async with connexion_db() as connection:
+            if not connection:
+                return False, "Erreur de connexion"
+            try:
+                async with connection.transaction():
+                    statut = await connection.execute(*_convertir(query, valeurs))
+                    await _notifier(connection, cache_patients.nom, patient_id)
+                cache_patients.invalider(patient_id)
+
+                if statut.split()[-1] != '0':
+                    return True, "Patient modifié avec succès"
+                return False, "Patient non trouvé"
+            except Exception as e:
+                return False, f"Erreur : {str(e)}"
+
+    @staticmethod
+    async def supprimer_patient(patient_id):
+        """
+        Supprime un patient (et ses rendez-vous associés).
+        """
+        async with connexion_db() as connection:
+            if not connection:
+                return False, "Erreur de connexion"
+            try:
+                async with connection.transaction():
+                    statut = await connection.execute("DELETE FROM patients WHERE id = $1", patient_id)
+                    await _notifier(connection, cache_patients.nom, patient_id)
+                cache_patients.invalider(patient_id)
+
+                if statut.split()[-1] != '0':
+                    return True, "Patient supprimé avec succès"
+                return False, "Patient non trouvé"
+            except Exception as e:
+                return False, f"Erreur : {str(e)}"
+
+
+class RendezVousAsync:
+    """
+    Gestion asynchrone des rendez-vous.
+    """
+
+    @staticmethod
+    async def reserver(patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+        """
+        Réserve un créneau en un aller-retour ; retourne (code, rdv_id).
+        """
+        async with connexion_db() as connection:
+            if not connection:
+                return ERREUR_CONNEXION, None
+            try:
+                patient_existe, medecin_existe, rdv_id = await connection.fetchrow(*_convertir(
+                    REQUETE_RESERVATION, {
+                        'patient_id': patient_id,
+                        'medecin_id': medecin_id,
+                        'date_rdv': _date(date_rdv),
+                        'heure_rdv': _heure(heure_rdv),
+                        'motif': motif,
+                    }
+                ))
+            except Exception as e:
+                print(f"Erreur lors de la réservation : {e}")
+                return ERREUR, None
+
+        if not patient_existe:
+            return PATIENT_INTROUVABLE, None
+        if not medecin_existe:
+            return MEDECIN_INTROUVABLE, None
+        if rdv_id is None:
+            return CRENEAU_PRIS, None
+        return RESERVATION_OK, rdv_id
+
+    @staticmethod
+    async def creer_rendez_vous(patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+        """
+        Crée un nouveau rendez-vous.
+        """
+        code, rdv_id = await RendezVousAsync.reserver(patient_id, medecin_id, date_rdv, heure_rdv, motif)
+        if code != RESERVATION_OK:
+            return False, MESSAGES_RESERVATION[code]
+        return True, f"Rendez-vous créé avec succès (ID: {rdv_id})"
+
+    @staticmethod
+    async def rechercher_rendez_vous(medecin_id=None, patient_id=None, date_debut=None, date_fin=None,
+                                     statut=None, taille_page=50, apres=None, decroissant=False):
+        """
+        Page de rendez-vous filtrés ; retourne (rendez_vous, cle_suivante).
+        """
+        if apres:
+            apres = (_date(apres[0]), _heure(apres[1]), apres[2])
+        query, params = _requete_recherche(medecin_id, patient_id, _date(date_debut), _date(date_fin),
+                                           statut, taille_page, apres, decroissant)
+
+        async with connexion_db() as connection:
+            if not connection:
+                return [], None
+            try:
+                rendez_vous = [LigneRendezVous._make(ligne)
+                               for ligne in await connection.fetch(*_convertir(query, params))]
+            except Exception as e:
+                print(f"Erreur lors de la récupération des rendez-vous : {e}")
+                return [], None
+
+        if len(rendez_vous) > taille_page:
+            rendez_vous = rendez_vous[:taille_page]
+            dernier = rendez_vous[-1]
+            return rendez_vous, (dernier[1], dernier[2], dernier[0])
+        return rendez_vous, None
+
+    @staticmethod
+    async def modifier_statut(rdv_id, nouveau_statut, notes=None):
+        """
+        Modifie le statut d'un rendez-vous (planifie, termine, annule).
+        """
+        statuts_valides = ['planifie', 'termine', 'annule']
+        if nouveau_statut not in statuts_valides:
+            return False, f"Statut invalide. Utilisez : {', '.join(statuts_valides)}"
+
+        async with connexion_db() as connection:
+            if not connection:
+                return False, "Erreur de connexion"
+            try:
+                if notes:
+                    statut = await connection.execute(
+                        "UPDATE rendez_vous SET statut = $1, notes = $2 WHERE id = $3",
+                        nouveau_statut, notes, rdv_id
+                    )
+                else:
+                    statut = await connection.execute(
+                        "UPDATE rendez_vous SET statut = $1 WHERE id = $2", nouveau_statut, rdv_id
+                    )
+                if statut.split()[-1] == '0':
+                    return False, "Rendez-vous non trouvé"
+            except Exception as e:
+                return False, f"Erreur : {str(e)}"
+
+        # Les abonnés accèdent à la base (synchrone) : hors de la boucle et de la connexion
+        messages = await asyncio.to_thread(_notifier_abonnes, rdv_id, nouveau_statut)
+        return True, " ; ".join([f"Statut modifié en '{nouveau_statut}'"] + messages)
+
+    @staticmethod
+    async def supprimer_rendez_vous(rdv_id):
+        """
+        Supprime un rendez-vous.
+        """
+        async with connexion_db() as connection:
+            if not connection:
+                return False, "Erreur de connexion"
+            try:
+                statut = await connection.execute("DELETE FROM rendez_vous WHERE id = $1", rdv_id)
+                if statut.split()[-1] != '0':
+                    return True, "Rendez-vous supprimé"
+                return False, "Rendez-vous non trouvé"
+            except Exception as e:
+                return False, f"Erreur : {str(e)}"
+
+
+class UtilisateurAsync:
+    """
+    Authentification et gestion asynchrones des utilisateurs.
+    """
+
+    @staticmethod
+    async def authentifier(email, mot_de_passe):
+        """
+        Authentifie un utilisateur et retourne ses informations (UtilisateurConnecte).
+        Le calcul scrypt s'exécute dans le pool de hachage, hors de la boucle d'événements.
+        """
+        cle = cle_session(email, mot_de_passe)
+        trouve, utilisateur = cache_sessions.get(cle)
+        if trouve:
+            return utilisateur
+
+        async with connexion_db() as connection:
+            if not connection:
+                return None
+            try:
+                ligne = await connection.fetchrow(*_convertir(REQUETE_IDENTIFIANTS, (email,)))
+            except Exception as e:
+                print(f"Erreur d'authentification : {e}")
+                return None
+
+        utilisateur, nouveau_hachage = await asyncio.get_running_loop().run_in_executor(
+            executeur(), _verifier_identifiants, ligne, mot_de_passe
+        )
+        if utilisateur:
+            if nouveau_hachage:
+                async with connexion_db() as connection:
+                    if connection:
+                        await connection.execute(*_convertir(
+                            REQUETE_REHACHAGE, (nouveau_hachage, utilisateur.id, ligne[6])
+                        ))
+            cache_sessions.set(cle, utilisateur)
+        return utilisateur
+
+    @staticmethod
+    async def lister_medecins():
+        """
+        Récupère la liste de tous les médecins (via le cache partagé).
+        """
+        trouve, medecins = cache_medecins.get('tous')
+        if trouve:
+            return medecins
+
+        async with connexion_db() as connection:
+            if not connection:
+                return []
+            try:
+                medecins = [Medecin._make(ligne) for ligne in await connection.fetch(SELECT_MEDECINS)]
+            except Exception as e:
+                print(f"Erreur : {e}")
+                return []
+
+        if medecins:
+            cache_medecins.set('tous', medecins)
+        return medecins
+
+    @staticmethod
+    async def ajouter_utilisateur(nom, prenom, email, mot_de_passe, role, specialite=None, telephone=None):
+        """
+        Ajoute un nouvel utilisateur (médecin ou secrétaire).
+        """
+        if role not in ['medecin', 'secretaire']:
+            return False, "Rôle invalide (medecin ou secretaire)"
+        hachage = await asyncio.get_running_loop().run_in_executor(
+            executeur(), hacher_mot_de_passe, mot_de_passe
+        )
+
+        async with connexion_db() as connection:
+            if not connection:
+                return False, "Erreur de connexion"
+            try:
+                async with connection.transaction():
+                    if await connection.fetchval("SELECT id FROM utilisateurs WHERE email = $1", email):
+                        return False, "Cet email est déjà utilisé"
+                    user_id = await connection.fetchval('''
+                        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite, telephone)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7)
+                        RETURNING id
+                    ''', nom, prenom, email, hachage, role, specialite, telephone)
+                    await _notifier(connection, cache_medecins.nom)
+                cache_medecins.vider()
+                return True, f"Utilisateur créé avec succès (ID: {user_id})"
+            except Exception as e:
+                return False, f"Erreur : {str(e)}"
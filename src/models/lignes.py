@@ -0,0 +1,151 @@
+"""
+Types de lignes renvoyés par les modèles.
+
+Ce sont des NamedTuple : aucun dictionnaire par instance (même empreinte mémoire
+qu'un tuple), accès par nom (patient.nom) et toujours par position (patient[1]).
+"""
+from datetime import date, datetime, time
+from typing import NamedTuple, Optional
+
+from database.instrumentation import CurseurInstrumente
+
+
+class LignePatient(NamedTuple):
+    """Patient dans une liste ou un résultat de recherche."""
+    id: int
+    nom: str
+    prenom: str
+    date_naissance: date
+    sexe: Optional[str]
+    telephone: str
+    email: Optional[str]
+
+
+class FichePatient(NamedTuple):
+    """Fiche détaillée d'un patient."""
+    id: int
+    nom: str
+    prenom: str
+    date_naissance: date
+    sexe: Optional[str]
+    telephone: str
+    adresse: Optional[str]
+    email: Optional[str]
+    numero_securite_sociale: Optional[str]
+    date_inscription: datetime
+
+
+class LigneRendezVous(NamedTuple):
+    """Rendez-vous avec les noms du patient et du médecin."""
+    id: int
+    date_rdv: date
+    heure_rdv: time
+    motif: Optional[str]
+    statut: str
+    patient: str
+    medecin: str
+
+
+class RendezVousAgenda(NamedTuple):
+    """Rendez-vous dans l'agenda d'un médecin."""
+    id: int
+    date_rdv: date
+    heure_rdv: time
+    motif: Optional[str]
+    statut: str
+    patient_id: int
+    patient: str
+
+
+class Segment(NamedTuple):
+    """Élément de la chronologie d'une journée : 'rdv', 'libre' ou 'depassement'."""
+    debut: time
+    fin: time
+    nature: str
+    rdv: Optional[RendezVousAgenda]
+
+
+class InscriptionAttente(NamedTuple):
+    """Patient en liste d'attente pour un médecin ou une spécialité."""
+    id: int
+    patient_id: int
+    patient: str
+    medecin_id: Optional[int]
+    specialite: Optional[str]
+    date_debut: date
+    date_fin: date
+    priorite: int
+    motif: Optional[str]
+    date_inscription: datetime
+
+
+class Medecin(NamedTuple):
+    id: int
+    nom: str
+    prenom: str
+    specialite: Optional[str]
+    telephone: Optional[str]
+
+
+class UtilisateurConnecte(NamedTuple):
+    id: int
+    nom: str
+    prenom: str
+    email: str
+    role: str
+    specialite: Optional[str]
+
+
+class StatJour(NamedTuple):
+    """Nombre de rendez-vous d'un médecin pour un jour et un statut."""
+    jour: date
+    medecin_id: int
+    medecin: str
+    statut: str
+    nombre: int
+
+
+class StatSemaine(NamedTuple):
+    """Nouveaux patients inscrits une semaine donnée (lundi)."""
+    semaine: date
+    nombre: int
+
+
+class CurseurLignes(CurseurInstrumente):
+    """
+    Curseur psycopg2 qui construit les lignes avec `type_ligne` (tuples bruts si None).
+    Utilisable aussi comme curseur serveur (nommé).
+    """
+    type_ligne = None
+
+    def fetchone(self):
+        ligne = super().fetchone()
+        if ligne is None or self.type_ligne is None:
+            return ligne
+        return self.type_ligne._make(ligne)
+
+    def fetchmany(self, size=None):
+        lignes = super().fetchmany(size) if size is not None else super().fetchmany()
+        if self.type_ligne is None:
+            return lignes
+        return list(map(self.type_ligne._make, lignes))
+
+    def fetchall(self):
+        lignes = super().fetchall()
+        if self.type_ligne is None:
+            return lignes
+        return list(map(self.type_ligne._make, lignes))
+
+    def __iter__(self):
+        if self.type_ligne is None:
+            return super().__iter__()
+        return map(self.type_ligne._make, super().__iter__())
+
+
+def curseur(connection, type_ligne=None, name=None):
+    """
+    Ouvre un curseur dont les lignes sont du type `type_ligne`.
+    """
+    cursor = connection.cursor(name=name, cursor_factory=CurseurLignes)
+    cursor.type_ligne = type_ligne
+    return cursor
@@ -0,0 +1,346 @@
+"""
+Liste d'attente et réattribution automatique des créneaux annulés.
+
+Un patient s'inscrit pour un médecin précis ou pour une spécialité, sur une période.
+Quand un rendez-vous à venir est annulé (RendezVous.modifier_statut), le créneau est
+proposé au meilleur candidat puis réservé par le chemin de réservation atomique
+(_reserver, index unique idx_rdv_creneau_actif) dans la même transaction que la
+mise à jour de l'inscription. Le nouveau rendez-vous est ensuite reporté dans les
+agendas en cache du médecin.
+
+Les inscriptions en cours sont indexées en mémoire : un tas par médecin et un par
+spécialité, ordonnés par priorité (la plus haute d'abord) puis ancienneté. Le meilleur
+candidat se trouve en regardant le sommet des deux tas concernés, sans parcourir la
+liste ; seules les inscriptions dont la période ne couvre pas le jour du créneau sont
+écartées puis remises. L'index est gardé dans un cache (rechargé à expiration et
+invalidé par les autres processus comme les autres caches).
+"""
+import heapq
+import threading
+from datetime import date, datetime
+
+from database.config import get_connection, close_connection
+from database.invalidation import notifier_invalidation
+from models.agenda import reporter_reservation
+from models.lignes import curseur, InscriptionAttente, RendezVousAgenda
+from models.rendez_vous import (
+    ABONNES_STATUT, RESERVATION_OK, CRENEAU_PRIS, PATIENT_INTROUVABLE, MESSAGES_RESERVATION,
+    _reserver
+)
+from utils.cache import CacheLRU
+from utils.metriques import instrumenter_methodes
+
+cache_liste_attente = CacheLRU('liste_attente', taille_max=1, ttl=300)
+
+SELECT_INSCRIPTIONS = '''
+    SELECT a.id, a.patient_id, p.nom || ' ' || p.prenom AS patient, a.medecin_id,
+           a.specialite, a.date_debut, a.date_fin, a.priorite, a.motif, a.date_inscription
+    FROM liste_attente a
+    JOIN patients p ON p.id = a.patient_id
+    WHERE a.statut = 'en_attente' AND a.date_fin >= CURRENT_DATE
+'''
+
+# Créneau libéré par un rendez-vous annulé, avec la spécialité du médecin
+REQUETE_CRENEAU = '''
+    SELECT r.medecin_id, r.date_rdv, r.heure_rdv, u.specialite
+    FROM rendez_vous r
+    JOIN utilisateurs u ON u.id = r.medecin_id
+    WHERE r.id = %s AND r.statut = 'annule'
+'''
+
+# L'inscription n'est servie qu'une fois, même si un autre processus l'a choisie aussi
+SERVIR_INSCRIPTION = '''
+    UPDATE liste_attente SET statut = 'servi', rdv_id = %s
+    WHERE id = %s AND statut = 'en_attente'
+'''
+
+
+def _specialite(nom):
+    return nom.strip().lower() if nom else None
+
+
+class FileAttente:
+    """
+    Index en mémoire des inscriptions en cours, partageable entre threads.
+    """
+
+    def __init__(self, inscriptions=()):
+        self._lock = threading.Lock()
+        self._tas = {}
+        self._inscriptions = {}
+        for inscription in inscriptions:
+            self.ajouter(inscription)
+
+    @staticmethod
+    def _cle(inscription):
+        if inscription.medecin_id is not None:
+            return ('medecin', inscription.medecin_id)
+        return ('specialite', _specialite(inscription.specialite))
+
+    def ajouter(self, inscription):
+        with self._lock:
+            self._inscriptions[inscription.id] = inscription
+            heapq.heappush(self._tas.setdefault(self._cle(inscription), []),
+                           (-inscription.priorite, inscription.date_inscription, inscription.id))
+
+    def retirer(self, inscription_id):
+        # Suppression paresseuse : l'entrée du tas est ignorée quand elle arrive au sommet
+        with self._lock:
+            self._inscriptions.pop(inscription_id, None)
+
+    def _sommet(self, cle):
+        tas = self._tas.get(cle)
+        while tas and tas[0][2] not in self._inscriptions:
+            heapq.heappop(tas)
+        return tas[0] if tas else None
+
+    def extraire(self, medecin_id, specialite, jour):
+        """
+        Retire et retourne la meilleure inscription pour un créneau du médecin le `jour`,
+        ou None. Les inscriptions expirées rencontrées sont abandonnées.
+        """
+        cles = [('medecin', medecin_id)]
+        if specialite:
+            cles.append(('specialite', _specialite(specialite)))
+        aujourd_hui = date.today()
+        ecartees = []
+
+        with self._lock:
+            try:
+                while True:
+                    candidats = [(sommet, cle) for cle in cles
+                                 if (sommet := self._sommet(cle)) is not None]
+                    if not candidats:
+                        return None
+                    entree, cle = min(candidats)
+                    heapq.heappop(self._tas[cle])
+                    inscription = self._inscriptions[entree[2]]
+
+                    if inscription.date_fin < aujourd_hui:
+                        del self._inscriptions[inscription.id]
+                    elif inscription.date_debut <= jour <= inscription.date_fin:
+                        del self._inscriptions[inscription.id]
+                        return inscription
+                    else:
+                        ecartees.append((cle, entree))
+            finally:
+                for cle, entree in ecartees:
+                    heapq.heappush(self._tas[cle], entree)
+
+
+def _date(valeur):
+    return date.fromisoformat(valeur) if isinstance(valeur, str) else valeur
+
+
+@instrumenter_methodes
+class ListeAttente:
+    """
+    Classe pour gérer la liste d'attente.
+    """
+
+    @staticmethod
+    def _file():
+        """
+        Index des inscriptions en cours (chargé en une requête au premier besoin).
+        """
+        return cache_liste_attente.obtenir('file', ListeAttente._charger)
+
+    @staticmethod
+    def _charger():
+        connection = get_connection()
+        if not connection:
+            return None
+
+        try:
+            cursor = curseur(connection, InscriptionAttente)
+            cursor.execute(SELECT_INSCRIPTIONS)
+            return FileAttente(cursor.fetchall())
+
+        except Exception as e:
+            print(f"Erreur lors du chargement de la liste d'attente : {e}")
+            return None
+        finally:
+            cursor.close()
+            connection.rollback()
+            close_connection(connection)
+
+    @staticmethod
+    def inscrire(patient_id, date_debut, date_fin, medecin_id=None, specialite=None, priorite=0, motif=None):
+        """
+        Inscrit un patient en liste d'attente pour un médecin ou une spécialité, du
+        date_debut au date_fin inclus. Plus la priorité est élevée, plus le patient passe tôt.
+        """
+        if medecin_id is None and not specialite:
+            return False, "Indiquez un médecin ou une spécialité"
+        date_debut, date_fin = _date(date_debut), _date(date_fin)
+        if date_debut > date_fin:
+            return False, "La date de début doit précéder la date de fin"
+        if date_fin < date.today():
+            return False, "La période est déjà passée"
+
+        connection = get_connection()
+        if not connection:
+            return False, "Erreur de connexion"
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute('''
+                INSERT INTO liste_attente (patient_id, medecin_id, specialite, date_debut,
+                                           date_fin, priorite, motif)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id, date_inscription
+            ''', (patient_id, medecin_id, specialite, date_debut, date_fin, priorite, motif))
+            inscription_id, date_inscription = cursor.fetchone()
+            cursor.execute("SELECT nom || ' ' || prenom FROM patients WHERE id = %s", (patient_id,))
+            patient = cursor.fetchone()[0]
+            notifier_invalidation(cursor, cache_liste_attente.nom)
+            connection.commit()
+
+            trouve, file = cache_liste_attente.get('file')
+            if trouve:
+                file.ajouter(InscriptionAttente(inscription_id, patient_id, patient, medecin_id,
+                                                specialite, date_debut, date_fin, priorite, motif,
+                                                date_inscription))
+            return True, f"Patient inscrit en liste d'attente (ID: {inscription_id})"
+
+        except Exception as e:
+            connection.rollback()
+            return False, f"Erreur : {str(e)}"
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+    @staticmethod
+    def retirer(inscription_id):
+        """
+        Retire une inscription de la liste d'attente.
+        """
+        connection = get_connection()
+        if not connection:
+            return False, "Erreur de connexion"
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute('''
+                UPDATE liste_attente SET statut = 'retire'
+                WHERE id = %s AND statut = 'en_attente'
+            ''', (inscription_id,))
+            retiree = cursor.rowcount > 0
+            notifier_invalidation(cursor, cache_liste_attente.nom)
+            connection.commit()
+
+            trouve, file = cache_liste_attente.get('file')
+            if trouve:
+                file.retirer(inscription_id)
+            if retiree:
+                return True, "Inscription retirée de la liste d'attente"
+            return False, "Inscription non trouvée"
+
+        except Exception as e:
+            connection.rollback()
+            return False, f"Erreur : {str(e)}"
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+    @staticmethod
+    def lister(medecin_id=None, specialite=None):
+        """
+        Inscriptions en cours (filtrées par médecin ou spécialité), par ordre de passage.
+        """
+        connection = get_connection()
+        if not connection:
+            return []
+
+        try:
+            cursor = curseur(connection, InscriptionAttente)
+            query = SELECT_INSCRIPTIONS
+            params = []
+            if medecin_id is not None:
+                query += " AND a.medecin_id = %s"
+                params.append(medecin_id)
+            if specialite:
+                query += " AND lower(a.specialite) = lower(%s)"
+                params.append(specialite.strip())
+            cursor.execute(query + " ORDER BY a.priorite DESC, a.date_inscription, a.id", params)
+            return cursor.fetchall()
+
+        except Exception as e:
+            print(f"Erreur lors de la récupération de la liste d'attente : {e}")
+            return []
+        finally:
+            cursor.close()
+            connection.rollback()
+            close_connection(connection)
+
+    @staticmethod
+    def pourvoir(rdv_id):
+        """
+        Attribue le créneau du rendez-vous annulé `rdv_id` au meilleur candidat de la
+        liste d'attente. Retourne (succes, message).
+        """
+        file = ListeAttente._file()
+        if file is None:
+            return False, "Liste d'attente indisponible"
+
+        connection = get_connection()
+        if not connection:
+            return False, "Erreur de connexion"
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute(REQUETE_CRENEAU, (rdv_id,))
+            creneau = cursor.fetchone()
+            if creneau is None:
+                return False, "Rendez-vous annulé non trouvé"
+            medecin_id, date_rdv, heure_rdv, specialite = creneau
+            if datetime.combine(date_rdv, heure_rdv) <= datetime.now():
+                return False, "Le créneau est passé"
+
+            while True:
+                inscription = file.extraire(medecin_id, specialite, date_rdv)
+                if inscription is None:
+                    return False, "Aucun patient en attente pour ce créneau"
+
+                try:
+                    code, nouveau_id = _reserver(cursor, inscription.patient_id, medecin_id,
+                                                 date_rdv, heure_rdv, inscription.motif)
+                    if code == RESERVATION_OK:
+                        cursor.execute(SERVIR_INSCRIPTION, (nouveau_id, inscription.id))
+                        if cursor.rowcount > 0:
+                            connection.commit()
+                            reporter_reservation(medecin_id, RendezVousAgenda(
+                                nouveau_id, date_rdv, heure_rdv, inscription.motif, 'planifie',
+                                inscription.patient_id, inscription.patient))
+                            return True, (f"Créneau du {date_rdv} à {heure_rdv:%H:%M} attribué à "
+                                          f"{inscription.patient} (liste d'attente)")
+                    connection.rollback()
+                except Exception:
+                    connection.rollback()
+                    file.ajouter(inscription)
+                    raise
+
+                # Inscription déjà servie ailleurs ou patient supprimé : candidat suivant
+                if code in (RESERVATION_OK, PATIENT_INTROUVABLE):
+                    continue
+                file.ajouter(inscription)
+                if code == CRENEAU_PRIS:
+                    return False, "Le créneau a déjà été repris"
+                return False, MESSAGES_RESERVATION[code]
+
+        except Exception as e:
+            connection.rollback()
+            return False, f"Erreur : {str(e)}"
+        finally:
+            cursor.close()
+            close_connection(connection)
+
+
+def _pourvoir_annulation(rdv_id, statut):
+    if statut != 'annule':
+        return None
+    succes, message = ListeAttente.pourvoir(rdv_id)
+    return message if succes else None
+
+
+ABONNES_STATUT.append(_pourvoir_annulation)
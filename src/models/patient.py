@@ -1,6 +1,195 @@
 from database.config import get_connection, close_connection
-from datetime import datetime
+from database.invalidation import notifier_invalidation
+from database.preparees import enregistrer, executer
+from database.sqlite import equivalent
+from datetime import date, datetime, time
+import json
+from models.lignes import curseur, LignePatient, FichePatient, LigneRendezVous
+from utils.cache import CacheLRU
+from utils.metriques import instrumenter_methodes
+from utils.validation import normaliser_telephone
 
+# Fiches patients consultées (obtenir_patient), invalidées à chaque modification
+cache_patients = CacheLRU('patients', taille_max=2000, ttl=300)
+
+# Recherche par préfixe : utilise l'index text_pattern_ops sur telephone
+# (numéros enregistrés sous leur forme normalisée, voir normaliser_telephone)
+REQUETE_RECHERCHE_TELEPHONE = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM patients
+    WHERE telephone LIKE %s
+    ORDER BY telephone, nom, prenom
+    LIMIT %s
+'''
+
+# Sous-chaîne insensible à la casse et aux accents : servie par
+# l'index GIN pg_trgm sur f_unaccent(nom || ' ' || prenom)
+REQUETE_RECHERCHE_NOM = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM patients
+    WHERE f_unaccent(nom || ' ' || prenom) ILIKE '%%' || f_unaccent(%s) || '%%'
+    ORDER BY similarity(f_unaccent(nom || ' ' || prenom), f_unaccent(%s)) DESC,
+             nom, prenom
+    LIMIT %s
+'''
+
+# Pagination par clé ("seek") : on repart après la dernière ligne lue
+# au lieu d'un OFFSET qui relit toutes les pages précédentes
+SELECT_PAGE_PATIENTS = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM patients
+    ORDER BY nom, prenom, id
+    LIMIT %s
+'''
+
+SELECT_PAGE_PATIENTS_SUIVANTE = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone, email
+    FROM patients
+    WHERE (nom, prenom, id) > (%s, %s, %s)
+    ORDER BY nom, prenom, id
+    LIMIT %s
+'''
+
+SELECT_FICHE_PATIENT = '''
+    SELECT id, nom, prenom, date_naissance, sexe, telephone,
+           adresse, email, numero_securite_sociale, date_inscription
+    FROM patients
+    WHERE id = %s
+'''
+
+enregistrer('obtenir_patient', SELECT_FICHE_PATIENT)
+
+# Les rendez-vous sont agrégés en JSON côté serveur : un seul aller-retour,
+# et chaque branche est servie par l'index (patient_id, date_rdv, heure_rdv).
+# Les rendez-vous passés comprennent ceux déplacés dans rendez_vous_archive.
+REQUETE_DOSSIER_COMPLET = '''
+    SELECT p.id, p.nom, p.prenom, p.date_naissance, p.sexe, p.telephone,
+           p.adresse, p.email, p.numero_securite_sociale, p.date_inscription,
+           COALESCE((
+               SELECT json_agg(json_build_array(r.id, r.date_rdv, r.heure_rdv, r.motif,
+                                                r.statut, r.medecin)
+                               ORDER BY r.date_rdv DESC, r.heure_rdv DESC)
+               FROM (
+                   (SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+                           u.nom || ' ' || u.prenom AS medecin
+                    FROM rendez_vous r
+                    JOIN utilisateurs u ON u.id = r.medecin_id
+                    WHERE r.patient_id = p.id AND r.date_rdv >= CURRENT_DATE)
+                   UNION ALL
+                   (SELECT * FROM (
+                        SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+                               u.nom || ' ' || u.prenom AS medecin
+                        FROM rendez_vous r
+                        JOIN utilisateurs u ON u.id = r.medecin_id
+                        WHERE r.patient_id = p.id AND r.date_rdv < CURRENT_DATE
+                        UNION ALL
+                        SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+                               u.nom || ' ' || u.prenom AS medecin
+                        FROM rendez_vous_archive r
+                        JOIN utilisateurs u ON u.id = r.medecin_id
+                        WHERE r.patient_id = p.id
+                    ) AS passes
+                    ORDER BY date_rdv DESC, heure_rdv DESC
+                    LIMIT %s)
+               ) AS r
+           ), '[]')
+    FROM patients p
+    WHERE p.id = %s
+'''
+
+# SQLite : json_group_array n'accepte pas d'ORDER BY, l'ordre vient de la sous-requête
+equivalent(REQUETE_DOSSIER_COMPLET, '''
+    SELECT p.id, p.nom, p.prenom, p.date_naissance, p.sexe, p.telephone,
+           p.adresse, p.email, p.numero_securite_sociale, p.date_inscription,
+           (SELECT json_group_array(json_array(r.id, r.date_rdv, r.heure_rdv, r.motif,
+                                               r.statut, r.medecin))
+            FROM (
+                SELECT * FROM (
+                    SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+                           u.nom || ' ' || u.prenom AS medecin
+                    FROM rendez_vous r
+                    JOIN utilisateurs u ON u.id = r.medecin_id
+                    WHERE r.patient_id = p.id AND r.date_rdv >= date('now', 'localtime'))
+                UNION ALL
+                SELECT * FROM (
+                    SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+                           u.nom || ' ' || u.prenom AS medecin
+                    FROM rendez_vous r
+                    JOIN utilisateurs u ON u.id = r.medecin_id
+                    WHERE r.patient_id = p.id AND r.date_rdv < date('now', 'localtime')
+                    UNION ALL
+                    SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+                           u.nom || ' ' || u.prenom AS medecin
+                    FROM rendez_vous_archive r
+                    JOIN utilisateurs u ON u.id = r.medecin_id
+                    WHERE r.patient_id = p.id
+                    ORDER BY date_rdv DESC, heure_rdv DESC
+                    LIMIT ?)
+                ORDER BY date_rdv DESC, heure_rdv DESC
+            ) AS r)
+    FROM patients p
+    WHERE p.id = ?
+''')
+
+
+def _dossier(ligne):
+    """
+    Sépare une ligne de REQUETE_DOSSIER_COMPLET en (patient, rendez_vous).
+    """
+    ligne = tuple(ligne)
+    patient, rdvs_json = FichePatient._make(ligne[:10]), ligne[10]
+    if isinstance(rdvs_json, str):
+        rdvs_json = json.loads(rdvs_json)
+    nom_patient = f"{patient[1]} {patient[2]}"
+    rendez_vous = [
+        LigneRendezVous(rdv_id, date.fromisoformat(date_rdv), time.fromisoformat(heure_rdv),
+                        motif, statut, nom_patient, medecin)
+        for rdv_id, date_rdv, heure_rdv, motif, statut, medecin in rdvs_json
+    ]
+    return patient, rendez_vous
+
+
+def _valider_patient(telephone, date_naissance):
+    """
+    Retourne le message d'erreur de validation, ou None si les données sont valides.
+    """
+    # Validation du téléphone
+    if not telephone or len(telephone) < 9:
+        return "Numéro de téléphone invalide"
+    
+    # Validation de la date de naissance
+    try:
+        date_obj = datetime.strptime(date_naissance, '%Y-%m-%d')
+        if date_obj > datetime.now():
+            return "La date de naissance ne peut pas être dans le futur"
+    except ValueError:
+        return "Format de date invalide (utilisez YYYY-MM-DD)"
+    return None
+
+
+def _requete_modification(patient_id, champs):
+    """
+    Construit l'UPDATE des champs autorisés ; retourne (query, valeurs) ou (None, None).
+    """
+    champs_autorises = ['nom', 'prenom', 'telephone', 'adresse', 'email', 'sexe']
+    champs_a_modifier = []
+    valeurs = []
+    
+    for champ, valeur in champs.items():
+        if champ in champs_autorises and valeur is not None:
+            if champ == 'telephone':
+                valeur = normaliser_telephone(valeur)
+            champs_a_modifier.append(f"{champ} = %s")
+            valeurs.append(valeur)
+    
+    if not champs_a_modifier:
+        return None, None
+    
+    valeurs.append(patient_id)
+    return f"UPDATE patients SET {', '.join(champs_a_modifier)} WHERE id = %s", valeurs
+
+
+@instrumenter_methodes
 class Patient:
     """
     Classe pour gérer les opérations CRUD des patients.
@@ -18,17 +207,10 @@ class Patient:
         try:
             cursor = connection.cursor()
             
-            # Validation du téléphone
-            if not telephone or len(telephone) < 9:
-                return False, "Numéro de téléphone invalide"
-            
-            # Validation de la date de naissance
-            try:
-                date_obj = datetime.strptime(date_naissance, '%Y-%m-%d')
-                if date_obj > datetime.now():
-                    return False, "La date de naissance ne peut pas être dans le futur"
-            except ValueError:
-                return False, "Format de date invalide (utilisez YYYY-MM-DD)"
+            telephone = normaliser_telephone(telephone)
+            erreur = _valider_patient(telephone, date_naissance)
+            if erreur:
+                return False, erreur
             
             cursor.execute('''
                 INSERT INTO patients (nom, prenom, date_naissance, sexe, telephone, adresse, email, numero_securite_sociale)
@@ -58,7 +240,7 @@ class Patient:
             return []
         
         try:
-            cursor = connection.cursor()
+            cursor = curseur(connection, LignePatient)
             cursor.execute('''
                 SELECT id, nom, prenom, date_naissance, sexe, telephone, email
                 FROM patients
@@ -76,23 +258,93 @@ class Patient:
             close_connection(connection)
     
     @staticmethod
-    def rechercher_patient(terme_recherche):
+    def lister_patients_page(taille_page=50, apres=None):
         """
-        Recherche un patient par nom, prénom ou téléphone.
+        Récupère une page de patients triés par (nom, prénom, id).
+        apres est la clé (nom, prenom, id) du dernier patient de la page précédente.
+        Retourne (patients, cle_suivante) ; cle_suivante vaut None sur la dernière page.
         """
         connection = get_connection()
         if not connection:
-            return []
+            return [], None
         
         try:
-            cursor = connection.cursor()
-            pattern = f"%{terme_recherche}%"
+            cursor = curseur(connection, LignePatient)
+            
+            if apres:
+                cursor.execute(SELECT_PAGE_PATIENTS_SUIVANTE, (*apres, taille_page + 1))
+            else:
+                cursor.execute(SELECT_PAGE_PATIENTS, (taille_page + 1,))
+            
+            patients = cursor.fetchall()
+            
+            # Une ligne de plus que demandé indique qu'une page suivante existe
+            if len(patients) > taille_page:
+                patients = patients[:taille_page]
+                dernier = patients[-1]
+                return patients, (dernier[1], dernier[2], dernier[0])
+            return patients, None
+            
+        except Exception as e:
+            print(f"Erreur lors de la récupération des patients : {e}")
+            return [], None
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def iterer_patients(itersize=2000, brut=False):
+        """
+        Parcourt tous les patients via un curseur serveur (nommé).
+        Seules `itersize` lignes sont chargées en mémoire à la fois.
+        brut=True produit des tuples simples (export en masse).
+        """
+        connection = get_connection()
+        if not connection:
+            return
+        
+        try:
+            cursor = curseur(connection, None if brut else LignePatient, name='iter_patients')
+            cursor.itersize = itersize
             cursor.execute('''
                 SELECT id, nom, prenom, date_naissance, sexe, telephone, email
                 FROM patients
-                WHERE nom ILIKE %s OR prenom ILIKE %s OR telephone LIKE %s
-                ORDER BY nom, prenom
-            ''', (pattern, pattern, pattern))
+                ORDER BY nom, prenom, id
+            ''')
+            
+            for patient in cursor:
+                yield patient
+            
+        except Exception as e:
+            print(f"Erreur lors de la récupération des patients : {e}")
+        finally:
+            cursor.close()
+            connection.rollback()
+            close_connection(connection)
+    
+    @staticmethod
+    def rechercher_patient(terme_recherche, limite=50):
+        """
+        Recherche un patient par nom, prénom ou téléphone.
+        Un terme composé uniquement de chiffres est traité comme un début de numéro ;
+        sinon la recherche porte sur "nom prénom" (sans accents), classée par similarité.
+        """
+        terme = terme_recherche.strip()
+        if not terme:
+            return []
+        
+        connection = get_connection()
+        if not connection:
+            return []
+        
+        try:
+            cursor = curseur(connection, LignePatient)
+            telephone = normaliser_telephone(terme)
+            
+            if telephone.isdigit():
+                cursor.execute(REQUETE_RECHERCHE_TELEPHONE, (f"{telephone}%", limite))
+            else:
+                cursor.execute(REQUETE_RECHERCHE_NOM, (terme, terme, limite))
             
             patients = cursor.fetchall()
             return patients
@@ -107,20 +359,19 @@ class Patient:
     @staticmethod
     def obtenir_patient(patient_id):
         """
-        Récupère les informations détaillées d'un patient.
+        Récupère les informations détaillées d'un patient (via le cache).
         """
+        return cache_patients.obtenir(patient_id, lambda: Patient._charger_patient(patient_id))
+    
+    @staticmethod
+    def _charger_patient(patient_id):
         connection = get_connection()
         if not connection:
             return None
         
         try:
-            cursor = connection.cursor()
-            cursor.execute('''
-                SELECT id, nom, prenom, date_naissance, sexe, telephone, 
-                       adresse, email, numero_securite_sociale, date_inscription
-                FROM patients
-                WHERE id = %s
-            ''', (patient_id,))
+            cursor = curseur(connection, FichePatient)
+            executer(cursor, 'obtenir_patient', (patient_id,))
             
             patient = cursor.fetchone()
             return patient
@@ -132,6 +383,36 @@ class Patient:
             cursor.close()
             close_connection(connection)
     
+    @staticmethod
+    def dossier_complet(patient_id, limite_passes=20):
+        """
+        Récupère en une seule requête la fiche d'un patient et ses rendez-vous :
+        tous ceux à venir et les `limite_passes` plus récents parmi les passés
+        (rendez-vous archivés compris).
+        Retourne (patient, rendez_vous) ; patient vaut None s'il n'existe pas.
+        Les rendez-vous ont le même format que RendezVous.lister_rendez_vous().
+        """
+        connection = get_connection()
+        if not connection:
+            return None, []
+        
+        try:
+            cursor = connection.cursor()
+            cursor.execute(REQUETE_DOSSIER_COMPLET, (limite_passes, patient_id))
+            
+            ligne = cursor.fetchone()
+            if not ligne:
+                return None, []
+            
+            return _dossier(ligne)
+            
+        except Exception as e:
+            print(f"Erreur lors de la récupération du dossier patient : {e}")
+            return None, []
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
     @staticmethod
     def modifier_patient(patient_id, **kwargs):
         """
@@ -146,25 +427,17 @@ class Patient:
             cursor = connection.cursor()
             
             # Construire la requête dynamiquement
-            champs_autorises = ['nom', 'prenom', 'telephone', 'adresse', 'email', 'sexe']
-            champs_a_modifier = []
-            valeurs = []
-            
-            for champ, valeur in kwargs.items():
-                if champ in champs_autorises and valeur is not None:
-                    champs_a_modifier.append(f"{champ} = %s")
-                    valeurs.append(valeur)
-            
-            if not champs_a_modifier:
+            query, valeurs = _requete_modification(patient_id, kwargs)
+            if not query:
                 return False, "Aucun champ à modifier"
             
-            valeurs.append(patient_id)
-            query = f"UPDATE patients SET {', '.join(champs_a_modifier)} WHERE id = %s"
-            
             cursor.execute(query, valeurs)
+            modifies = cursor.rowcount
+            notifier_invalidation(cursor, cache_patients.nom, patient_id)
             connection.commit()
+            cache_patients.invalider(patient_id)
             
-            if cursor.rowcount > 0:
+            if modifies > 0:
                 return True, "Patient modifié avec succès"
             else:
                 return False, "Patient non trouvé"
@@ -188,9 +461,12 @@ class Patient:
         try:
             cursor = connection.cursor()
             cursor.execute("DELETE FROM patients WHERE id = %s", (patient_id,))
+            supprimes = cursor.rowcount
+            notifier_invalidation(cursor, cache_patients.nom, patient_id)
             connection.commit()
+            cache_patients.invalider(patient_id)
             
-            if cursor.rowcount > 0:
+            if supprimes > 0:
                 return True, "Patient supprimé avec succès"
             else:
                 return False, "Patient non trouvé"
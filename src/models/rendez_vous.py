@@ -1,6 +1,270 @@
-from database.config import get_connection, close_connection
-from datetime import datetime
+from database.config import get_connection, close_connection, execute_values
+from database.preparees import enregistrer, executer
+from database.sqlite import equivalent
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+import heapq
+from models.lignes import curseur, LigneRendezVous
+from utils.metriques import instrumenter_methodes
 
+# Horaires de consultation des médecins (jours : 0 = lundi ... 6 = dimanche)
+HORAIRES_TRAVAIL = {
+    'jours': (0, 1, 2, 3, 4),
+    'plages': (('08:00', '12:00'), ('14:00', '18:00')),
+}
+
+# Durée (minutes) occupée par un rendez-vous existant dans l'agenda d'un médecin
+DUREE_RDV = 30
+
+# Fonctions appelées après chaque changement de statut validé, avec (rdv_id, statut) :
+# les agendas en mémoire s'y mettent à jour (models/agenda.py), la liste d'attente
+# réattribue les créneaux annulés (models/liste_attente.py). Un message retourné
+# par une fonction complète celui de modifier_statut. Elles sont appelées une fois
+# la connexion rendue au pool : elles peuvent en emprunter une à leur tour.
+ABONNES_STATUT = []
+
+# Codes de résultat d'une réservation
+RESERVATION_OK = 'ok'
+PATIENT_INTROUVABLE = 'patient_introuvable'
+MEDECIN_INTROUVABLE = 'medecin_introuvable'
+CRENEAU_PRIS = 'creneau_pris'
+ERREUR_CONNEXION = 'erreur_connexion'
+ERREUR = 'erreur'
+DEMANDE_INVALIDE = 'demande_invalide'
+LOT_ANNULE = 'lot_annule'
+
+MESSAGES_RESERVATION = {
+    PATIENT_INTROUVABLE: "Patient non trouvé",
+    MEDECIN_INTROUVABLE: "Médecin non trouvé",
+    CRENEAU_PRIS: "Ce créneau horaire n'est pas disponible",
+    ERREUR_CONNEXION: "Erreur de connexion",
+    ERREUR: "Erreur lors de la réservation",
+    DEMANDE_INVALIDE: "Date ou heure invalide",
+    LOT_ANNULE: "Non créé : le lot a été annulé",
+}
+
+# Réservation en un seul aller-retour : les vérifications d'existence et l'insertion
+# forment une seule instruction, et l'index unique partiel idx_rdv_creneau_actif
+# arbitre les réservations concurrentes d'un même créneau (ON CONFLICT DO NOTHING).
+REQUETE_RESERVATION = '''
+    WITH p AS (
+        SELECT id FROM patients WHERE id = %(patient_id)s
+    ), m AS (
+        SELECT id FROM utilisateurs WHERE id = %(medecin_id)s AND role = 'medecin'
+    ), nouveau AS (
+        INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, motif)
+        SELECT p.id, m.id, %(date_rdv)s, %(heure_rdv)s, %(motif)s
+        FROM p, m
+        ON CONFLICT (medecin_id, date_rdv, heure_rdv) WHERE statut <> 'annule'
+        DO NOTHING
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM p), EXISTS (SELECT 1 FROM m), (SELECT id FROM nouveau)
+'''
+
+# Types explicites : ceux des paramètres de la liste SELECT ne se déduisent pas de l'INSERT
+enregistrer('reserver', REQUETE_RESERVATION, ('integer', 'integer', 'date', 'time', 'text'))
+
+# SQLite n'accepte pas d'INSERT dans un WITH : l'insertion puis les vérifications,
+# dans la même transaction (un seul écrivain à la fois). date() et time() normalisent
+# les valeurs reçues en texte pour que l'index unique compare des valeurs identiques.
+equivalent(REQUETE_RESERVATION, '''
+    INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, motif)
+    SELECT p.id, m.id, date(:date_rdv), time(:heure_rdv), :motif
+    FROM patients p, utilisateurs m
+    WHERE p.id = :patient_id AND m.id = :medecin_id AND m.role = 'medecin'
+    ON CONFLICT DO NOTHING
+''', '''
+    SELECT EXISTS (SELECT 1 FROM patients WHERE id = :patient_id),
+           EXISTS (SELECT 1 FROM utilisateurs WHERE id = :medecin_id AND role = 'medecin'),
+           CASE WHEN changes() > 0 THEN last_insert_rowid() END
+''')
+
+
+def _reserver(cursor, patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+    """
+    Exécute la réservation et retourne (code, rdv_id) ; rdv_id vaut None en cas d'échec.
+    """
+    executer(cursor, 'reserver', {
+        'patient_id': patient_id,
+        'medecin_id': medecin_id,
+        'date_rdv': date_rdv,
+        'heure_rdv': heure_rdv,
+        'motif': motif,
+    })
+    patient_existe, medecin_existe, rdv_id = cursor.fetchone()
+    
+    if not patient_existe:
+        return PATIENT_INTROUVABLE, None
+    if not medecin_existe:
+        return MEDECIN_INTROUVABLE, None
+    if rdv_id is None:
+        return CRENEAU_PRIS, None
+    return RESERVATION_OK, rdv_id
+
+
+def _notifier_abonnes(rdv_id, statut):
+    """
+    Appelle les ABONNES_STATUT ; retourne leurs messages. L'échec d'un abonné
+    n'annule pas le changement de statut, déjà validé.
+    """
+    messages = []
+    for abonne in ABONNES_STATUT:
+        try:
+            complement = abonne(rdv_id, statut)
+        except Exception as e:
+            print(f"Erreur après le changement de statut du rendez-vous {rdv_id} : {e}")
+            continue
+        if complement:
+            messages.append(complement)
+    return messages
+
+
+def _minutes(heure):
+    if isinstance(heure, str):
+        heure = time.fromisoformat(heure)
+    return heure.hour * 60 + heure.minute
+
+
+REQUETE_OCCUPATIONS = '''
+    SELECT medecin_id, date_rdv, heure_rdv
+    FROM rendez_vous
+    WHERE medecin_id = ANY(%s) AND date_rdv BETWEEN %s AND %s
+      AND statut <> 'annule'
+    ORDER BY medecin_id, date_rdv, heure_rdv
+'''
+
+
+def _occupations(cursor, medecins, date_debut, date_fin):
+    """
+    Charge en une requête les rendez-vous actifs des médecins sur la période.
+    Retourne {(medecin_id, date): [minutes de début triées]}.
+    """
+    cursor.execute(REQUETE_OCCUPATIONS, (list(medecins), date_debut, date_fin))
+    
+    occupations = {}
+    for medecin_id, date_rdv, heure_rdv in cursor.fetchall():
+        occupations.setdefault((medecin_id, date_rdv), []).append(_minutes(heure_rdv))
+    return occupations
+
+
+def _creneaux_libres(occupations, medecin_id, date_debut, date_fin, duree):
+    """
+    Produit dans l'ordre chronologique les créneaux (date, heure) libres d'un médecin.
+    Un créneau [t, t + duree) est libre si aucun rendez-vous [d, d + DUREE_RDV)
+    ne le chevauche ; la recherche dans la liste triée des débuts se fait par bisection.
+    """
+    plages = [(_minutes(debut), _minutes(fin)) for debut, fin in HORAIRES_TRAVAIL['plages']]
+    maintenant = datetime.now()
+    jour = date_debut
+    
+    while jour <= date_fin:
+        if jour >= maintenant.date() and jour.weekday() in HORAIRES_TRAVAIL['jours']:
+            debuts = occupations.get((medecin_id, jour), [])
+            minimum = maintenant.hour * 60 + maintenant.minute if jour == maintenant.date() else -1
+            
+            for debut_plage, fin_plage in plages:
+                t = debut_plage
+                while t + duree <= fin_plage:
+                    # Premier rendez-vous qui se termine après t
+                    i = bisect_right(debuts, t - DUREE_RDV)
+                    if i < len(debuts) and debuts[i] < t + duree:
+                        # Chevauchement : on repart à la fin de ce rendez-vous
+                        t = debuts[i] + DUREE_RDV
+                        continue
+                    if t > minimum:
+                        yield jour, time(t // 60, t % 60)
+                    t += duree
+        jour += timedelta(days=1)
+
+
+SELECT_RENDEZ_VOUS = '''
+    SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
+           p.nom || ' ' || p.prenom as patient,
+           u.nom || ' ' || u.prenom as medecin
+    FROM rendez_vous r
+    JOIN patients p ON r.patient_id = p.id
+    JOIN utilisateurs u ON r.medecin_id = u.id
+'''
+
+# Mêmes colonnes pour les rendez-vous archivés (voir database/partitions.py)
+SELECT_ARCHIVES = SELECT_RENDEZ_VOUS.replace('FROM rendez_vous r', 'FROM rendez_vous_archive r')
+
+
+def _filtres_rendez_vous(medecin_id=None, patient_id=None, date_debut=None, date_fin=None, statut=None):
+    """
+    Construit la clause WHERE combinant les filtres fournis.
+    Retourne (conditions, params).
+    """
+    conditions, params = [], []
+    if medecin_id is not None:
+        conditions.append("r.medecin_id = %s")
+        params.append(medecin_id)
+    if patient_id is not None:
+        conditions.append("r.patient_id = %s")
+        params.append(patient_id)
+    if date_debut is not None:
+        conditions.append("r.date_rdv >= %s")
+        params.append(date_debut)
+    if date_fin is not None:
+        conditions.append("r.date_rdv <= %s")
+        params.append(date_fin)
+    if statut is not None:
+        conditions.append("r.statut = %s")
+        params.append(statut)
+    return conditions, params
+
+
+def _requete_liste(filtre=None, valeur=None, depuis=None, archives=False):
+    """
+    Requête de RendezVous.lister_rendez_vous ; retourne (query, params).
+    """
+    conditions, params = [], []
+    if filtre and valeur:
+        if filtre == 'medecin':
+            conditions.append("r.medecin_id = %s")
+        elif filtre == 'patient':
+            conditions.append("r.patient_id = %s")
+        elif filtre == 'date':
+            conditions.append("r.date_rdv = %s")
+        elif filtre == 'statut':
+            conditions.append("r.statut = %s")
+        if conditions:
+            params.append(valeur)
+    if depuis is not None:
+        conditions.append("r.date_rdv >= %s")
+        params.append(depuis)
+    
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    query = SELECT_RENDEZ_VOUS + where
+    if archives:
+        query += " UNION ALL " + SELECT_ARCHIVES + where
+        params = params * 2
+    
+    return query + " ORDER BY date_rdv DESC, heure_rdv DESC", params
+
+
+def _requete_recherche(medecin_id=None, patient_id=None, date_debut=None, date_fin=None,
+                       statut=None, taille_page=50, apres=None, decroissant=False):
+    """
+    Requête d'une page de RendezVous.rechercher_rendez_vous ; retourne (query, params).
+    """
+    conditions, params = _filtres_rendez_vous(medecin_id, patient_id, date_debut, date_fin, statut)
+    
+    sens = "DESC" if decroissant else "ASC"
+    if apres:
+        conditions.append(f"(r.date_rdv, r.heure_rdv, r.id) {'<' if decroissant else '>'} (%s, %s, %s)")
+        params.extend(apres)
+    
+    query = SELECT_RENDEZ_VOUS
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY r.date_rdv {sens}, r.heure_rdv {sens}, r.id {sens} LIMIT %s"
+    params.append(taille_page + 1)
+    return query, params
+
+
+@instrumenter_methodes
 class RendezVous:
     """
     Classe pour gérer les rendez-vous.
@@ -17,89 +281,279 @@ class RendezVous:
         
         try:
             cursor = connection.cursor()
+            code, rdv_id = _reserver(cursor, patient_id, medecin_id, date_rdv, heure_rdv, motif)
+            connection.commit()
             
-            # Vérifier que le patient existe
-            cursor.execute("SELECT id FROM patients WHERE id = %s", (patient_id,))
-            if not cursor.fetchone():
-                return False, "Patient non trouvé"
+            if code != RESERVATION_OK:
+                return False, MESSAGES_RESERVATION[code]
+            return True, f"Rendez-vous créé avec succès (ID: {rdv_id})"
             
-            # Vérifier que le médecin existe
-            cursor.execute("SELECT id FROM utilisateurs WHERE id = %s AND role = 'medecin'", (medecin_id,))
-            if not cursor.fetchone():
-                return False, "Médecin non trouvé"
+        except Exception as e:
+            connection.rollback()
+            return False, f"Erreur : {str(e)}"
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def reserver(patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+        """
+        Réserve un créneau et retourne un code structuré : (code, rdv_id).
+        code vaut RESERVATION_OK, PATIENT_INTROUVABLE, MEDECIN_INTROUVABLE,
+        CRENEAU_PRIS, ERREUR_CONNEXION ou ERREUR.
+        """
+        connection = get_connection()
+        if not connection:
+            return ERREUR_CONNEXION, None
+        
+        try:
+            cursor = connection.cursor()
+            resultat = _reserver(cursor, patient_id, medecin_id, date_rdv, heure_rdv, motif)
+            connection.commit()
+            return resultat
             
-            # Vérifier la disponibilité (pas de conflit d'horaire)
-            cursor.execute('''
-                SELECT id FROM rendez_vous 
-                WHERE medecin_id = %s AND date_rdv = %s AND heure_rdv = %s 
-                AND statut != 'annule'
-            ''', (medecin_id, date_rdv, heure_rdv))
+        except Exception as e:
+            print(f"Erreur lors de la réservation : {e}")
+            connection.rollback()
+            return ERREUR, None
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def creer_en_masse(creneaux, tout_ou_rien=False):
+        """
+        Crée plusieurs rendez-vous en une seule transaction.
+        creneaux : liste de tuples (patient_id, medecin_id, date_rdv, heure_rdv[, motif]).
+        Retourne un rapport par créneau (dans l'ordre reçu) : liste de dictionnaires
+        {'patient_id', 'medecin_id', 'date_rdv', 'heure_rdv', 'code', 'rdv_id'}.
+        Une date ou une heure invalide donne le code DEMANDE_INVALIDE pour ce créneau.
+        Avec tout_ou_rien=True, aucun rendez-vous n'est créé si un créneau échoue :
+        les créneaux qui auraient été créés reçoivent le code LOT_ANNULE.
+        """
+        demandes = [RendezVous._demande(*creneau) for creneau in creneaux]
+        valides = [(i, d) for i, d in enumerate(demandes) if d['code'] is None]
+        
+        if not valides:
+            return RendezVous._rapport(demandes)
+        
+        connection = get_connection()
+        if not connection:
+            for _, demande in valides:
+                demande['code'] = ERREUR_CONNEXION
+            return RendezVous._rapport(demandes)
+        
+        try:
+            cursor = connection.cursor()
             
-            if cursor.fetchone():
-                return False, "Ce créneau horaire n'est pas disponible"
+            # Vérification ensembliste de tous les créneaux en une requête
+            verifications = execute_values(cursor, '''
+                WITH v(idx, patient_id, medecin_id, date_rdv, heure_rdv) AS (VALUES %s)
+                SELECT v.idx, p.id IS NOT NULL, m.id IS NOT NULL, r.id IS NOT NULL
+                FROM v
+                LEFT JOIN patients p ON p.id = v.patient_id
+                LEFT JOIN utilisateurs m ON m.id = v.medecin_id AND m.role = 'medecin'
+                LEFT JOIN rendez_vous r
+                       ON r.medecin_id = v.medecin_id AND r.date_rdv = v.date_rdv
+                      AND r.heure_rdv = v.heure_rdv AND r.statut <> 'annule'
+            ''', [(i, d['patient_id'], d['medecin_id'], d['date_rdv'], d['heure_rdv'])
+                  for i, d in valides],
+                template='(%s, %s::int, %s::int, %s::date, %s::time)',
+                page_size=len(valides), fetch=True)
             
-            # Créer le rendez-vous
-            cursor.execute('''
-                INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, motif)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            ''', (patient_id, medecin_id, date_rdv, heure_rdv, motif))
+            vus = set()
+            for idx, patient_existe, medecin_existe, creneau_pris in sorted(verifications):
+                demande = demandes[idx]
+                cle = (demande['medecin_id'], demande['date_rdv'], demande['heure_rdv'])
+                if not patient_existe:
+                    demande['code'] = PATIENT_INTROUVABLE
+                elif not medecin_existe:
+                    demande['code'] = MEDECIN_INTROUVABLE
+                elif creneau_pris or cle in vus:
+                    # Déjà réservé en base, ou demandé deux fois dans le même lot
+                    demande['code'] = CRENEAU_PRIS
+                else:
+                    vus.add(cle)
             
-            rdv_id = cursor.fetchone()[0]
-            connection.commit()
+            a_creer = [d for d in demandes if d['code'] is None]
+            if a_creer:
+                # ON CONFLICT couvre les réservations concurrentes faites entre-temps
+                crees = execute_values(cursor, '''
+                    INSERT INTO rendez_vous (patient_id, medecin_id, date_rdv, heure_rdv, motif)
+                    VALUES %s
+                    ON CONFLICT (medecin_id, date_rdv, heure_rdv) WHERE statut <> 'annule'
+                    DO NOTHING
+                    RETURNING id, medecin_id, date_rdv, heure_rdv
+                ''', [(d['patient_id'], d['medecin_id'], d['date_rdv'], d['heure_rdv'], d['motif'])
+                      for d in a_creer],
+                    page_size=len(a_creer), fetch=True)
+                
+                ids = {(m, d, h): rdv_id for rdv_id, m, d, h in crees}
+                for demande in a_creer:
+                    rdv_id = ids.get((demande['medecin_id'], demande['date_rdv'], demande['heure_rdv']))
+                    demande['code'] = RESERVATION_OK if rdv_id else CRENEAU_PRIS
+                    demande['rdv_id'] = rdv_id
             
-            return True, f"Rendez-vous créé avec succès (ID: {rdv_id})"
+            if tout_ou_rien and any(d['code'] != RESERVATION_OK for d in demandes):
+                connection.rollback()
+                for demande in demandes:
+                    if demande['code'] == RESERVATION_OK:
+                        demande['code'] = LOT_ANNULE
+                    demande['rdv_id'] = None
+            else:
+                connection.commit()
+            
+            return RendezVous._rapport(demandes)
             
         except Exception as e:
+            print(f"Erreur lors de la création des rendez-vous : {e}")
             connection.rollback()
-            return False, f"Erreur : {str(e)}"
+            for _, demande in valides:
+                demande['code'], demande['rdv_id'] = ERREUR, None
+            return RendezVous._rapport(demandes)
         finally:
             cursor.close()
             close_connection(connection)
     
     @staticmethod
-    def lister_rendez_vous(filtre=None, valeur=None):
+    def creer_serie(patient_id, medecin_id, date_debut, heure_rdv, nombre,
+                    intervalle_jours=7, motif=None, tout_ou_rien=False):
         """
-        Liste les rendez-vous avec filtres optionnels.
-        filtre peut être : 'medecin', 'patient', 'date', 'statut'
+        Crée une série de rendez-vous récurrents (ex : suivi hebdomadaire pendant 12 semaines).
+        Retourne le même rapport par créneau que creer_en_masse().
+        """
+        if isinstance(date_debut, str):
+            try:
+                date_debut = date.fromisoformat(date_debut)
+            except ValueError:
+                return RendezVous._rapport([RendezVous._demande(patient_id, medecin_id, date_debut,
+                                                                heure_rdv, motif)
+                                            for _ in range(nombre)])
+        
+        creneaux = [
+            (patient_id, medecin_id, date_debut + timedelta(days=i * intervalle_jours), heure_rdv, motif)
+            for i in range(nombre)
+        ]
+        return RendezVous.creer_en_masse(creneaux, tout_ou_rien)
+    
+    @staticmethod
+    def _demande(patient_id, medecin_id, date_rdv, heure_rdv, motif=None):
+        """
+        Demande de creer_en_masse ; code vaut DEMANDE_INVALIDE si la date ou l'heure est invalide.
         """
+        demande = {
+            'patient_id': patient_id, 'medecin_id': medecin_id,
+            'date_rdv': date_rdv, 'heure_rdv': heure_rdv, 'motif': motif,
+            'code': None, 'rdv_id': None,
+        }
+        try:
+            if isinstance(date_rdv, str):
+                demande['date_rdv'] = date.fromisoformat(date_rdv)
+            if isinstance(heure_rdv, str):
+                demande['heure_rdv'] = time.fromisoformat(heure_rdv)
+        except ValueError:
+            demande['code'] = DEMANDE_INVALIDE
+        return demande
+    
+    @staticmethod
+    def _rapport(demandes):
+        return [
+            {cle: d[cle] for cle in ('patient_id', 'medecin_id', 'date_rdv', 'heure_rdv', 'code', 'rdv_id')}
+            for d in demandes
+        ]
+    
+    @staticmethod
+    def creneaux_disponibles(medecin_id, date_debut, date_fin, duree=DUREE_RDV):
+        """
+        Retourne les créneaux libres (date, heure) d'un médecin entre deux dates incluses,
+        calculés à partir de HORAIRES_TRAVAIL moins les rendez-vous non annulés.
+        """
+        if isinstance(date_debut, str):
+            date_debut = date.fromisoformat(date_debut)
+        if isinstance(date_fin, str):
+            date_fin = date.fromisoformat(date_fin)
+        
         connection = get_connection()
         if not connection:
             return []
         
         try:
             cursor = connection.cursor()
+            occupations = _occupations(cursor, [medecin_id], date_debut, date_fin)
+            return list(_creneaux_libres(occupations, medecin_id, date_debut, date_fin, duree))
             
-            query = '''
-                SELECT r.id, r.date_rdv, r.heure_rdv, r.motif, r.statut,
-                       p.nom || ' ' || p.prenom as patient,
-                       u.nom || ' ' || u.prenom as medecin
-                FROM rendez_vous r
-                JOIN patients p ON r.patient_id = p.id
-                JOIN utilisateurs u ON r.medecin_id = u.id
-            '''
-            
-            params = []
-            if filtre and valeur:
-                if filtre == 'medecin':
-                    query += " WHERE r.medecin_id = %s"
-                    params.append(valeur)
-                elif filtre == 'patient':
-                    query += " WHERE r.patient_id = %s"
-                    params.append(valeur)
-                elif filtre == 'date':
-                    query += " WHERE r.date_rdv = %s"
-                    params.append(valeur)
-                elif filtre == 'statut':
-                    query += " WHERE r.statut = %s"
-                    params.append(valeur)
-            
-            query += " ORDER BY r.date_rdv DESC, r.heure_rdv DESC"
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
+        except Exception as e:
+            print(f"Erreur lors du calcul des créneaux : {e}")
+            return []
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def prochains_creneaux(specialite, nombre=5, date_debut=None, horizon_jours=30, duree=DUREE_RDV):
+        """
+        Retourne les `nombre` prochains créneaux libres tous médecins de la spécialité confondus :
+        liste de (date, heure, medecin_id, nom du médecin), triée chronologiquement.
+        """
+        date_debut = date_debut or date.today()
+        if isinstance(date_debut, str):
+            date_debut = date.fromisoformat(date_debut)
+        date_fin = date_debut + timedelta(days=horizon_jours)
+        
+        connection = get_connection()
+        if not connection:
+            return []
+        
+        try:
+            cursor = connection.cursor()
+            cursor.execute('''
+                SELECT id, nom || ' ' || prenom
+                FROM utilisateurs
+                WHERE role = 'medecin' AND specialite ILIKE %s
+            ''', (specialite,))
+            medecins = dict(cursor.fetchall())
+            if not medecins:
+                return []
+            
+            occupations = _occupations(cursor, medecins, date_debut, date_fin)
+            
+            # Fusion des créneaux libres de chaque médecin (déjà triés) : seuls
+            # les `nombre` premiers créneaux sont effectivement calculés
+            flux = [
+                ((jour, heure, medecin_id) for jour, heure in
+                 _creneaux_libres(occupations, medecin_id, date_debut, date_fin, duree))
+                for medecin_id in medecins
+            ]
+            resultats = []
+            for jour, heure, medecin_id in heapq.merge(*flux):
+                resultats.append((jour, heure, medecin_id, medecins[medecin_id]))
+                if len(resultats) >= nombre:
+                    break
+            return resultats
+            
+        except Exception as e:
+            print(f"Erreur lors du calcul des créneaux : {e}")
+            return []
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def lister_rendez_vous(filtre=None, valeur=None, depuis=None, archives=False):
+        """
+        Liste les rendez-vous avec filtres optionnels.
+        filtre peut être : 'medecin', 'patient', 'date', 'statut'
+        depuis limite aux rendez-vous à partir de cette date (seules les partitions
+        concernées sont lues) ; archives=True inclut les rendez-vous archivés.
+        """
+        connection = get_connection()
+        if not connection:
+            return []
+        
+        try:
+            cursor = curseur(connection, LigneRendezVous)
+            query, params = _requete_liste(filtre, valeur, depuis, archives)
+            cursor.execute(query, params)
             
             rendez_vous = cursor.fetchall()
             return rendez_vous
@@ -111,6 +565,73 @@ class RendezVous:
             cursor.close()
             close_connection(connection)
     
+    @staticmethod
+    def rechercher_rendez_vous(medecin_id=None, patient_id=None, date_debut=None, date_fin=None,
+                               statut=None, taille_page=50, apres=None, decroissant=False):
+        """
+        Liste une page de rendez-vous en combinant les filtres fournis
+        (médecin, patient, période date_debut..date_fin incluse, statut).
+        Tri chronologique sur (date_rdv, heure_rdv, id), inversé si decroissant=True.
+        apres est la clé (date_rdv, heure_rdv, id) du dernier rendez-vous de la page précédente.
+        Retourne (rendez_vous, cle_suivante) ; cle_suivante vaut None sur la dernière page.
+        """
+        connection = get_connection()
+        if not connection:
+            return [], None
+        
+        try:
+            cursor = curseur(connection, LigneRendezVous)
+            query, params = _requete_recherche(medecin_id, patient_id, date_debut, date_fin, statut,
+                                               taille_page, apres, decroissant)
+            cursor.execute(query, params)
+            rendez_vous = cursor.fetchall()
+            
+            if len(rendez_vous) > taille_page:
+                rendez_vous = rendez_vous[:taille_page]
+                dernier = rendez_vous[-1]
+                return rendez_vous, (dernier[1], dernier[2], dernier[0])
+            return rendez_vous, None
+            
+        except Exception as e:
+            print(f"Erreur lors de la récupération des rendez-vous : {e}")
+            return [], None
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def iterer_rendez_vous(medecin_id=None, patient_id=None, date_debut=None, date_fin=None,
+                           statut=None, itersize=2000, brut=False):
+        """
+        Parcourt les rendez-vous filtrés (ordre chronologique) via un curseur serveur :
+        seules `itersize` lignes sont chargées en mémoire à la fois.
+        brut=True produit des tuples simples (export en masse).
+        """
+        connection = get_connection()
+        if not connection:
+            return
+        
+        try:
+            cursor = curseur(connection, None if brut else LigneRendezVous, name='iter_rendez_vous')
+            cursor.itersize = itersize
+            conditions, params = _filtres_rendez_vous(medecin_id, patient_id, date_debut, date_fin, statut)
+            
+            query = SELECT_RENDEZ_VOUS
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY r.date_rdv, r.heure_rdv, r.id"
+            cursor.execute(query, params)
+            
+            for rdv in cursor:
+                yield rdv
+            
+        except Exception as e:
+            print(f"Erreur lors de la récupération des rendez-vous : {e}")
+        finally:
+            cursor.close()
+            connection.rollback()
+            close_connection(connection)
+    
     @staticmethod
     def modifier_statut(rdv_id, nouveau_statut, notes=None):
         """
@@ -141,11 +662,7 @@ class RendezVous:
                 ''', (nouveau_statut, rdv_id))
             
             connection.commit()
-            
-            if cursor.rowcount > 0:
-                return True, f"Statut modifié en '{nouveau_statut}'"
-            else:
-                return False, "Rendez-vous non trouvé"
+            modifie = cursor.rowcount > 0
             
         except Exception as e:
             connection.rollback()
@@ -153,6 +670,11 @@ class RendezVous:
         finally:
             cursor.close()
             close_connection(connection)
+        
+        if not modifie:
+            return False, "Rendez-vous non trouvé"
+        messages = [f"Statut modifié en '{nouveau_statut}'"] + _notifier_abonnes(rdv_id, nouveau_statut)
+        return True, " ; ".join(messages)
     
     @staticmethod
     def supprimer_rendez_vous(rdv_id):
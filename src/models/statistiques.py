@@ -0,0 +1,190 @@
+from datetime import date, timedelta
+
+from database.config import get_connection, close_connection
+from database.sqlite import equivalent
+from models.lignes import curseur, StatJour, StatSemaine
+from utils.metriques import instrumenter_methodes
+
+
+# Les tables stats_* sont tenues à jour par les triggers de init_db.create_statistiques :
+# les requêtes ne lisent qu'un nombre de lignes proportionnel à la période demandée.
+
+REQUETE_RDV_PAR_JOUR = '''
+    SELECT s.jour, s.medecin_id, u.nom || ' ' || u.prenom AS medecin, s.statut, s.nombre
+    FROM stats_rdv_jour s
+    JOIN utilisateurs u ON u.id = s.medecin_id
+    WHERE s.jour BETWEEN %s AND %s AND s.nombre > 0
+'''
+
+REQUETE_TAUX = '''
+    SELECT
+        COALESCE(SUM(nombre), 0) AS total,
+        COALESCE(SUM(nombre) FILTER (WHERE statut = 'annule'), 0) AS annules,
+        COALESCE(SUM(nombre) FILTER (WHERE jour < CURRENT_DATE AND statut <> 'annule'), 0) AS passes,
+        COALESCE(SUM(nombre) FILTER (WHERE jour < CURRENT_DATE AND statut = 'planifie'), 0) AS absences
+    FROM stats_rdv_jour
+    WHERE jour BETWEEN %s AND %s
+'''
+
+REQUETE_NOUVEAUX_PATIENTS = '''
+    SELECT semaine, nombre
+    FROM stats_patients_semaine
+    WHERE semaine >= %s AND nombre > 0
+    ORDER BY semaine
+'''
+
+# Recalcul complet (reconstruire)
+VERROU_RECALCUL = "LOCK TABLE rendez_vous, rendez_vous_archive, patients IN SHARE MODE"
+VIDER_STATISTIQUES = "TRUNCATE stats_rdv_jour, stats_patients_semaine"
+RECALCUL_PATIENTS = '''
+    INSERT INTO stats_patients_semaine (semaine, nombre)
+    SELECT date_trunc('week', date_inscription)::date, COUNT(*)
+    FROM patients
+    GROUP BY 1
+'''
+
+# SQLite : un seul écrivain à la fois, la transaction suffit à bloquer les écritures
+equivalent(VERROU_RECALCUL)
+equivalent(VIDER_STATISTIQUES, "DELETE FROM stats_rdv_jour", "DELETE FROM stats_patients_semaine")
+equivalent(RECALCUL_PATIENTS, '''
+    INSERT INTO stats_patients_semaine (semaine, nombre)
+    SELECT date(date_inscription, '-6 days', 'weekday 1'), COUNT(*)
+    FROM patients
+    GROUP BY 1
+''')
+
+
+def _taux(nombre, total):
+    return round(100 * nombre / total, 1) if total else 0.0
+
+
+@instrumenter_methodes
+class Statistiques:
+    """
+    Statistiques pour les tableaux de bord, lues dans les tables résumées.
+    """
+    
+    @staticmethod
+    def rdv_par_jour(date_debut, date_fin=None, medecin_id=None):
+        """
+        Nombre de rendez-vous par jour, médecin et statut (StatJour) entre deux dates incluses.
+        """
+        connection = get_connection()
+        if not connection:
+            return []
+        
+        try:
+            query = REQUETE_RDV_PAR_JOUR
+            params = [date_debut, date_fin or date_debut]
+            if medecin_id is not None:
+                query += " AND s.medecin_id = %s"
+                params.append(medecin_id)
+            query += " ORDER BY s.jour, medecin, s.statut"
+            
+            cursor = curseur(connection, StatJour)
+            cursor.execute(query, params)
+            return cursor.fetchall()
+            
+        except Exception as e:
+            print(f"Erreur : {e}")
+            return []
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def taux(date_debut, date_fin=None, medecin_id=None):
+        """
+        Taux d'annulation et d'absence (en %) entre deux dates incluses.
+        Une absence est un rendez-vous passé resté « planifie » ; son taux est
+        calculé sur les rendez-vous passés non annulés.
+        """
+        connection = get_connection()
+        if not connection:
+            return None
+        
+        try:
+            query = REQUETE_TAUX
+            params = [date_debut, date_fin or date.today()]
+            if medecin_id is not None:
+                query += " AND medecin_id = %s"
+                params.append(medecin_id)
+            
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            total, annules, passes, absences = cursor.fetchone()
+            
+            return {
+                'total': total,
+                'annules': annules,
+                'absences': absences,
+                'taux_annulation': _taux(annules, total),
+                'taux_absence': _taux(absences, passes),
+            }
+            
+        except Exception as e:
+            print(f"Erreur : {e}")
+            return None
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def nouveaux_patients(nb_semaines=12):
+        """
+        Nouveaux patients par semaine (StatSemaine) sur les dernières semaines.
+        """
+        connection = get_connection()
+        if not connection:
+            return []
+        
+        try:
+            lundi = date.today() - timedelta(days=date.today().weekday())
+            cursor = curseur(connection, StatSemaine)
+            cursor.execute(REQUETE_NOUVEAUX_PATIENTS, (lundi - timedelta(weeks=nb_semaines - 1),))
+            return cursor.fetchall()
+            
+        except Exception as e:
+            print(f"Erreur : {e}")
+            return []
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
+    @staticmethod
+    def reconstruire():
+        """
+        Recalcule entièrement les tables de statistiques à partir des données,
+        archives comprises (après un import sans triggers ou pour corriger une dérive).
+        Les écritures sur rendez_vous et patients attendent la fin du recalcul.
+        """
+        connection = get_connection()
+        if not connection:
+            return False, "Erreur de connexion"
+        
+        try:
+            cursor = connection.cursor()
+            cursor.execute(VERROU_RECALCUL)
+            cursor.execute(VIDER_STATISTIQUES)
+            cursor.execute('''
+                INSERT INTO stats_rdv_jour (jour, medecin_id, statut, nombre)
+                SELECT date_rdv, medecin_id, statut, COUNT(*)
+                FROM (
+                    SELECT date_rdv, medecin_id, statut FROM rendez_vous
+                    UNION ALL
+                    SELECT date_rdv, medecin_id, statut FROM rendez_vous_archive
+                ) r
+                GROUP BY date_rdv, medecin_id, statut
+            ''')
+            lignes_rdv = cursor.rowcount
+            cursor.execute(RECALCUL_PATIENTS)
+            connection.commit()
+            
+            return True, f"Statistiques reconstruites ({lignes_rdv} lignes de rendez-vous)"
+            
+        except Exception as e:
+            connection.rollback()
+            return False, f"Erreur : {str(e)}"
+        finally:
+            cursor.close()
+            close_connection(connection)
@@ -1,5 +1,67 @@
 from database.config import get_connection, close_connection
+from database.invalidation import notifier_invalidation
+from database.preparees import enregistrer, executer
+from models.lignes import curseur, Medecin, UtilisateurConnecte
+from utils.cache import CacheLRU
+from utils.metriques import instrumenter_methodes
+from utils.securite import (
+    executeur, hacher_mot_de_passe, verifier_mot_de_passe, doit_rehacher, cle_session
+)
 
+# Liste des médecins (écran de prise de rendez-vous), invalidée à chaque ajout d'utilisateur
+cache_medecins = CacheLRU('medecins', taille_max=1, ttl=600)
+
+# Authentifications réussies récentes : évite de recalculer scrypt à chaque connexion
+cache_sessions = CacheLRU('sessions', taille_max=1000, ttl=300)
+
+REQUETE_IDENTIFIANTS = '''
+    SELECT id, nom, prenom, email, role, specialite, mot_de_passe
+    FROM utilisateurs
+    WHERE email = %s
+'''
+
+SELECT_MEDECINS = '''
+    SELECT id, nom, prenom, specialite, telephone
+    FROM utilisateurs
+    WHERE role = 'medecin'
+    ORDER BY nom, prenom
+'''
+
+# Ne remplace que la valeur lue : une modification concurrente n'est pas écrasée
+REQUETE_REHACHAGE = '''
+    UPDATE utilisateurs SET mot_de_passe = %s
+    WHERE id = %s AND mot_de_passe = %s
+'''
+
+enregistrer('authentifier', REQUETE_IDENTIFIANTS)
+enregistrer('lister_medecins', SELECT_MEDECINS)
+
+_hachage_leurre = None
+
+
+def _verifier_identifiants(ligne, mot_de_passe):
+    """
+    Vérifie le mot de passe d'une ligne de REQUETE_IDENTIFIANTS (à exécuter dans le pool de hachage).
+    Retourne (utilisateur, nouveau_hachage) ; nouveau_hachage est fourni si la valeur
+    stockée est en clair ou hachée avec d'anciens paramètres.
+    """
+    global _hachage_leurre
+    if ligne is None:
+        # Même coût que pour un compte existant : ne révèle pas si l'email est connu
+        if _hachage_leurre is None:
+            _hachage_leurre = hacher_mot_de_passe('')
+        verifier_mot_de_passe(mot_de_passe, _hachage_leurre)
+        return None, None
+    
+    stocke = ligne[6]
+    if not verifier_mot_de_passe(mot_de_passe, stocke):
+        return None, None
+    
+    nouveau_hachage = hacher_mot_de_passe(mot_de_passe) if doit_rehacher(stocke) else None
+    return UtilisateurConnecte._make(ligne[:6]), nouveau_hachage
+
+
+@instrumenter_methodes
 class Utilisateur:
     """
     Classe pour gérer l'authentification et les utilisateurs.
@@ -8,32 +70,35 @@ class Utilisateur:
     @staticmethod
     def authentifier(email, mot_de_passe):
         """
-        Authentifie un utilisateur et retourne ses informations.
+        Authentifie un utilisateur et retourne ses informations (UtilisateurConnecte).
+        Les mots de passe encore stockés en clair sont hachés lors de la connexion.
         """
+        cle = cle_session(email, mot_de_passe)
+        trouve, utilisateur = cache_sessions.get(cle)
+        if trouve:
+            return utilisateur
+        
+        ligne = Utilisateur._charger_identifiants(email)
+        utilisateur, nouveau_hachage = executeur().submit(
+            _verifier_identifiants, ligne, mot_de_passe
+        ).result()
+        
+        if utilisateur:
+            if nouveau_hachage:
+                Utilisateur._enregistrer_hachage(utilisateur.id, ligne[6], nouveau_hachage)
+            cache_sessions.set(cle, utilisateur)
+        return utilisateur
+    
+    @staticmethod
+    def _charger_identifiants(email):
         connection = get_connection()
         if not connection:
             return None
         
         try:
             cursor = connection.cursor()
-            cursor.execute('''
-                SELECT id, nom, prenom, email, role, specialite
-                FROM utilisateurs
-                WHERE email = %s AND mot_de_passe = %s
-            ''', (email, mot_de_passe))
-            
-            user = cursor.fetchone()
-            
-            if user:
-                return {
-                    'id': user[0],
-                    'nom': user[1],
-                    'prenom': user[2],
-                    'email': user[3],
-                    'role': user[4],
-                    'specialite': user[5]
-                }
-            return None
+            executer(cursor, 'authentifier', (email,))
+            return cursor.fetchone()
             
         except Exception as e:
             print(f"Erreur d'authentification : {e}")
@@ -42,23 +107,40 @@ class Utilisateur:
             cursor.close()
             close_connection(connection)
     
+    @staticmethod
+    def _enregistrer_hachage(user_id, ancienne_valeur, nouveau_hachage):
+        connection = get_connection()
+        if not connection:
+            return
+        
+        try:
+            cursor = connection.cursor()
+            cursor.execute(REQUETE_REHACHAGE, (nouveau_hachage, user_id, ancienne_valeur))
+            connection.commit()
+            
+        except Exception as e:
+            print(f"Erreur lors de la mise à jour du mot de passe : {e}")
+            connection.rollback()
+        finally:
+            cursor.close()
+            close_connection(connection)
+    
     @staticmethod
     def lister_medecins():
         """
-        Récupère la liste de tous les médecins.
+        Récupère la liste de tous les médecins (via le cache).
         """
+        return cache_medecins.obtenir('tous', Utilisateur._charger_medecins)
+    
+    @staticmethod
+    def _charger_medecins():
         connection = get_connection()
         if not connection:
             return []
         
         try:
-            cursor = connection.cursor()
-            cursor.execute('''
-                SELECT id, nom, prenom, specialite, telephone
-                FROM utilisateurs
-                WHERE role = 'medecin'
-                ORDER BY nom, prenom
-            ''')
+            cursor = curseur(connection, Medecin)
+            executer(cursor, 'lister_medecins')
             
             medecins = cursor.fetchall()
             return medecins
@@ -74,7 +156,10 @@ class Utilisateur:
     def ajouter_utilisateur(nom, prenom, email, mot_de_passe, role, specialite=None, telephone=None):
         """
         Ajoute un nouvel utilisateur (médecin ou secrétaire).
+        Le mot de passe est stocké haché.
         """
+        hachage = executeur().submit(hacher_mot_de_passe, mot_de_passe).result()
+        
         connection = get_connection()
         if not connection:
             return False, "Erreur de connexion"
@@ -95,10 +180,12 @@ class Utilisateur:
                 INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite, telephone)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
                 RETURNING id
-            ''', (nom, prenom, email, mot_de_passe, role, specialite, telephone))
+            ''', (nom, prenom, email, hachage, role, specialite, telephone))
             
             user_id = cursor.fetchone()[0]
+            notifier_invalidation(cursor, cache_medecins.nom)
             connection.commit()
+            cache_medecins.vider()
             
             return True, f"Utilisateur créé avec succès (ID: {user_id})"
             
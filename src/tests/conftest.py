@@ -0,0 +1,78 @@
+"""
+Fixtures communes : chaque test travaille sur une base SQLite temporaire,
+sans serveur PostgreSQL.
+
+Usage : python -m pytest -q tests (depuis src/)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import config
+from database.config import get_connection, close_connection, fermer_pool
+from utils.cache import CACHES
+
+
+def _vider_caches():
+    for cache in CACHES.values():
+        cache.vider()
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """
+    Base SQLite temporaire servant de base de l'application (pool des modèles).
+    """
+    fermer_pool()
+    monkeypatch.setattr(config, 'MOTEUR', 'sqlite')
+    monkeypatch.setitem(config.SQLITE_CONFIG, 'chemin', str(tmp_path / 'clinique.sqlite3'))
+    _vider_caches()
+    yield tmp_path
+    fermer_pool()
+    _vider_caches()
+
+
+def executer_sql(requete, params=()):
+    """
+    Exécute une requête sur la base de l'application ; retourne ses lignes (ou None).
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(requete, params)
+        lignes = cursor.fetchall() if cursor.description else None
+        connection.commit()
+        return lignes
+    finally:
+        cursor.close()
+        close_connection(connection)
+
+
+@pytest.fixture
+def sql(base):
+    return executer_sql
+
+
+@pytest.fixture
+def medecin(sql):
+    sql('''
+        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite)
+        VALUES ('Test', 'Medecin', 'test.medecin@clinique.sn', '-', 'medecin', 'Cardiologie')
+    ''')
+    return sql("SELECT id FROM utilisateurs WHERE email = 'test.medecin@clinique.sn'")[0][0]
+
+
+@pytest.fixture
+def patients(sql):
+    """
+    Vingt patients de test ; retourne leurs identifiants.
+    """
+    for i in range(20):
+        sql('''
+            INSERT INTO patients (nom, prenom, date_naissance, telephone)
+            VALUES ('Test', %s, '1990-01-01', %s)
+        ''', (f'Patient {i}', f'77{i:07d}'))
+    return [ligne[0] for ligne in sql("SELECT id FROM patients ORDER BY id")]
@@ -0,0 +1,50 @@
+import csv
+
+from database.import_patients import importer_patients, lire_lignes, valider_ligne
+
+ENTETE = b'nom,prenom,date_naissance,telephone\n'
+VALIDE = b'Diop,Awa,1990-01-01,771234567\n'
+
+
+def test_lignes_csv_illisibles_rejetees_une_a_une(tmp_path):
+    chemin = tmp_path / 'patients.csv'
+    chemin.write_bytes(ENTETE
+                       + b'Diop,"' + b'x' * (csv.field_size_limit() + 1) + b'",1990-01-01,771234567\n'
+                       + VALIDE
+                       + b'Ndiaye,Fatou\xe9,1990-01-01,771234567\n'
+                       + VALIDE)
+
+    lignes = list(lire_lignes(str(chemin)))
+
+    assert [erreur is None for _, erreur in lignes] == [False, True, False, True]
+    assert lignes[0][1].startswith('CSV invalide')
+    assert lignes[2] == ('Ndiaye,Fatou�,1990-01-01,771234567', 'Encodage invalide (UTF-8 attendu)')
+    assert lignes[3][0] == {'nom': 'Diop', 'prenom': 'Awa', 'date_naissance': '1990-01-01',
+                            'telephone': '771234567'}
+
+
+def test_caractere_nul_rejete():
+    valeurs, erreur = valider_ligne({'nom': 'Di\x00op', 'prenom': 'Awa',
+                                     'date_naissance': '1990-01-01', 'telephone': '771234567'})
+    assert valeurs is None
+    assert erreur == "Caractère nul interdit : nom"
+
+
+def test_fichier_de_rejets(base, tmp_path):
+    chemin = tmp_path / 'patients.csv'
+    chemin.write_bytes(ENTETE
+                       + b'Diop,"' + b'x' * (csv.field_size_limit() + 1) + b'",1990-01-01,771234567\n'
+                       + b'Ndiaye,Fatou\xe9,1990-01-01,771234567\n'
+                       + b'Fall,Mo\x00du,1990-01-01,771234567\n')
+    rejets = tmp_path / 'rejets.csv'
+
+    succes, message = importer_patients(str(chemin), str(rejets))
+
+    assert succes, message
+    assert '0 patient(s) importé(s)' in message and '3 rejeté(s)' in message
+    with open(rejets, newline='', encoding='utf-8') as fichier:
+        lignes = list(csv.DictReader(fichier))
+    assert [(ligne['ligne'], ligne['erreur'].split(' :')[0]) for ligne in lignes] == [
+        ('1', 'CSV invalide'), ('2', 'Encodage invalide (UTF-8 attendu)'),
+        ('3', 'Caractère nul interdit'),
+    ]
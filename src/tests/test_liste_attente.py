@@ -0,0 +1,74 @@
+from datetime import date, time as heure
+
+from models.agenda import Agenda
+from models.liste_attente import ListeAttente
+from models.rendez_vous import RendezVous, RESERVATION_OK
+
+JOUR = date(2099, 1, 5)
+CRENEAUX = [heure(8 + i // 2, 30 * (i % 2)) for i in range(8)] + \
+           [heure(14 + i // 2, 30 * (i % 2)) for i in range(8)]
+
+
+def remplir_journee(medecin, patients):
+    """
+    Réserve tous les créneaux de JOUR ; retourne {heure: rdv_id}.
+    """
+    rapport = RendezVous.creer_en_masse([(patients[i], medecin, JOUR, h) for i, h in enumerate(CRENEAUX)])
+    assert {ligne['code'] for ligne in rapport} == {RESERVATION_OK}
+    return {ligne['heure_rdv']: ligne['rdv_id'] for ligne in rapport}
+
+
+def test_annulation_reattribuee_au_meilleur_candidat(sql, medecin, patients):
+    rendez_vous = remplir_journee(medecin, patients)
+    agenda = Agenda.du_jour(medecin, JOUR)
+    assert agenda.resume()['planifie'] == len(CRENEAUX)
+
+    ListeAttente.inscrire(patients[16], JOUR, JOUR, medecin_id=medecin)
+    ListeAttente.inscrire(patients[17], JOUR, JOUR, specialite='cardiologie', priorite=2)
+    ListeAttente.inscrire(patients[18], JOUR, JOUR, medecin_id=medecin, priorite=1)
+
+    annule = rendez_vous[heure(9, 0)]
+    succes, message = RendezVous.modifier_statut(annule, 'annule')
+    assert succes and "liste d'attente" in message
+
+    # La plus haute priorité (inscription par spécialité) obtient le créneau
+    nouveau = sql('''
+        SELECT id, patient_id FROM rendez_vous
+        WHERE medecin_id = %s AND date_rdv = %s AND heure_rdv = %s AND statut = 'planifie'
+    ''', (medecin, JOUR, heure(9, 0)))
+    assert len(nouveau) == 1
+    nouveau_id, patient_id = nouveau[0]
+    assert patient_id == patients[17]
+    assert sql("SELECT statut, rdv_id FROM liste_attente WHERE patient_id = %s",
+               (patients[17],)) == [('servi', nouveau_id)]
+
+    # L'agenda en cache montre le créneau repris, sans rechargement
+    agenda = Agenda.du_jour(medecin, JOUR)
+    resume = agenda.resume()
+    assert (resume['planifie'], resume['annule']) == (len(CRENEAUX), 1)
+    assert any(rdv.id == nouveau_id and rdv.patient_id == patients[17] for rdv in agenda.rendez_vous(JOUR))
+
+    # Annulations suivantes : les autres inscrits, par priorité, puis plus personne
+    RendezVous.modifier_statut(rendez_vous[heure(10, 0)], 'annule')
+    RendezVous.modifier_statut(rendez_vous[heure(11, 0)], 'annule')
+    succes, message = RendezVous.modifier_statut(rendez_vous[heure(15, 0)], 'annule')
+    assert succes and "liste d'attente" not in message
+    servis = sql('''
+        SELECT a.patient_id, r.heure_rdv FROM liste_attente a
+        JOIN rendez_vous r ON r.id = a.rdv_id
+        WHERE a.statut = 'servi' ORDER BY r.heure_rdv
+    ''')
+    assert servis == [(patients[17], heure(9, 0)), (patients[18], heure(10, 0)),
+                      (patients[16], heure(11, 0))]
+
+
+def test_inscription_hors_periode_non_servie(sql, medecin, patients):
+    rendez_vous = remplir_journee(medecin, patients)
+    ListeAttente.inscrire(patients[16], date(2099, 1, 6), date(2099, 1, 9), medecin_id=medecin)
+
+    succes, message = RendezVous.modifier_statut(rendez_vous[heure(9, 0)], 'annule')
+    assert succes and "liste d'attente" not in message
+    assert sql("SELECT statut FROM liste_attente") == [('en_attente',)]
+    assert sql('''
+        SELECT COUNT(*) FROM rendez_vous WHERE heure_rdv = %s AND statut <> 'annule'
+    ''', (heure(9, 0),)) == [(0,)]
@@ -0,0 +1,103 @@
+import random
+import threading
+from collections import Counter
+from datetime import date, time as heure
+
+from models.rendez_vous import (
+    RendezVous, RESERVATION_OK, CRENEAU_PRIS, PATIENT_INTROUVABLE, MEDECIN_INTROUVABLE,
+    DEMANDE_INVALIDE, LOT_ANNULE
+)
+
+JOUR = date(2099, 1, 5)
+CRENEAUX = [(JOUR, heure(8 + i // 2, 30 * (i % 2))) for i in range(16)]
+
+
+def test_reservations_concurrentes_sans_double(sql, medecin, patients):
+    codes = Counter()
+    verrou = threading.Lock()
+    depart = threading.Barrier(8)
+
+    def secretaire(numero):
+        ordre = CRENEAUX[:]
+        random.Random(numero).shuffle(ordre)
+        depart.wait()
+        for jour, h in ordre:
+            code, _ = RendezVous.reserver(patients[numero], medecin, jour, h)
+            with verrou:
+                codes[code] += 1
+
+    threads = [threading.Thread(target=secretaire, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert codes == {RESERVATION_OK: len(CRENEAUX), CRENEAU_PRIS: 7 * len(CRENEAUX)}
+    actifs = sql('''
+        SELECT date_rdv, heure_rdv, COUNT(*) FROM rendez_vous
+        WHERE medecin_id = %s AND statut <> 'annule'
+        GROUP BY date_rdv, heure_rdv
+    ''', (medecin,))
+    assert sorted((jour, h) for jour, h, _ in actifs) == CRENEAUX
+    assert {nombre for _, _, nombre in actifs} == {1}
+
+
+def test_reserver_creneau_annule_redevient_libre(medecin, patients):
+    code, rdv_id = RendezVous.reserver(patients[0], medecin, *CRENEAUX[0])
+    assert code == RESERVATION_OK
+    assert RendezVous.reserver(patients[1], medecin, *CRENEAUX[0]) == (CRENEAU_PRIS, None)
+
+    RendezVous.modifier_statut(rdv_id, 'annule')
+    code, _ = RendezVous.reserver(patients[1], medecin, *CRENEAUX[0])
+    assert code == RESERVATION_OK
+
+
+def test_creer_en_masse_codes(sql, medecin, patients):
+    RendezVous.reserver(patients[0], medecin, *CRENEAUX[0])
+
+    rapport = RendezVous.creer_en_masse([
+        (patients[1], medecin, *CRENEAUX[1]),
+        (patients[2], medecin, *CRENEAUX[1]),           # même créneau dans le lot
+        (patients[3], medecin, *CRENEAUX[0]),           # déjà réservé en base
+        (999_999, medecin, *CRENEAUX[2]),
+        (patients[4], 999_999, *CRENEAUX[3]),
+        (patients[5], medecin, '2099-02-30', '09:00'),
+        (patients[6], medecin, '2099-01-05', '25:00'),
+        (patients[7], medecin, '2099-01-05', '08:00'),  # réservé en base, date et heure en texte
+        (patients[8], medecin, '2099-01-05', '12:00'),
+    ])
+
+    assert [ligne['code'] for ligne in rapport] == [
+        RESERVATION_OK, CRENEAU_PRIS, CRENEAU_PRIS, PATIENT_INTROUVABLE, MEDECIN_INTROUVABLE,
+        DEMANDE_INVALIDE, DEMANDE_INVALIDE, CRENEAU_PRIS, RESERVATION_OK,
+    ]
+    crees = {ligne['rdv_id'] for ligne in rapport if ligne['code'] == RESERVATION_OK}
+    assert None not in crees
+    assert all(ligne['rdv_id'] is None for ligne in rapport if ligne['code'] != RESERVATION_OK)
+    assert sql("SELECT COUNT(*) FROM rendez_vous")[0][0] == 3
+
+
+def test_creer_en_masse_un_creneau_libere_par_une_ligne_refusee(medecin, patients):
+    # Une ligne refusée ne réserve pas le créneau pour la suite du lot
+    rapport = RendezVous.creer_en_masse([
+        (999_999, medecin, *CRENEAUX[0]),
+        (patients[0], medecin, *CRENEAUX[0]),
+    ])
+    assert [ligne['code'] for ligne in rapport] == [PATIENT_INTROUVABLE, RESERVATION_OK]
+
+
+def test_creer_en_masse_tout_ou_rien(sql, medecin, patients):
+    rapport = RendezVous.creer_en_masse([
+        (patients[0], medecin, *CRENEAUX[0]),
+        (999_999, medecin, *CRENEAUX[1]),
+    ], tout_ou_rien=True)
+
+    assert [(ligne['code'], ligne['rdv_id']) for ligne in rapport] == [
+        (LOT_ANNULE, None), (PATIENT_INTROUVABLE, None),
+    ]
+    assert sql("SELECT COUNT(*) FROM rendez_vous")[0][0] == 0
+
+
+def test_creer_serie_date_invalide(medecin, patients):
+    rapport = RendezVous.creer_serie(patients[0], medecin, '2099-13-01', '09:00', 3)
+    assert [ligne['code'] for ligne in rapport] == [DEMANDE_INVALIDE] * 3
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import config
+from database.sqlite import ouvrir, creer_schema
+from database.synchro import (
+    SELECT_SYNCHRO, TABLES_SYNCHRO, preparer_sqlite, initialiser, pousser, tirer
+)
+
+EMAIL_MEDECIN = 'test.synchro@clinique.sn'
+NB_CRENEAUX = 12
+CREATION = datetime(2099, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def bases(tmp_path, monkeypatch):
+    """
+    Une base centrale et les répliques de deux sites, toutes en SQLite.
+    """
+    monkeypatch.setattr(config, 'MOTEUR', 'sqlite')
+    ouvertes = []
+
+    def ouvrir_base(nom):
+        connection = ouvrir(str(tmp_path / f'{nom}.sqlite3'))
+        creer_schema(connection)
+        preparer_sqlite(connection)
+        ouvertes.append(connection)
+        return connection
+
+    centrale = ouvrir_base('centrale')
+    centrale.execute('''
+        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, specialite)
+        VALUES ('Test', 'Synchro', ?, '-', 'medecin', 'Test')
+    ''', (EMAIL_MEDECIN,))
+    centrale.commit()
+
+    repliques = {}
+    for site in ('site-a', 'site-b'):
+        repliques[site] = ouvrir_base(site)
+        initialiser(repliques[site], centrale)
+    yield centrale, repliques
+    for connection in ouvertes:
+        connection.close()
+
+
+def travailler_hors_ligne(replique, site, decalage):
+    """
+    Un patient et NB_CRENEAUX rendez-vous ; les créneaux à partir de `decalage`
+    recouvrent ceux de l'autre site. Les rendez-vous de site-a sont créés plus tôt.
+    """
+    cursor = replique.cursor()
+    cursor.execute('''
+        INSERT INTO patients (uid, nom, prenom, date_naissance, telephone)
+        VALUES (%s, 'Test', %s, '1990-01-01', '770000000')
+    ''', (f'patient-{site}', site))
+    cursor.execute("SELECT id FROM patients WHERE uid = %s", (f'patient-{site}',))
+    patient_id = cursor.fetchone()[0]
+    cursor.execute("SELECT id FROM utilisateurs WHERE email = %s", (EMAIL_MEDECIN,))
+    medecin_id = cursor.fetchone()[0]
+    retard = timedelta(minutes=0 if site == 'site-a' else 5)
+    for i in range(NB_CRENEAUX):
+        n = i + decalage
+        cursor.execute('''
+            INSERT INTO rendez_vous (uid, patient_id, medecin_id, date_rdv, heure_rdv, date_creation)
+            VALUES (%s, %s, %s, '2099-01-05', %s, %s)
+        ''', (f'{site}-{i:02d}', patient_id, medecin_id, f'{8 + n // 2:02d}:{30 * (n % 2):02d}:00',
+              CREATION + retard + timedelta(seconds=i)))
+    replique.commit()
+    cursor.close()
+
+
+def etat(connection):
+    cursor = connection.cursor()
+    contenu = {}
+    for table, _ in TABLES_SYNCHRO:
+        cursor.execute(SELECT_SYNCHRO[table])
+        contenu[table] = sorted(map(tuple, cursor.fetchall()))
+    cursor.close()
+    return contenu
+
+
+def actifs(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT heure_rdv, uid FROM rendez_vous WHERE statut <> 'annule' ORDER BY heure_rdv")
+    lignes = [tuple(ligne) for ligne in cursor.fetchall()]
+    cursor.close()
+    return lignes
+
+
+@pytest.mark.parametrize('ordre', [('site-a', 'site-b', 'site-a'), ('site-b', 'site-a', 'site-b')])
+def test_convergence_quel_que_soit_l_ordre(bases, ordre):
+    centrale, repliques = bases
+    decalage = NB_CRENEAUX // 2
+    travailler_hors_ligne(repliques['site-a'], 'site-a', 0)
+    travailler_hors_ligne(repliques['site-b'], 'site-b', decalage)
+
+    conflits = 0
+    for site in ordre:
+        conflits += pousser(repliques[site], centrale, site)[1]
+        conflits += tirer(repliques[site], centrale, site)[1]
+
+    attendu = etat(centrale)
+    for site, replique in repliques.items():
+        assert etat(replique) == attendu, site
+    assert conflits > 0
+
+    # Créneaux communs : le rendez-vous créé le premier (site-a) garde le créneau
+    gagnants = actifs(centrale)
+    assert len(gagnants) == len({h for h, _ in gagnants}) == NB_CRENEAUX + decalage
+    assert [uid for _, uid in gagnants] == (
+        [f'site-a-{i:02d}' for i in range(NB_CRENEAUX)]
+        + [f'site-b-{i:02d}' for i in range(NB_CRENEAUX - decalage, NB_CRENEAUX)])
+    cursor = centrale.cursor()
+    cursor.execute("SELECT notes FROM rendez_vous WHERE uid = 'site-b-00'")
+    assert 'site-a-06' in cursor.fetchone()[0]
+    cursor.close()
+
+
+def test_seules_les_lignes_modifiees_circulent(bases):
+    centrale, repliques = bases
+    travailler_hors_ligne(repliques['site-a'], 'site-a', 0)
+    assert pousser(repliques['site-a'], centrale, 'site-a') == (1 + NB_CRENEAUX, 0)
+    assert tirer(repliques['site-b'], centrale, 'site-b') == (1 + NB_CRENEAUX, 0)
+
+    repliques['site-a'].execute("UPDATE patients SET adresse = 'Dakar' WHERE uid = 'patient-site-a'")
+    repliques['site-a'].commit()
+    assert pousser(repliques['site-a'], centrale, 'site-a') == (1, 0)
+    assert tirer(repliques['site-a'], centrale, 'site-a') == (0, 0)
+    assert tirer(repliques['site-b'], centrale, 'site-b') == (1, 0)
+    assert etat(repliques['site-b']) == etat(centrale)
+
+
+def test_parent_absent_conserve_le_journal(bases):
+    centrale, repliques = bases
+    replique = repliques['site-a']
+    # Médecin créé sur le site : inconnu de la base centrale
+    replique.execute('''
+        INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role)
+        VALUES ('Local', 'Medecin', 'local@clinique.sn', '-', 'medecin')
+    ''')
+    replique.execute('''
+        INSERT INTO patients (uid, nom, prenom, date_naissance, telephone)
+        VALUES ('patient-local', 'Test', 'Local', '1990-01-01', '770000000')
+    ''')
+    replique.execute('''
+        INSERT INTO rendez_vous (uid, patient_id, medecin_id, date_rdv, heure_rdv)
+        SELECT 'rdv-local', p.id, u.id, '2099-01-05', '09:00:00'
+        FROM patients p, utilisateurs u
+        WHERE p.uid = 'patient-local' AND u.email = 'local@clinique.sn'
+    ''')
+    replique.commit()
+
+    with pytest.raises(ValueError, match='rdv-local'):
+        pousser(replique, centrale, 'site-a')
+
+    journal = replique.execute("SELECT table_nom, cle FROM journal_synchro WHERE origine IS NULL").fetchall()
+    assert ('rendez_vous', 'rdv-local') in journal
+    assert centrale.execute("SELECT COUNT(*) FROM patients").fetchone()[0] == 0
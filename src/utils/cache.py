@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Tous les caches créés, par nom (pour l'invalidation à distance et le suivi)
+CACHES = {}
+
+
+class CacheLRU:
+    """
+    Cache en mémoire avec durée de vie (TTL) et éviction LRU, partageable entre threads.
+    """
+
+    def __init__(self, nom, taille_max=1000, ttl=300):
+        self.nom = nom
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._entrees = OrderedDict()
+        self._lock = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+        self.evictions = 0
+        CACHES[nom] = self
+
+    def get(self, cle):
+        """
+        Retourne (trouve, valeur) ; une entrée expirée compte comme absente.
+        """
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                expiration, valeur = entree
+                if expiration > time.monotonic():
+                    self._entrees.move_to_end(cle)
+                    self.succes += 1
+                    return True, valeur
+                del self._entrees[cle]
+            self.echecs += 1
+            return False, None
+
+    def set(self, cle, valeur):
+        with self._lock:
+            self._entrees[cle] = (time.monotonic() + self.ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    def obtenir(self, cle, charger):
+        """
+        Lecture à travers le cache : appelle charger() en cas d'absence.
+        Les résultats vides (None, liste vide) ne sont pas mis en cache.
+        """
+        trouve, valeur = self.get(cle)
+        if trouve:
+            return valeur
+        valeur = charger()
+        if valeur:
+            self.set(cle, valeur)
+        return valeur
+
+    def valeurs(self):
+        """
+        Valeurs des entrées non expirées (sans les compter comme des lectures).
+        """
+        with self._lock:
+            maintenant = time.monotonic()
+            return [valeur for expiration, valeur in self._entrees.values() if expiration > maintenant]
+
+    def invalider(self, cle):
+        with self._lock:
+            self._entrees.pop(cle, None)
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+
+    def statistiques(self):
+        """
+        Compteurs de suivi du cache.
+        """
+        with self._lock:
+            total = self.succes + self.echecs
+            return {
+                'taille': len(self._entrees),
+                'taille_max': self.taille_max,
+                'succes': self.succes,
+                'echecs': self.echecs,
+                'evictions': self.evictions,
+                'taux_succes': self.succes / total if total else 0.0,
+            }
+
+
+def statistiques_caches():
+    """
+    Retourne les compteurs de tous les caches, par nom.
+    """
+    return {nom: cache.statistiques() for nom, cache in CACHES.items()}
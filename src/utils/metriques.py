@@ -0,0 +1,328 @@
+"""
+Instrumentation des méthodes des modèles et des requêtes SQL.
+
+Désactivée par défaut : chaque appel ne coûte alors qu'un test de drapeau.
+Une fois activée (activer()), on mesure :
+  - par méthode de modèle : histogramme des durées, nombre d'appels, lignes lues,
+    erreurs (y compris celles que les modèles affichent puis ignorent) ;
+  - l'attente d'une connexion du pool ;
+  - les requêtes plus lentes que le seuil, écrites dans le journal des requêtes lentes
+    (texte SQL seulement : les paramètres contiennent des données patients).
+Les mesures sont exposées au format texte Prometheus (texte_prometheus, ou
+demarrer_serveur pour un point d'accès HTTP /metrics) ou résumées par rapport().
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.cache import statistiques_caches
+
+# Bornes des histogrammes, en secondes
+BORNES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HORS_MODELE = 'hors_modele'
+
+journal_lentes = logging.getLogger('clinique.requetes_lentes')
+
+
+class _Etat:
+    actif = False
+    seuil_lent = 0.2    # secondes
+
+
+etat = _Etat()
+_contexte = threading.local()
+_lock = threading.Lock()
+
+
+class Mesure:
+    """
+    Compteurs et histogramme des durées d'une méthode (ou de l'emprunt de connexion).
+    """
+    __slots__ = ('appels', 'erreurs', 'lignes', 'somme', 'compteurs')
+
+    def __init__(self):
+        self.appels = 0
+        self.erreurs = 0
+        self.lignes = 0
+        self.somme = 0.0
+        self.compteurs = [0] * (len(BORNES) + 1)
+
+    def ajouter(self, duree, erreur=False):
+        self.appels += 1
+        self.erreurs += erreur
+        self.somme += duree
+        self.compteurs[bisect_left(BORNES, duree)] += 1
+
+    def copie(self):
+        mesure = Mesure()
+        mesure.appels, mesure.erreurs, mesure.lignes = self.appels, self.erreurs, self.lignes
+        mesure.somme, mesure.compteurs = self.somme, list(self.compteurs)
+        return mesure
+
+
+METHODES = {}
+EMPRUNTS = Mesure()
+
+
+def _mesure(nom):
+    mesure = METHODES.get(nom)
+    if mesure is None:
+        mesure = METHODES.setdefault(nom, Mesure())
+    return mesure
+
+
+def methode_courante():
+    """
+    Nom de la méthode de modèle en cours dans ce thread (HORS_MODELE sinon).
+    """
+    return getattr(_contexte, 'methode', HORS_MODELE)
+
+
+def _entrer(nom):
+    precedent = (methode_courante(), getattr(_contexte, 'erreurs', 0))
+    _contexte.methode = nom
+    _contexte.erreurs = 0
+    return precedent
+
+
+def _sortir(precedent):
+    """
+    Restaure le contexte du thread ; vrai si une requête a échoué entre-temps
+    (erreur comptée même si la méthode l'affiche puis l'ignore).
+    """
+    erreur = _contexte.erreurs > 0
+    _contexte.methode, _contexte.erreurs = precedent
+    return erreur
+
+
+def _appeler(nom, fonction, args, kwargs):
+    precedent = _entrer(nom)
+    debut = time.perf_counter()
+    erreur = False
+    try:
+        return fonction(*args, **kwargs)
+    except Exception:
+        erreur = True
+        raise
+    finally:
+        duree = time.perf_counter() - debut
+        erreur = _sortir(precedent) or erreur
+        with _lock:
+            _mesure(nom).ajouter(duree, erreur)
+
+
+def _iterer(nom, elements):
+    duree, erreur = 0.0, False
+    try:
+        while True:
+            precedent = _entrer(nom)
+            debut = time.perf_counter()
+            try:
+                element = next(elements)
+            except StopIteration:
+                return
+            except Exception:
+                erreur = True
+                raise
+            finally:
+                duree += time.perf_counter() - debut
+                erreur = _sortir(precedent) or erreur
+            yield element
+    finally:
+        elements.close()
+        with _lock:
+            _mesure(nom).ajouter(duree, erreur)
+
+
+def instrumenter(fonction, nom=None):
+    """
+    Décorateur : mesure chaque appel de `fonction` sous le nom `nom`
+    (par défaut Classe.methode). Pour un générateur, un appel correspond au
+    parcours complet et seul le temps passé à produire les éléments est compté.
+    """
+    nom = nom or fonction.__qualname__
+
+    if inspect.isgeneratorfunction(fonction):
+        @functools.wraps(fonction)
+        def generateur(*args, **kwargs):
+            if not etat.actif:
+                return fonction(*args, **kwargs)
+            return _iterer(nom, fonction(*args, **kwargs))
+        return generateur
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        if not etat.actif:
+            return fonction(*args, **kwargs)
+        return _appeler(nom, fonction, args, kwargs)
+    return enveloppe
+
+
+def instrumenter_methodes(classe):
+    """
+    Décorateur de classe : instrumente toutes les méthodes statiques publiques.
+    """
+    for nom, attribut in list(vars(classe).items()):
+        if isinstance(attribut, staticmethod) and not nom.startswith('_'):
+            fonction = instrumenter(attribut.__func__, f"{classe.__name__}.{nom}")
+            setattr(classe, nom, staticmethod(fonction))
+    return classe
+
+
+def enregistrer_requete(requete, duree, lignes, erreur=None):
+    """
+    Comptabilise une requête exécutée pour la méthode courante
+    et l'écrit dans le journal si elle est lente ou en erreur.
+    """
+    methode = methode_courante()
+    with _lock:
+        mesure = _mesure(methode)
+        if lignes > 0:
+            mesure.lignes += lignes
+        if erreur is not None:
+            if methode == HORS_MODELE:
+                mesure.erreurs += 1
+            else:
+                _contexte.erreurs += 1
+
+    if erreur is not None or duree >= etat.seuil_lent:
+        texte = ' '.join(str(requete).split())[:500]
+        if erreur is not None:
+            journal_lentes.warning("%s | %.1f ms | erreur %s | %s",
+                                   methode, duree * 1000, type(erreur).__name__, texte)
+        else:
+            journal_lentes.warning("%s | %.1f ms | %d ligne(s) | %s",
+                                   methode, duree * 1000, lignes, texte)
+
+
+def enregistrer_emprunt(duree, erreur=False):
+    with _lock:
+        EMPRUNTS.ajouter(duree, erreur)
+
+
+def activer(seuil_lent_ms=200, journal=None, port=None):
+    """
+    Active l'instrumentation. `journal` : fichier du journal des requêtes lentes
+    (sinon sortie d'erreur) ; `port` : démarre le point d'accès HTTP /metrics.
+    """
+    etat.seuil_lent = seuil_lent_ms / 1000
+    if not journal_lentes.handlers:
+        gestionnaire = logging.FileHandler(journal, encoding='utf-8') if journal else logging.StreamHandler()
+        gestionnaire.setFormatter(logging.Formatter('%(asctime)s | %(message)s'))
+        journal_lentes.addHandler(gestionnaire)
+        journal_lentes.propagate = False
+    etat.actif = True
+    if port:
+        demarrer_serveur(port)
+
+
+def desactiver():
+    etat.actif = False
+
+
+def reinitialiser():
+    """
+    Remet toutes les mesures à zéro.
+    """
+    global EMPRUNTS
+    with _lock:
+        METHODES.clear()
+        EMPRUNTS = Mesure()
+
+
+def _histogramme(lignes, metrique, etiquettes, mesure):
+    cumul = 0
+    for borne, compteur in zip(BORNES + (float('inf'),), mesure.compteurs):
+        cumul += compteur
+        le = '+Inf' if borne == float('inf') else repr(borne)
+        lignes.append(f'{metrique}_bucket{{{etiquettes}le="{le}"}} {cumul}')
+    suffixe = f'{{{etiquettes.rstrip(",")}}}' if etiquettes else ''
+    lignes.append(f'{metrique}_sum{suffixe} {mesure.somme}')
+    lignes.append(f'{metrique}_count{suffixe} {mesure.appels}')
+
+
+def texte_prometheus():
+    """
+    Retourne toutes les mesures au format d'exposition texte de Prometheus.
+    """
+    with _lock:
+        methodes = sorted((nom, mesure.copie()) for nom, mesure in METHODES.items())
+        emprunts = EMPRUNTS.copie()
+
+    lignes = [
+        '# HELP clinique_methode_duree_secondes Durée des appels aux méthodes des modèles',
+        '# TYPE clinique_methode_duree_secondes histogram',
+    ]
+    for nom, mesure in methodes:
+        _histogramme(lignes, 'clinique_methode_duree_secondes', f'methode="{nom}",', mesure)
+
+    lignes += ['# HELP clinique_methode_erreurs_total Erreurs SQL par méthode',
+               '# TYPE clinique_methode_erreurs_total counter']
+    lignes += [f'clinique_methode_erreurs_total{{methode="{nom}"}} {mesure.erreurs}'
+               for nom, mesure in methodes]
+    lignes += ['# HELP clinique_methode_lignes_total Lignes lues ou modifiées par méthode',
+               '# TYPE clinique_methode_lignes_total counter']
+    lignes += [f'clinique_methode_lignes_total{{methode="{nom}"}} {mesure.lignes}'
+               for nom, mesure in methodes]
+
+    lignes += ['# HELP clinique_pool_emprunt_secondes Attente d\'une connexion du pool',
+               '# TYPE clinique_pool_emprunt_secondes histogram']
+    _histogramme(lignes, 'clinique_pool_emprunt_secondes', '', emprunts)
+    lignes += ['# TYPE clinique_pool_emprunt_erreurs_total counter',
+               f'clinique_pool_emprunt_erreurs_total {emprunts.erreurs}']
+
+    lignes += ['# TYPE clinique_cache_succes_total counter']
+    caches = statistiques_caches()
+    lignes += [f'clinique_cache_succes_total{{cache="{nom}"}} {stats["succes"]}'
+               for nom, stats in sorted(caches.items())]
+    lignes += ['# TYPE clinique_cache_echecs_total counter']
+    lignes += [f'clinique_cache_echecs_total{{cache="{nom}"}} {stats["echecs"]}'
+               for nom, stats in sorted(caches.items())]
+    return '\n'.join(lignes) + '\n'
+
+
+def rapport():
+    """
+    Résumé lisible des mesures par méthode (triées par temps total).
+    """
+    with _lock:
+        mesures = sorted(METHODES.items(), key=lambda element: element[1].somme, reverse=True)
+        lignes = [f"{'méthode':<40} | {'appels':>7} | {'moy. (ms)':>9} | {'lignes':>8} | {'erreurs':>7}"]
+        for nom, mesure in mesures:
+            moyenne = mesure.somme / mesure.appels * 1000 if mesure.appels else 0.0
+            lignes.append(f"{nom:<40} | {mesure.appels:>7} | {moyenne:>9.2f} | "
+                          f"{mesure.lignes:>8} | {mesure.erreurs:>7}")
+        if EMPRUNTS.appels:
+            lignes.append(f"Attente moyenne d'une connexion : "
+                          f"{EMPRUNTS.somme / EMPRUNTS.appels * 1000:.2f} ms ({EMPRUNTS.appels} emprunts)")
+    return '\n'.join(lignes)
+
+
+class _Metriques(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        contenu = texte_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenu)))
+        self.end_headers()
+        self.wfile.write(contenu)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def demarrer_serveur(port, hote='127.0.0.1'):
+    """
+    Sert texte_prometheus() sur http://hote:port/metrics dans un thread de fond.
+    """
+    serveur = ThreadingHTTPServer((hote, port), _Metriques)
+    threading.Thread(target=serveur.serve_forever, name='metriques', daemon=True).start()
+    return serveur
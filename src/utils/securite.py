@@ -0,0 +1,90 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Coût de scrypt : n (CPU/mémoire, puissance de 2), r (taille de bloc), p (parallélisme).
+# Mémoire utilisée par hachage : 128 * n * r octets (16 Mo avec les valeurs par défaut).
+PARAMETRES_HACHAGE = {
+    'n': 2 ** 14,
+    'r': 8,
+    'p': 1,
+    'threads': 4,   # Hachages simultanés au plus (borne CPU et mémoire lors des pics de connexion)
+}
+
+PREFIXE = 'scrypt'
+
+# Clé secrète du processus pour les clés du cache de sessions
+_SECRET_SESSIONS = os.urandom(32)
+
+_executeur = None
+_executeur_lock = threading.Lock()
+
+
+def executeur():
+    """
+    Pool de threads dédié au hachage : le calcul (qui libère le GIL) se fait hors du thread appelant.
+    """
+    global _executeur
+    with _executeur_lock:
+        if _executeur is None:
+            _executeur = ThreadPoolExecutor(max_workers=PARAMETRES_HACHAGE['threads'],
+                                            thread_name_prefix='hachage')
+    return _executeur
+
+
+def _scrypt(mot_de_passe, sel, n, r, p):
+    return hashlib.scrypt(mot_de_passe.encode('utf-8'), salt=sel, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=32)
+
+
+def _b64(donnees):
+    return base64.b64encode(donnees).decode('ascii')
+
+
+def hacher_mot_de_passe(mot_de_passe):
+    """
+    Retourne le hachage stockable : scrypt$n$r$p$sel$hachage (sel et hachage en base64).
+    """
+    n, r, p = PARAMETRES_HACHAGE['n'], PARAMETRES_HACHAGE['r'], PARAMETRES_HACHAGE['p']
+    sel = os.urandom(16)
+    return f"{PREFIXE}${n}${r}${p}${_b64(sel)}${_b64(_scrypt(mot_de_passe, sel, n, r, p))}"
+
+
+def verifier_mot_de_passe(mot_de_passe, stocke):
+    """
+    Vérifie un mot de passe contre la valeur stockée.
+    Les anciens mots de passe stockés en clair sont encore acceptés (voir doit_rehacher).
+    """
+    if not stocke.startswith(PREFIXE + '$'):
+        return hmac.compare_digest(mot_de_passe.encode('utf-8'), stocke.encode('utf-8'))
+
+    try:
+        _, n, r, p, sel, attendu = stocke.split('$')
+        calcule = _scrypt(mot_de_passe, base64.b64decode(sel), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(calcule, base64.b64decode(attendu))
+
+
+def doit_rehacher(stocke):
+    """
+    Vrai si la valeur stockée est en clair ou utilise d'autres paramètres que PARAMETRES_HACHAGE.
+    """
+    if not stocke.startswith(PREFIXE + '$'):
+        return True
+    parametres = stocke.split('$')[1:4]
+    actuels = [str(PARAMETRES_HACHAGE[cle]) for cle in ('n', 'r', 'p')]
+    return parametres != actuels
+
+
+def cle_session(email, mot_de_passe):
+    """
+    Clé du cache des authentifications réussies.
+    Dérivée avec une clé secrète propre au processus : le mot de passe n'est jamais conservé.
+    """
+    return hmac.new(_SECRET_SESSIONS, f"{email}\0{mot_de_passe}".encode('utf-8'),
+                    hashlib.sha256).hexdigest()
+
@@ -8,12 +8,18 @@ def valider_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
+def normaliser_telephone(telephone):
+    """
+    Forme enregistrée d'un numéro : sans espaces ni indicatif +221 (771234567).
+    """
+    return telephone.replace(' ', '').replace('+221', '') if telephone else telephone
+
 def valider_telephone(telephone):
     """
     Valide un numéro de téléphone sénégalais.
     """
     # Accepte les formats : 771234567, 77 123 45 67, +221771234567
-    telephone = telephone.replace(' ', '').replace('+221', '')
+    telephone = normaliser_telephone(telephone)
     return len(telephone) == 9 and telephone.isdigit()
 
 def valider_date(date_str, format='%Y-%m-%d'):